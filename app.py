@@ -1,20 +1,25 @@
 import streamlit as st
 import random
+from collections import Counter
 from datetime import datetime, timedelta
 import plotly.graph_objects as go
 import plotly.express as px
 from src.user_profile import UserProfile, WorkoutLog
 from src.rag_engine import RAGEngine
 from src.llm_handler import LLMHandler
-from src.workout_generator import WorkoutGenerator
+from src.workout_generator import WorkoutGenerator, WorkoutPlan, plan_signature
 from src.gamification import GamificationEngine
+from src.achievement_index import metric_values
+from src.leaderboard import Leaderboards
 from src.recovery_analyzer import RecoveryAnalyzer
-from src.muscle_heatmap import generate_muscle_heatmap_svg, calculate_coverage_score
+from src.muscle_heatmap import generate_muscle_heatmap_svg
 from src.custom_styles import CUSTOM_CSS
+from src.storage import create_storage
+from src.unit_of_work import UnitOfWork, WriteBehindQueue
 from config import (
     APP_TITLE, APP_ICON, DATA_DIR, SESSION_USER_PROFILE, SESSION_CHAT_HISTORY, 
     SESSION_WORKOUT_PLAN, SESSION_CURRENT_DAY, SESSION_WORKOUT_LOGS,
-    USER_PROFILES_FILE, WORKOUT_LOGS_FILE, MOTIVATIONAL_QUOTES, STORAGE_DIR
+    MOTIVATIONAL_QUOTES, STORAGE_DIR, STORAGE_WRITE_BEHIND
 )
 import uuid
 
@@ -42,6 +47,11 @@ if 'diet_plan' not in st.session_state:
 if 'quick_question_triggered' not in st.session_state:
     st.session_state.quick_question_triggered = None
 
+@st.cache_data(max_entries=1024, show_spinner=False)
+def lifetime_log_totals(_storage, user_id: str, version):
+    """(logs, calories) over a user's whole history; recomputed only when their logs change"""
+    return WorkoutLog.totals(_storage, user_id)
+
 @st.cache_resource
 def initialize_system():
     try:
@@ -49,9 +59,13 @@ def initialize_system():
         rag_engine.initialize_database()
         llm_handler = LLMHandler()
         workout_gen = WorkoutGenerator(rag_engine, llm_handler)
-        gamification = GamificationEngine(STORAGE_DIR)
-        recovery = RecoveryAnalyzer(STORAGE_DIR)
-        return rag_engine, llm_handler, workout_gen, gamification, recovery
+        workout_gen.warm_cache()
+        storage = create_storage(STORAGE_DIR)
+        leaderboards = Leaderboards(storage)  # built from stored stats on first use
+        gamification = GamificationEngine(STORAGE_DIR, storage, leaderboards)
+        recovery = RecoveryAnalyzer(STORAGE_DIR, storage)
+        write_queue = WriteBehindQueue(storage) if STORAGE_WRITE_BEHIND else None
+        return rag_engine, llm_handler, workout_gen, gamification, recovery, storage, write_queue
     except ValueError as e:
         # Handle missing API key error
         st.error("⚠️ **Configuration Error**")
@@ -71,7 +85,7 @@ def initialize_system():
         st.stop()
 
 
-rag_engine, llm_handler, workout_gen, gamification, recovery = initialize_system()
+rag_engine, llm_handler, workout_gen, gamification, recovery, storage, write_queue = initialize_system()
 
 # Apply custom CSS
 st.markdown(CUSTOM_CSS, unsafe_allow_html=True)
@@ -128,6 +142,18 @@ def load_demo_user(demo_user_data):
     )
     return profile
 
+def get_session_plan(profile):
+    """The session's plan (stored as its seed), replaced by a new one if the profile changed
+    or the session still holds a plan in the old full-days format"""
+    data = st.session_state[SESSION_WORKOUT_PLAN]
+    if not data:
+        return None
+    plan = WorkoutPlan.from_dict(data)
+    if plan is None or plan.signature != plan_signature(profile):
+        plan = workout_gen.new_plan(profile)
+        st.session_state[SESSION_WORKOUT_PLAN] = plan.to_dict()
+    return plan
+
 st.markdown("""
 <style>
     .main-header {
@@ -190,10 +216,7 @@ with st.sidebar:
                 demo_idx = demo_names.index(selected_demo)
                 profile = load_demo_user(demo_users[demo_idx])
                 st.session_state[SESSION_USER_PROFILE] = profile
-                
-                with st.spinner("Generating workout plan..."):
-                    workout_plan = workout_gen.generate_workout_plan(profile)
-                    st.session_state[SESSION_WORKOUT_PLAN] = workout_plan
+                st.session_state[SESSION_WORKOUT_PLAN] = workout_gen.new_plan(profile).to_dict()
                 
                 st.success(f"Welcome back, {profile.name}! 🎉")
                 st.rerun()
@@ -238,12 +261,9 @@ with st.sidebar:
                         injuries_limitations=injuries
                     )
                     
-                    profile.save_to_file(USER_PROFILES_FILE)
+                    profile.save(storage)
                     st.session_state[SESSION_USER_PROFILE] = profile
-                    
-                    with st.spinner("Generating your personalized workout plan..."):
-                        workout_plan = workout_gen.generate_workout_plan(profile)
-                        st.session_state[SESSION_WORKOUT_PLAN] = workout_plan
+                    st.session_state[SESSION_WORKOUT_PLAN] = workout_gen.new_plan(profile).to_dict()
                     
                     st.success("Profile created! 🎉")
                     st.rerun()
@@ -269,20 +289,18 @@ with st.sidebar:
         
         if st.session_state[SESSION_WORKOUT_PLAN]:
             st.markdown("### 📋 Your Plan")
-            plan = st.session_state[SESSION_WORKOUT_PLAN]
             
-            for day in plan['weekly_plan']:
-                muscle_groups = ", ".join([mg.title() for mg in day['muscle_groups']])
-                is_current = day['day'] == st.session_state[SESSION_CURRENT_DAY]
+            # Only the muscle groups are needed here, so no day is generated
+            for day_number, day_groups in enumerate(workout_gen.plan_muscle_groups(profile), 1):
+                muscle_groups = ", ".join([mg.title() for mg in day_groups])
+                is_current = day_number == st.session_state[SESSION_CURRENT_DAY]
                 prefix = "👉 " if is_current else "    "
-                st.write(f"{prefix}**Day {day['day']}:** {muscle_groups}")
+                st.write(f"{prefix}**Day {day_number}:** {muscle_groups}")
             
             st.markdown("---")
             
             if st.button("🔄 Regenerate Plan"):
-                with st.spinner("Generating new plan..."):
-                    new_plan = workout_gen.generate_workout_plan(profile)
-                    st.session_state[SESSION_WORKOUT_PLAN] = new_plan
+                st.session_state[SESSION_WORKOUT_PLAN] = workout_gen.new_plan(profile).to_dict()
                 st.success("New plan generated!")
                 st.rerun()
         
@@ -424,7 +442,7 @@ else:
             with st.chat_message("assistant"):
                 with st.spinner("Thinking..."):
                     
-                    workout_plan = st.session_state[SESSION_WORKOUT_PLAN]
+                    workout_plan = get_session_plan(profile)
                     
                     query_lower = user_input.lower()
                     
@@ -524,7 +542,8 @@ else:
                             st.markdown(response)
                     
                     elif "today" in query_lower or "workout" in query_lower:
-                        current_workout = workout_plan['weekly_plan'][st.session_state[SESSION_CURRENT_DAY] - 1]
+                        current_day = min(st.session_state[SESSION_CURRENT_DAY], workout_plan.total_days)
+                        current_workout = workout_gen.get_plan_day(workout_plan, profile, current_day)
                         
                         exercises_list = "\n".join([
                             f"{i+1}. {ex['name']} - {ex['sets']} sets × {ex['reps']} reps"
@@ -589,20 +608,20 @@ Estimated Calories: {current_workout['estimated_calories']} kcal
         st.header("Today's Workout")
         
         if st.session_state[SESSION_WORKOUT_PLAN]:
-            plan = st.session_state[SESSION_WORKOUT_PLAN]
-            current_day = st.session_state[SESSION_CURRENT_DAY]
+            plan = get_session_plan(profile)
+            current_day = min(st.session_state[SESSION_CURRENT_DAY], plan.total_days)
             
             # Day selector
             selected_day = st.selectbox(
                 "Select Day",
-                options=list(range(1, plan['total_days'] + 1)),
+                options=list(range(1, plan.total_days + 1)),
                 index=current_day - 1,
                 format_func=lambda x: f"Day {x}",
                 key="day_selector"
             )
             st.session_state[SESSION_CURRENT_DAY] = selected_day
             
-            workout = plan['weekly_plan'][selected_day - 1]
+            workout = workout_gen.get_plan_day(plan, profile, selected_day)
             
             st.markdown(f"### Day {workout['day']}: {', '.join([mg.title() for mg in workout['muscle_groups']])}")
             
@@ -618,6 +637,9 @@ Estimated Calories: {current_workout['estimated_calories']} kcal
             
             # Mark Day Complete button
             if st.button("✅ Mark Day Complete", type="primary", use_container_width=True):
+                # All writes below are staged and committed together at the end
+                uow = UnitOfWork(storage, write_queue)
+                
                 # Create workout log
                 log = WorkoutLog(
                     log_id=str(uuid.uuid4()),
@@ -629,14 +651,7 @@ Estimated Calories: {current_workout['estimated_calories']} kcal
                     duration_minutes=workout['estimated_duration'],
                     calories_burned=workout['estimated_calories']
                 )
-                log.save_to_file(WORKOUT_LOGS_FILE)
-                
-                # Update profile
-                profile.total_workouts += 1
-                profile.current_streak += 1
-                profile.last_workout_date = datetime.now().isoformat()
-                profile.save_to_file(USER_PROFILES_FILE)
-                st.session_state[SESSION_USER_PROFILE] = profile
+                log.save(uow)
                 
                 # Update gamification
                 total_sets = sum(ex.get('sets', 3) for ex in workout['exercises'])
@@ -646,9 +661,19 @@ Estimated Calories: {current_workout['estimated_calories']} kcal
                     user_id=profile.user_id,
                     exercises_completed=len(workout['exercises']),
                     total_sets=total_sets,
-                    total_reps=total_reps
+                    total_reps=total_reps,
+                    uow=uow,
+                    muscle_groups=Counter(ex['muscle_group'] for ex in workout['exercises']),
+                    gym_id=profile.gym_id
                 )
                 
+                # Update profile (the streak comes from the activity calendar)
+                profile.total_workouts += 1
+                profile.current_streak = gamification_result['stats'].current_streak
+                profile.last_workout_date = datetime.now().isoformat()
+                profile.save(uow)
+                st.session_state[SESSION_USER_PROFILE] = profile
+                
                 # Save workout intensity for recovery tracking
                 workout_data = {
                     'total_sets': total_sets,
@@ -656,7 +681,9 @@ Estimated Calories: {current_workout['estimated_calories']} kcal
                     'muscle_groups': workout['muscle_groups']
                 }
                 intensity = recovery.calculate_intensity(workout_data, profile.experience_level)
-                recovery.save_workout_intensity(profile.user_id, intensity)
+                exercise_sets = {ex['id']: ex.get('sets', 3) for ex in workout['exercises']}
+                recovery.save_workout_intensity(profile.user_id, intensity, uow=uow, exercise_sets=exercise_sets)
+                uow.commit()
                 
                 # Show success message
                 st.success("🎉 Workout completed! Great job!")
@@ -743,17 +770,16 @@ Estimated Calories: {current_workout['estimated_calories']} kcal
     with tab3:
         st.header("🗺️ Your Muscle Coverage")
         
-        # Get recovery status for each muscle group
-        muscle_status = recovery.get_muscle_recovery_status(profile.user_id)
-        
-        # Calculate coverage score
-        coverage = calculate_coverage_score(muscle_status)
+        # Recovery status for each muscle group, coverage and advice in one read
+        report = recovery.build_report(profile.user_id)
+        muscle_status = report.muscle_status
+        coverage = report.coverage
         
         col1, col2 = st.columns([2, 1])
         
         with col1:
             # Display heatmap
-            svg = generate_muscle_heatmap_svg(muscle_status)
+            svg = generate_muscle_heatmap_svg(muscle_status, report.fatigue)
             import streamlit.components.v1 as components
             components.html(svg, height=650, scrolling=False)
         
@@ -791,6 +817,11 @@ Estimated Calories: {current_workout['estimated_calories']} kcal
             st.markdown("---")
             st.markdown("### 🤖 AI Recommendations")
             
+            if report.rest_day.get("should_rest"):
+                st.warning(f"😴 {report.rest_day['reason']}")
+            if report.deload.get("needs_deload"):
+                st.warning(f"📉 {report.deload['reason']}")
+            
             # Find neglected muscles
             neglected = [m for m, s in muscle_status.items() if s['days_since_workout'] > 6]
             
@@ -1176,10 +1207,36 @@ Estimated Calories: {current_workout['estimated_calories']} kcal
         
         st.markdown("---")
         
+        # Gym leaderboard
+        st.markdown("### 🥇 Gym Leaderboard")
+        board_labels = {
+            'xp': "Total XP",
+            'streak': "Current Streak",
+            'weekly_volume': "Reps This Week",
+            'monthly_workouts': "Workouts This Month"
+        }
+        board_metric = st.selectbox("Rank by", list(board_labels), format_func=board_labels.get)
+        leaderboards = gamification.leaderboards
+        entries = leaderboards.top(board_metric, profile.gym_id, 10)
+        user_rank = leaderboards.rank(board_metric, profile.gym_id, profile.user_id)
+        if user_rank and user_rank > 10:
+            entries += leaderboards.around(board_metric, profile.gym_id, profile.user_id, 1)
+        if entries:
+            for rank, user_id, score in entries:
+                name = (storage.get_profile(user_id) or {}).get('name', user_id)
+                you = " (you)" if user_id == profile.user_id else ""
+                st.write(f"**#{rank}** {name}{you} — {score:g}")
+            st.caption(f"{leaderboards.size(board_metric, profile.gym_id)} members ranked")
+        else:
+            st.info("No one at your gym is on this board yet.")
+        
+        st.markdown("---")
+        
         # Achievements
         st.markdown("### 🏅 Your Achievements")
         
         achievements = gamification.get_achievements(profile.user_id)
+        stat_values = metric_values(stats)
         
         # Group by category
         categories = {}
@@ -1194,17 +1251,7 @@ Estimated Calories: {current_workout['estimated_calories']} kcal
             for ach in achs:
                 unlocked_class = "unlocked" if ach.unlocked else ""
                 
-                # Determine progress display
-                if ach.category == "workout":
-                    progress_val = stats.total_workouts
-                elif ach.category == "streak":
-                    progress_val = stats.current_streak
-                elif "sets" in ach.id:
-                    progress_val = stats.total_sets
-                elif "reps" in ach.id:
-                    progress_val = stats.total_reps
-                else:
-                    progress_val = 0
+                progress_val = stat_values.get(ach.metric, 0)
                 
                 unlock_text = f"Unlocked {ach.unlocked_date[:10]}" if ach.unlocked else f"Progress: {progress_val}/{ach.requirement}"
                 
@@ -1222,7 +1269,15 @@ Estimated Calories: {current_workout['estimated_calories']} kcal
     with tab7:
         st.header("Your Progress")
         
-        logs = WorkoutLog.load_user_logs(WORKOUT_LOGS_FILE, profile.user_id)
+        recent_logs, _ = WorkoutLog.query(storage, profile.user_id, limit=10)
+        logs_version = storage.version('logs', profile.user_id)
+        if logs_version is None:
+            logged, total_calories = WorkoutLog.totals(storage, profile.user_id)
+        else:
+            logged, total_calories = lifetime_log_totals(storage, profile.user_id, logs_version)
+        activity = gamification.get_activity_calendar(profile.user_id)
+        today = datetime.now().date()
+        active_month = activity.active_days(today - timedelta(days=29), today)
         
         col1, col2, col3, col4 = st.columns(4)
         
@@ -1230,18 +1285,17 @@ Estimated Calories: {current_workout['estimated_calories']} kcal
             st.metric(
                 label="Total Workouts",
                 value=profile.total_workouts,
-                delta=f"+{len(logs)} logged"
+                delta=f"+{logged} logged"
             )
         
         with col2:
             st.metric(
                 label="Current Streak",
-                value=f"{profile.current_streak} days",
-                delta="🔥 Keep it up!"
+                value=f"{activity.current_streak(today)} days",
+                delta=f"Best: {activity.longest_streak()} days"
             )
         
         with col3:
-            total_calories = sum([log.calories_burned for log in logs])
             st.metric(
                 label="Total Calories",
                 value=f"{total_calories} kcal",
@@ -1249,7 +1303,7 @@ Estimated Calories: {current_workout['estimated_calories']} kcal
             )
         
         with col4:
-            completion_rate = (len(logs) / (profile.total_workouts or 1)) * 100
+            completion_rate = (logged / (profile.total_workouts or 1)) * 100
             st.metric(
                 label="Completion Rate",
                 value=f"{completion_rate:.0f}%",
@@ -1258,27 +1312,28 @@ Estimated Calories: {current_workout['estimated_calories']} kcal
         
         st.markdown("---")
         
-        if logs:
-            st.subheader("📈 Workout Frequency")
-            
-            dates = [log.date.strftime("%Y-%m-%d") for log in logs[-30:]]
-            workout_counts = {}
-            for date in dates:
-                workout_counts[date] = workout_counts.get(date, 0) + 1
+        if recent_logs:
+            st.subheader("📈 Workout Calendar")
             
+            mondays, rows = activity.weeks(today, 53)
             fig = go.Figure(data=[
-                go.Bar(
-                    x=list(workout_counts.keys()),
-                    y=list(workout_counts.values()),
-                    marker_color='rgb(102, 126, 234)'
+                go.Heatmap(
+                    z=rows,
+                    x=mondays,
+                    y=["Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun"],
+                    colorscale=[[0, '#ebedf0'], [1, 'rgb(102, 126, 234)']],
+                    zmin=0, zmax=1,
+                    showscale=False,
+                    xgap=3, ygap=3,
+                    hovertemplate="Week of %{x}, %{y}<extra></extra>"
                 )
             ])
             
             fig.update_layout(
-                title="Workouts Per Day (Last 30 Days)",
-                xaxis_title="Date",
-                yaxis_title="Workouts",
-                height=400
+                title=f"Active Days (Last Year): {activity.active_days(mondays[0], today)}, "
+                      f"{active_month} in the last 30 days",
+                yaxis=dict(autorange="reversed"),
+                height=260
             )
             
             st.plotly_chart(fig, use_container_width=True)
@@ -1287,7 +1342,7 @@ Estimated Calories: {current_workout['estimated_calories']} kcal
             
             st.subheader("📅 Recent Workouts")
             
-            for log in logs[:10]:
+            for log in recent_logs:
                 with st.expander(f"Day {log.day_number} - {log.date.strftime('%B %d, %Y')}"):
                     col1, col2, col3 = st.columns(3)
                     with col1:
@@ -0,0 +1,66 @@
+"""
+Achievement backfill benchmark for FitFlow AI
+Populates members with workout completion events, adds new achievements to
+the catalog, then times the vectorized backfill against re-running the
+engine per user (a full replay)
+
+Usage: python -m benchmarks.achievement_backfill_bench --users 10000 --events-per-user 150
+"""
+
+import argparse
+import json
+import tempfile
+import time
+from pathlib import Path
+
+from src.achievement_backfill import backfill_achievements
+from src.gamification import GamificationEngine
+from src.gamification_replay import replay_all
+from src.storage import create_storage
+from benchmarks.gamification_replay_bench import populate
+
+
+NEW_ACHIEVEMENTS = [
+    {"id": "chest_specialist", "name": "Chest Specialist", "description": "Train chest in 100 exercises",
+     "icon": "🏋️", "category": "muscle", "requirement": 100, "metric": "muscle:chest"},
+    {"id": "set_machine", "name": "Set Machine", "description": "Complete 2,000 sets",
+     "icon": "⚙️", "category": "progress", "requirement": 2000, "metric": "total_sets"},
+    {"id": "streak_legend", "name": "Streak Legend", "description": "Keep a 60-day streak",
+     "icon": "🔥", "category": "streak", "requirement": 60, "metric": "current_streak"},
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--users", type=int, default=10_000)
+    parser.add_argument("--events-per-user", type=int, default=150)
+    parser.add_argument("--backend", default="sqlite", choices=["json", "sharded", "sqlite"])
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        storage_dir = Path(tmp)
+        storage = create_storage(storage_dir, args.backend, cache_size=0)
+        engine = GamificationEngine(storage_dir, storage)
+        populate(engine, args.users, args.events_per_user)
+        print(f"{args.backend}: {args.users:,} users, {args.users * args.events_per_user:,} events")
+
+        catalog_file = storage_dir / "achievements.json"
+        catalog = json.loads(catalog_file.read_text(encoding="utf-8"))
+        catalog_file.write_text(json.dumps(catalog + NEW_ACHIEVEMENTS), encoding="utf-8")
+        engine = GamificationEngine(storage_dir, storage)
+
+        start = time.perf_counter()
+        counts = backfill_achievements(engine, achievement_ids=[a["id"] for a in NEW_ACHIEVEMENTS])
+        elapsed = time.perf_counter() - start
+        print(f"       backfill: {elapsed:7.2f} s  ({args.users / elapsed:,.0f} users/s, "
+              f"{counts['unlocked']:,} unlocked)")
+
+        start = time.perf_counter()
+        replay_all(engine, full=True)
+        elapsed = time.perf_counter() - start
+        print(f"    full replay: {elapsed:7.2f} s  ({args.users / elapsed:,.0f} users/s)")
+        storage.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+"""
+Analytics benchmark for FitFlow AI
+Compares the vectorized columnar aggregations with the per-record loops
+over log/intensity dicts that the app uses today
+
+Usage: python -m benchmarks.analytics_bench --records 1000000 --users 50000
+"""
+
+import argparse
+import random
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import numpy as np
+
+from src.analytics import (
+    ColumnarStore, LOG_DTYPE, INTENSITY_DTYPE, USER_DTYPE, to_epoch,
+    workouts_per_day, calories_per_day, volume_per_muscle, adherence_by_cohort
+)
+
+MUSCLES = ["chest", "back", "legs", "shoulders", "arms", "core", "cardio"]
+GOALS = ["muscle_gain", "weight_loss", "general_fitness", "strength"]
+
+
+def make_records(records: int, users: int):
+    rng = random.Random(42)
+    start = datetime(2025, 1, 1)
+    profiles = {
+        f"user_{u:07d}": {"fitness_goal": rng.choice(GOALS), "days_per_week": rng.randint(2, 6)}
+        for u in range(users)
+    }
+    user_ids = list(profiles)
+    logs, intensities = [], []
+    for _ in range(records):
+        user_id = rng.choice(user_ids)
+        date = (start + timedelta(minutes=rng.randrange(365 * 24 * 60))).isoformat()
+        logs.append({"user_id": user_id, "date": date, "calories_burned": rng.randint(150, 600)})
+        intensities.append({
+            "user_id": user_id, "date": date, "estimated_volume": rng.uniform(500, 3000),
+            "muscle_groups": rng.sample(MUSCLES, rng.randint(1, 3))
+        })
+    return profiles, logs, intensities
+
+
+def to_store(profiles, logs, intensities) -> ColumnarStore:
+    store = ColumnarStore(Path(tempfile.mkdtemp()) / "analytics")
+    index = {user_id: i for i, user_id in enumerate(profiles)}
+    store.user_ids = list(profiles)
+    store.users = np.array([
+        (0, store._code('fitness_goal', p['fitness_goal']), 0, p['days_per_week'], 0) for p in profiles.values()
+    ], dtype=USER_DTYPE)
+    store.logs = np.array([
+        (index[log['user_id']], to_epoch(log['date']), 0, 0, 0, 0, log['calories_burned']) for log in logs
+    ], dtype=LOG_DTYPE)
+    store.intensity = np.array([
+        (index[r['user_id']], to_epoch(r['date']), 0, 0, r['estimated_volume'], 0, store._muscle_mask(r['muscle_groups']))
+        for r in intensities
+    ], dtype=INTENSITY_DTYPE)
+    return store
+
+
+# Per-record baselines
+
+def loop_workouts_per_day(logs):
+    counts = {}
+    for log in logs:
+        day = datetime.fromisoformat(log['date']).strftime("%Y-%m-%d")
+        counts[day] = counts.get(day, 0) + 1
+    return counts
+
+
+def loop_calories_per_day(logs):
+    totals = {}
+    for log in logs:
+        day = datetime.fromisoformat(log['date']).strftime("%Y-%m-%d")
+        totals[day] = totals.get(day, 0) + log['calories_burned']
+    return totals
+
+
+def loop_volume_per_muscle(intensities):
+    totals = {}
+    for record in intensities:
+        share = record['estimated_volume'] / len(record['muscle_groups'])
+        for muscle in record['muscle_groups']:
+            totals[muscle] = totals.get(muscle, 0.0) + share
+    return totals
+
+
+def loop_adherence_by_cohort(profiles, logs, start, end):
+    done = {}
+    for log in logs:
+        if start <= datetime.fromisoformat(log['date']) < end:
+            done[log['user_id']] = done.get(log['user_id'], 0) + 1
+    weeks = (end - start).days / 7
+    cohorts = {}
+    for user_id, profile in profiles.items():
+        adherence = min(done.get(user_id, 0) / (profile['days_per_week'] * weeks), 1.0)
+        cohort = cohorts.setdefault(profile['fitness_goal'], [0, 0.0])
+        cohort[0] += 1
+        cohort[1] += adherence
+    return {goal: total / n for goal, (n, total) in cohorts.items()}
+
+
+def timed(fn, *args) -> float:
+    start = time.perf_counter()
+    fn(*args)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--records", type=int, default=1_000_000)
+    parser.add_argument("--users", type=int, default=50_000)
+    args = parser.parse_args()
+
+    print(f"Generating {args.records:,} logs and intensity records for {args.users:,} users...")
+    profiles, logs, intensities = make_records(args.records, args.users)
+    build_start = time.perf_counter()
+    store = to_store(profiles, logs, intensities)
+    print(f"Columnar export: {time.perf_counter() - build_start:.2f}s")
+
+    window = (datetime(2025, 6, 1), datetime(2025, 9, 1))
+    cases = [
+        ("workouts_per_day", (loop_workouts_per_day, logs), (workouts_per_day, store)),
+        ("calories_per_day", (loop_calories_per_day, logs), (calories_per_day, store)),
+        ("volume_per_muscle", (loop_volume_per_muscle, intensities), (volume_per_muscle, store)),
+        ("adherence_by_goal", (loop_adherence_by_cohort, profiles, logs, *window),
+         (adherence_by_cohort, store, 'fitness_goal', *window)),
+    ]
+
+    print(f"{'aggregation':<20}{'per-record (s)':>16}{'columnar (s)':>14}{'speedup':>10}")
+    for name, (loop_fn, *loop_args), (vec_fn, *vec_args) in cases:
+        loop_time = timed(loop_fn, *loop_args)
+        vec_time = timed(vec_fn, *vec_args)
+        print(f"{name:<20}{loop_time:>16.3f}{vec_time:>14.4f}{loop_time / vec_time:>9.0f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""
+Bulk export / import benchmark for FitFlow AI
+Generates a CSV of synthetic logs, imports it in chunks and exports it
+back, reporting records per second and peak memory per backend
+
+Usage: python -m benchmarks.bulk_io_bench --records 10000000 --users 100000
+"""
+
+import argparse
+import csv
+import resource
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from src.bulk_io import LOG_COLUMNS, export_logs_csv, import_logs_csv
+from src.storage import create_storage
+
+
+def write_source_csv(path: Path, records: int, users: int):
+    start = datetime(2024, 1, 1)
+    with open(path, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(LOG_COLUMNS)
+        for i in range(records):
+            writer.writerow([
+                f"log_{i}", f"user_{i % users:07d}", (start + timedelta(minutes=i)).isoformat(),
+                i % 7 + 1, "ex001;ex002;ex003", 5, 50, 300, ""
+            ])
+
+
+def peak_rss_mb() -> float:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--records", type=int, default=10_000_000)
+    parser.add_argument("--users", type=int, default=100_000)
+    parser.add_argument("--chunk-size", type=int, default=10_000)
+    parser.add_argument("--backends", nargs="+", default=["sqlite", "sharded"])
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        source = Path(tmp) / "source.csv"
+        write_source_csv(source, args.records, args.users)
+        print(f"{args.records:,} logs for {args.users:,} users, chunks of {args.chunk_size:,}")
+        print(f"{'backend':<10}{'import rec/s':>14}{'export rec/s':>14}{'peak RSS MB':>13}")
+
+        for backend in args.backends:
+            storage = create_storage(Path(tmp) / backend, backend, cache_size=0)
+
+            start = time.perf_counter()
+            imported = import_logs_csv(storage, source, chunk_size=args.chunk_size)
+            import_rate = imported / (time.perf_counter() - start)
+
+            start = time.perf_counter()
+            exported = export_logs_csv(storage, Path(tmp) / f"{backend}.csv")
+            export_rate = exported / (time.perf_counter() - start)
+
+            assert imported == exported == args.records, (imported, exported)
+            print(f"{backend:<10}{import_rate:>14,.0f}{export_rate:>14,.0f}{peak_rss_mb():>13.0f}")
+            storage.close()
+
+
+if __name__ == "__main__":
+    main()
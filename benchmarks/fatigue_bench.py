@@ -0,0 +1,54 @@
+"""
+Muscle fatigue benchmark for FitFlow AI
+Times computing per-muscle fatigue from a member's full history in one
+vectorized pass, and folding in one session incrementally
+
+Usage: python -m benchmarks.fatigue_bench --days 365 --sessions-per-day 2
+"""
+
+import argparse
+import random
+import time
+from datetime import datetime, timedelta
+
+from src.muscle_activation import ActivationMatrix, add_session, to_vector
+
+
+def make_history(matrix: ActivationMatrix, days: int, per_day: int):
+    rng = random.Random(0)
+    now = datetime(2026, 1, 1)
+    sessions = []
+    for i in range(days * per_day):
+        exercises = rng.sample(matrix.exercise_ids, 5)
+        sessions.append((now - timedelta(hours=24 / per_day * i), {ex: rng.randint(3, 5) for ex in exercises}))
+    return now, sessions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--sessions-per-day", type=int, default=2)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    matrix = ActivationMatrix.load()
+    now, sessions = make_history(matrix, args.days, args.sessions_per_day)
+
+    start = time.perf_counter()
+    for _ in range(args.repeat):
+        matrix.history_fatigue(sessions, now)
+    full = (time.perf_counter() - start) / args.repeat
+
+    fatigue, at = to_vector({}), None
+    start = time.perf_counter()
+    for when, sets in reversed(sessions):
+        fatigue, at = add_session(fatigue, at, matrix.session_load(sets), when)
+    per_session = (time.perf_counter() - start) / len(sessions)
+
+    print(f"{len(sessions):,} sessions over {args.days} days, {len(matrix.exercise_ids)} exercises")
+    print(f"full history recompute: {full * 1000:.2f} ms")
+    print(f"incremental update:     {per_session * 1e6:.1f} us/session")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""
+Gamification replay benchmark for FitFlow AI
+Populates members with a year of workout completion events, then times
+rebuilding everyone from snapshots and from the full logs
+
+Usage: python -m benchmarks.gamification_replay_bench --users 10000 --events-per-user 150
+"""
+
+import argparse
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from src.gamification import GamificationEngine, UserStats
+from src.gamification_replay import replay_all
+from src.storage import create_storage
+from src.unit_of_work import UnitOfWork
+from benchmarks.storage_bench import make_profile
+
+
+def populate(engine: GamificationEngine, users: int, per_user: int):
+    start = datetime(2026, 1, 1, 18)
+    for first in range(0, users, 1000):
+        uow = UnitOfWork(engine.storage)
+        for i in range(first, min(first + 1000, users)):
+            user_id = f"user_{i:07d}"
+            uow.save_profile(make_profile(user_id))
+            stats, unlocked = UserStats(user_id=user_id), {}
+            for seq in range(1, per_user + 1):
+                event = {
+                    'seq': seq, 'type': 'workout_completed',
+                    'at': (start + timedelta(days=seq * 2 + i % 3)).isoformat(),
+                    'exercises_completed': 5, 'total_sets': 18, 'total_reps': 180,
+                    'muscle_groups': {'chest': 2, 'arms': 3}, 'gym_id': f"gym_{i % 10}",
+                }
+                uow.append_event(user_id, event)
+                engine.apply_completion(stats, unlocked, event)
+                if seq % engine.SNAPSHOT_EVERY == 0:
+                    engine._save_snapshot(user_id, stats, unlocked, uow)
+            engine.save_user_stats(stats, uow)
+            uow.save_unlocked(user_id, unlocked)
+        uow.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--users", type=int, default=10_000)
+    parser.add_argument("--events-per-user", type=int, default=150)
+    parser.add_argument("--backend", default="sqlite", choices=["json", "sharded", "sqlite"])
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        storage_dir = Path(tmp)
+        storage = create_storage(storage_dir, args.backend, cache_size=0)
+        engine = GamificationEngine(storage_dir, storage)
+        populate(engine, args.users, args.events_per_user)
+        total_events = args.users * args.events_per_user
+        print(f"{args.backend}: {args.users:,} users, {total_events:,} events")
+
+        for label, full in (("from snapshots", False), ("full replay", True)):
+            start = time.perf_counter()
+            replay_all(engine, full=full)
+            elapsed = time.perf_counter() - start
+            print(f"{label:>15}: {elapsed:7.2f} s  ({args.users / elapsed:,.0f} users/s)")
+        storage.close()
+
+
+if __name__ == "__main__":
+    main()
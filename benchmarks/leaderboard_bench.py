@@ -0,0 +1,81 @@
+"""
+Leaderboard benchmark for FitFlow AI
+Builds XP boards for a large member base, then times incremental updates
+and top-K / rank / neighbour queries against re-sorting on every view
+
+Usage: python -m benchmarks.leaderboard_bench --users 1000000 --gyms 1
+"""
+
+import argparse
+import random
+import time
+
+from src.leaderboard import Leaderboards, ALL_TIME
+
+
+def make_stats(rng: random.Random, users: int, gyms: int):
+    for i in range(users):
+        yield {"user_id": f"user_{i:07d}", "gym_id": f"gym_{i % gyms:03d}", "xp": rng.randint(0, 50_000)}
+
+
+class StatsSource:
+    """Just enough of a storage backend for Leaderboards.load"""
+
+    def __init__(self, stats):
+        self.stats = stats
+
+    def iter_user_stats(self):
+        return iter(self.stats)
+
+
+def timed(fn, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--users", type=int, default=1_000_000)
+    parser.add_argument("--gyms", type=int, default=1)
+    parser.add_argument("--ops", type=int, default=100_000)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    stats = list(make_stats(rng, args.users, args.gyms))
+    by_user = {s["user_id"]: s for s in stats}
+
+    start = time.perf_counter()
+    boards = Leaderboards.load(StatsSource(stats))
+    build = time.perf_counter() - start
+    print(f"{args.users:,} users in {args.gyms} gym(s): built XP boards in {build:.2f} s")
+
+    gym = "gym_000"
+    members = [s["user_id"] for s in stats if s["gym_id"] == gym]
+    picks = [rng.choice(members) for _ in range(args.ops)]
+
+    start = time.perf_counter()
+    for user_id in picks:
+        before = by_user[user_id]
+        after = {**before, "xp": before["xp"] + rng.randint(50, 250)}
+        boards.update(user_id, before, after)
+        by_user[user_id] = after
+    update = (time.perf_counter() - start) / args.ops
+
+    top = timed(lambda: boards.top("xp", gym, 10, ALL_TIME), 1000)
+    rank = timed(lambda: boards.rank("xp", gym, rng.choice(members), ALL_TIME), 10_000)
+    around = timed(lambda: boards.around("xp", gym, rng.choice(members), 2, ALL_TIME), 10_000)
+
+    gym_stats = [by_user[user_id] for user_id in members]
+    resort = timed(lambda: sorted(gym_stats, key=lambda s: (-s["xp"], s["user_id"]))[:10], 3)
+
+    print(f"update:            {update * 1e6:8.1f} us")
+    print(f"top 10:            {top * 1e6:8.1f} us")
+    print(f"rank:              {rank * 1e6:8.1f} us")
+    print(f"around (+/- 2):    {around * 1e6:8.1f} us")
+    print(f"re-sort per view:  {resort * 1e6:8.1f} us  ({len(members):,} members)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""
+Record memory benchmark for FitFlow AI
+Reports bytes per live record for the slotted record types against the
+same dataclasses with a per-instance __dict__
+
+Usage: python -m benchmarks.memory_bench --records 1000000
+"""
+
+import argparse
+import dataclasses
+import gc
+import tracemalloc
+from datetime import datetime, timedelta
+
+from src.user_profile import UserProfile, WorkoutLog
+from src.gamification import Achievement, UserStats
+from src.recovery_analyzer import WorkoutIntensity
+
+
+def dict_variant(cls):
+    """Same fields and defaults as cls, but without __slots__"""
+    return dataclasses.make_dataclass(
+        f"{cls.__name__}WithDict",
+        [(f.name, f.type, dataclasses.field(default=f.default, default_factory=f.default_factory))
+         for f in dataclasses.fields(cls)]
+    )
+
+
+def make_kwargs(kind: str, i: int) -> dict:
+    date = datetime(2026, 1, 1) + timedelta(minutes=i)
+    user_id = f"user_{i % 100_000:07d}"
+    if kind == "WorkoutLog":
+        return dict(log_id=f"log_{i}", user_id=user_id, date=date, day_number=i % 7,
+                    exercises_completed=[], total_exercises=5, duration_minutes=50, calories_burned=300)
+    if kind == "WorkoutIntensity":
+        return dict(date=date.isoformat(), total_sets=15, total_reps=150, estimated_volume=float(i),
+                    muscle_groups=[], intensity_score=6.0)
+    if kind == "UserStats":
+        return dict(user_id=f"user_{i:07d}", level=3, xp=i, total_workouts=10)
+    if kind == "Achievement":
+        return dict(id=f"ach_{i}", name="First Workout", description="Complete one workout", icon="🏋️",
+                    category="workout", requirement=1)
+    return dict(user_id=f"user_{i:07d}", name=f"Member {i}", fitness_goal="strength",
+                experience_level="beginner", created_at=date)
+
+
+def bytes_per_record(cls, kind: str, count: int) -> float:
+    """Memory held by the instances themselves (field values are built before measuring)"""
+    kwargs = [make_kwargs(kind, i) for i in range(count)]
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    records = [cls(**kw) for kw in kwargs]
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del records, kwargs
+    gc.collect()
+    return (after - before) / count
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--records", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    print(f"Bytes per record, {args.records:,} live records (instance + list slot, excluding field values)")
+    print(f"{'record':<18}{'__dict__':>10}{'slots':>10}{'saved':>8}")
+    for cls in (WorkoutLog, WorkoutIntensity, UserStats, Achievement, UserProfile):
+        kind = cls.__name__
+        with_dict = bytes_per_record(dict_variant(cls), kind, args.records)
+        slotted = bytes_per_record(cls, kind, args.records)
+        print(f"{kind:<18}{with_dict:>10.0f}{slotted:>10.0f}{1 - slotted / with_dict:>8.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""
+Batch recovery recompute benchmark for FitFlow AI
+Populates a storage backend with synthetic members and intensity history,
+then times the re-score / rebuild job at several worker counts
+
+Usage: python -m benchmarks.recovery_batch_bench --users 20000 --records-per-user 60 --backend sqlite
+"""
+
+import argparse
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from src.recovery_batch import recompute_all
+from src.storage import create_storage
+from src.unit_of_work import UnitOfWork
+from benchmarks.storage_bench import make_profile, make_intensity
+
+
+def populate(storage_dir: Path, backend: str, users: int, per_user: int):
+    storage = create_storage(storage_dir, backend, cache_size=0, archive=False)
+    start = datetime.now() - timedelta(days=per_user)
+    for first in range(0, users, 1000):
+        uow = UnitOfWork(storage)
+        for i in range(first, min(first + 1000, users)):
+            user_id = f"user_{i:07d}"
+            uow.save_profile(make_profile(user_id))
+            for day in range(per_user):
+                uow.append_intensity(user_id, make_intensity(start + timedelta(days=day, minutes=i % 600)))
+        uow.commit()
+    storage.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--users", type=int, default=20_000)
+    parser.add_argument("--records-per-user", type=int, default=60)
+    parser.add_argument("--backend", default="sqlite", choices=["json", "sharded", "sqlite"])
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--shards", type=int, default=64)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        storage_dir = Path(tmp)
+        populate(storage_dir, args.backend, args.users, args.records_per_user)
+        total_records = args.users * args.records_per_user
+        print(f"{args.backend}: {args.users:,} users, {total_records:,} intensity records, {args.shards} shards")
+        print(f"{'workers':>8}{'seconds':>10}{'users/s':>12}{'records/s':>12}")
+        for workers in args.workers:
+            start = time.perf_counter()
+            recompute_all(storage_dir, args.backend, workers=workers, shards=args.shards,
+                          restart=True, progress=None)
+            elapsed = time.perf_counter() - start
+            print(f"{workers:>8}{elapsed:>10.2f}{args.users / elapsed:>12,.0f}{total_records / elapsed:>12,.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""
+Record serialization benchmark for FitFlow AI
+Reports bytes per record and decode throughput of the JSON format used in
+storage files versus the compact msgpack format, per record type
+
+Usage: python -m benchmarks.serialization_bench --records 100000
+"""
+
+import argparse
+import json
+import time
+from datetime import datetime, timedelta
+
+from src.serialization import pack, unpack
+from src.user_profile import UserProfile, WorkoutLog
+from benchmarks.storage_bench import make_profile, make_stats, make_log, make_intensity
+
+
+def make_records(kind: str, count: int):
+    start = datetime(2026, 1, 1, 7, 30, 12, 345678)
+    if kind == 'profile':
+        return [make_profile(f"user_{i:07d}") for i in range(count)]
+    if kind == 'stats':
+        return [make_stats(f"user_{i:07d}") for i in range(count)]
+    if kind == 'log':
+        return [make_log(f"user_{i % 1000:07d}", i, start + timedelta(minutes=i)) for i in range(count)]
+    return [make_intensity(start + timedelta(minutes=i)) for i in range(count)]
+
+
+def throughput(fn, items) -> float:
+    """Records per second"""
+    start = time.perf_counter()
+    for item in items:
+        fn(item)
+    return len(items) / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--records", type=int, default=100_000)
+    args = parser.parse_args()
+
+    typed_decoders = {
+        'profile': (lambda s: UserProfile.from_dict(json.loads(s)), UserProfile.from_packed),
+        'log': (lambda s: WorkoutLog.from_dict(json.loads(s)), WorkoutLog.from_packed),
+    }
+
+    print(f"{args.records:,} records per type")
+    print(f"{'record':<10}{'json indent=2':>14}{'json':>8}{'msgpack':>9}"
+          f"{'json dec/s':>14}{'msgpack dec/s':>15}{'json typed/s':>14}{'msgpack typed/s':>17}")
+    for kind in ('profile', 'log', 'stats', 'intensity'):
+        records = make_records(kind, args.records)
+        pretty = [json.dumps(r, indent=2) for r in records]
+        compact = [json.dumps(r) for r in records]
+        packed = [pack(kind, r) for r in records]
+
+        sizes = [sum(len(x) for x in encoded) / len(records) for encoded in (pretty, compact, packed)]
+        json_rate = throughput(json.loads, compact)
+        packed_rate = throughput(lambda b: unpack(kind, b), packed)
+
+        typed = ("", "")
+        if kind in typed_decoders:
+            from_json, from_packed = typed_decoders[kind]
+            typed = (f"{throughput(from_json, compact):,.0f}", f"{throughput(from_packed, packed):,.0f}")
+
+        print(f"{kind:<10}{sizes[0]:>13.0f}B{sizes[1]:>7.0f}B{sizes[2]:>8.0f}B"
+              f"{json_rate:>14,.0f}{packed_rate:>15,.0f}{typed[0]:>14}{typed[1]:>17}")
+
+
+if __name__ == "__main__":
+    main()
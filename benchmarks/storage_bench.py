@@ -0,0 +1,141 @@
+"""
+Storage backend benchmark for FitFlow AI
+Reports per-operation latency of each backend with a large member base
+
+Usage: python -m benchmarks.storage_bench --users 100000 --ops 200
+"""
+
+import argparse
+import json
+import random
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from src.storage import JSONStorage, SQLiteStorage
+from src.sharding import ShardedJSONStorage, migrate_flat_json
+
+
+def make_profile(user_id: str) -> dict:
+    return {
+        "user_id": user_id, "name": f"Member {user_id}", "fitness_goal": "muscle_gain",
+        "experience_level": "intermediate", "days_per_week": 4, "session_duration": 60,
+        "injuries_limitations": "", "preferred_muscle_groups": [], "gym_id": "demo_gym_01",
+        "created_at": datetime(2025, 1, 1).isoformat(), "total_workouts": 10,
+        "current_streak": 2, "last_workout_date": None
+    }
+
+
+def make_stats(user_id: str) -> dict:
+    return {
+        "user_id": user_id, "level": 3, "xp": 300, "total_workouts": 10, "current_streak": 2,
+        "longest_streak": 5, "total_sets": 150, "total_reps": 1500, "achievements_unlocked": 2,
+        "last_workout_date": datetime(2026, 1, 1).isoformat()
+    }
+
+
+def make_log(user_id: str, idx: int, date: datetime) -> dict:
+    return {
+        "log_id": f"{user_id}-{idx}", "user_id": user_id, "date": date.isoformat(), "day_number": 1,
+        "exercises_completed": ["ex001", "ex002"], "total_exercises": 5, "duration_minutes": 50,
+        "calories_burned": 300, "notes": ""
+    }
+
+
+def make_intensity(date: datetime) -> dict:
+    return {
+        "date": date.isoformat(), "total_sets": 15, "total_reps": 150, "estimated_volume": 2250.0,
+        "muscle_groups": ["chest", "arms"], "intensity_score": 6.0
+    }
+
+
+def populate_json(storage: JSONStorage, user_ids, logs_per_user: int):
+    """Write the JSON files in one pass (the per-entry API would be quadratic)"""
+    start = datetime(2026, 1, 1)
+    storage.storage_dir.mkdir(parents=True, exist_ok=True)
+    with open(storage.profiles_file, 'w') as f:
+        json.dump([make_profile(u) for u in user_ids], f)
+    with open(storage.user_stats_file, 'w') as f:
+        json.dump({u: make_stats(u) for u in user_ids}, f)
+    with open(storage.logs_file, 'w') as f:
+        json.dump([make_log(u, i, start + timedelta(days=i)) for u in user_ids for i in range(logs_per_user)], f)
+    with open(storage.intensity_file, 'w') as f:
+        json.dump({u: [make_intensity(start + timedelta(days=i)) for i in range(logs_per_user)] for u in user_ids}, f)
+
+
+def populate_sqlite(storage: SQLiteStorage, user_ids, logs_per_user: int):
+    start = datetime(2026, 1, 1)
+    with storage._connection() as conn:
+        conn.executemany("INSERT INTO profiles VALUES (?, ?)", ((u, json.dumps(make_profile(u))) for u in user_ids))
+        conn.executemany("INSERT INTO user_stats VALUES (?, ?)", ((u, json.dumps(make_stats(u))) for u in user_ids))
+        logs = (make_log(u, i, start + timedelta(days=i)) for u in user_ids for i in range(logs_per_user))
+        conn.executemany(
+            "INSERT INTO workout_logs VALUES (?, ?, ?, ?)",
+            ((log['log_id'], log['user_id'], log['date'], json.dumps(log)) for log in logs)
+        )
+        intensities = ((u, make_intensity(start + timedelta(days=i))) for u in user_ids for i in range(logs_per_user))
+        conn.executemany(
+            "INSERT INTO workout_intensity (user_id, date, data) VALUES (?, ?, ?)",
+            ((u, data['date'], json.dumps(data)) for u, data in intensities)
+        )
+
+
+def time_op(fn, args_list) -> float:
+    """Mean latency in milliseconds"""
+    start = time.perf_counter()
+    for args in args_list:
+        fn(*args)
+    return (time.perf_counter() - start) / len(args_list) * 1000
+
+
+def run(storage, user_ids, ops: int):
+    sample = random.sample(user_ids, ops)
+    now = datetime.now()
+    return {
+        "get_profile": time_op(storage.get_profile, [(u,) for u in sample]),
+        "save_profile": time_op(storage.save_profile, [(make_profile(u),) for u in sample]),
+        "get_user_stats": time_op(storage.get_user_stats, [(u,) for u in sample]),
+        "save_user_stats": time_op(storage.save_user_stats, [(u, make_stats(u)) for u in sample]),
+        "append_log": time_op(storage.append_log, [(make_log(u, 'new', now),) for u in sample]),
+        "get_user_logs": time_op(storage.get_user_logs, [(u,) for u in sample]),
+        "query_logs": time_op(storage.query_logs, [(u, None, None, 10) for u in sample]),
+        "append_intensity": time_op(storage.append_intensity, [(u, make_intensity(now), 90) for u in sample]),
+        "get_intensities": time_op(storage.get_intensities, [(u,) for u in sample]),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--users", type=int, default=100_000)
+    parser.add_argument("--logs-per-user", type=int, default=3)
+    parser.add_argument("--ops", type=int, default=200, help="operations sampled per measurement")
+    parser.add_argument("--backends", nargs="+", default=["sqlite", "sharded", "json"])
+    args = parser.parse_args()
+
+    user_ids = [f"user_{i:07d}" for i in range(args.users)]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        results = {}
+        for backend in args.backends:
+            if backend == "json":
+                storage = JSONStorage(Path(tmp) / "json")
+                populate_json(storage, user_ids, args.logs_per_user)
+            elif backend == "sharded":
+                populate_json(JSONStorage(Path(tmp) / "sharded"), user_ids, args.logs_per_user)
+                migrate_flat_json(Path(tmp) / "sharded")
+                storage = ShardedJSONStorage(Path(tmp) / "sharded")
+            else:
+                storage = SQLiteStorage(Path(tmp) / "fitflow.db")
+                populate_sqlite(storage, user_ids, args.logs_per_user)
+            results[backend] = run(storage, user_ids, min(args.ops, args.users))
+            storage.close()
+
+    print(f"Per-operation latency (ms), {args.users:,} users, {args.logs_per_user} logs/user")
+    print(f"{'operation':<18}" + "".join(f"{b:>12}" for b in args.backends))
+    for op in results[args.backends[0]]:
+        print(f"{op:<18}" + "".join(f"{results[b][op]:>12.3f}" for b in args.backends))
+
+
+if __name__ == "__main__":
+    main()
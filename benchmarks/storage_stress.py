@@ -0,0 +1,109 @@
+"""
+Concurrency stress test for FitFlow AI storage
+Hammers one storage directory from many processes x threads while readers
+poll it, then checks that no update was lost and no reader saw a torn file
+
+Usage: python -m benchmarks.storage_stress --processes 4 --threads 8 --writes 50
+"""
+
+import argparse
+import multiprocessing
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from src.storage import create_storage
+
+
+def writer(storage_dir: str, backend: str, worker_id: str, writes: int):
+    storage = create_storage(Path(storage_dir), backend)
+    for i in range(writes):
+        user_id = f"{worker_id}-{i}"
+        storage.save_user_stats(user_id, {"user_id": user_id, "xp": i})
+        storage.append_intensity(worker_id, {"date": f"2026-01-01T00:00:{i % 60:02d}", "seq": i})
+    storage.close()
+
+
+def reader(storage_dir: str, backend: str, stop: threading.Event, errors: list):
+    storage = create_storage(Path(storage_dir), backend)
+    while not stop.is_set():
+        try:
+            storage.get_user_stats("p0-t0-0")
+            storage.get_intensities("p0-t0")
+        except Exception as e:  # a torn read surfaces as a JSONDecodeError
+            errors.append(repr(e))
+    storage.close()
+
+
+def process_main(storage_dir: str, backend: str, process_idx: int, threads: int, writes: int):
+    workers = [
+        threading.Thread(target=writer, args=(storage_dir, backend, f"p{process_idx}-t{t}", writes))
+        for t in range(threads)
+    ]
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--backend", default="json", choices=["json", "sqlite"])
+    parser.add_argument("--processes", type=int, default=4)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--writes", type=int, default=50, help="writes per thread")
+    parser.add_argument("--readers", type=int, default=4)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as storage_dir:
+        create_storage(Path(storage_dir), args.backend).close()
+
+        stop = threading.Event()
+        read_errors = []
+        readers = [
+            threading.Thread(target=reader, args=(storage_dir, args.backend, stop, read_errors))
+            for _ in range(args.readers)
+        ]
+        for r in readers:
+            r.start()
+
+        # spawn, not fork: forking while reader threads hold SQLite mutexes deadlocks the children
+        ctx = multiprocessing.get_context("spawn")
+        start = time.perf_counter()
+        processes = [
+            ctx.Process(target=process_main, args=(storage_dir, args.backend, p, args.threads, args.writes))
+            for p in range(args.processes)
+        ]
+        for p in processes:
+            p.start()
+        for p in processes:
+            p.join()
+        elapsed = time.perf_counter() - start
+
+        stop.set()
+        for r in readers:
+            r.join()
+
+        storage = create_storage(Path(storage_dir), args.backend)
+        lost_stats = 0
+        lost_intensities = 0
+        for p in range(args.processes):
+            for t in range(args.threads):
+                worker_id = f"p{p}-t{t}"
+                lost_stats += sum(1 for i in range(args.writes) if storage.get_user_stats(f"{worker_id}-{i}") is None)
+                lost_intensities += args.writes - len(storage.get_intensities(worker_id))
+        storage.close()
+
+    total = args.processes * args.threads * args.writes * 2
+    print(f"{args.backend}: {total} writes from {args.processes} processes x {args.threads} threads "
+          f"in {elapsed:.2f}s ({total / elapsed:.0f} writes/s)")
+    print(f"lost stats updates: {lost_stats}, lost intensity appends: {lost_intensities}, "
+          f"reader errors: {len(read_errors)}")
+
+    if lost_stats or lost_intensities or read_errors:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""
+Workout generation benchmark for FitFlow AI
+Times weekly plan generation with the shared candidate pool warmed against
+running a vector query for every day of every plan
+
+Usage: python -m benchmarks.workout_generation_bench --plans 200
+"""
+
+import argparse
+import random
+import time
+
+from src.rag_engine import RAGEngine
+from src.user_profile import UserProfile
+from src.workout_generator import WorkoutGenerator
+
+
+def make_profiles(rng: random.Random, count: int, gym_ids):
+    for i in range(count):
+        yield UserProfile(
+            user_id=f"user_{i:07d}", name=f"Member {i}",
+            fitness_goal=rng.choice(["muscle_gain", "strength", "weight_loss", "general_fitness"]),
+            experience_level=rng.choice(WorkoutGenerator.LEVELS),
+            days_per_week=rng.choice([3, 4, 5]), session_duration=60,
+            injuries_limitations="", gym_id=rng.choice(gym_ids),
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--plans", type=int, default=200)
+    args = parser.parse_args()
+
+    rag = RAGEngine()
+    rag.initialize_database()
+    generator = WorkoutGenerator(rag, llm_handler=None)
+    profiles = list(make_profiles(random.Random(0), args.plans, [gym['gym_id'] for gym in rag.gyms_data]))
+
+    start = time.perf_counter()
+    for profile in profiles:
+        generator.candidates.invalidate()
+        generator.generate_workout_plan(profile)
+    uncached = (time.perf_counter() - start) / args.plans
+    uncached_queries = generator.candidates.queries
+
+    start = time.perf_counter()
+    pools = generator.warm_cache()
+    warm = time.perf_counter() - start
+    queries = generator.candidates.queries
+    start = time.perf_counter()
+    for profile in profiles:
+        generator.generate_workout_plan(profile)
+    cached = (time.perf_counter() - start) / args.plans
+
+    print(f"{args.plans} plans, {len(rag.gyms_data)} gym(s)")
+    print(f"uncached:  {uncached * 1e3:8.2f} ms/plan  ({uncached_queries / args.plans:.1f} vector queries/plan)")
+    print(f"warm-up:   {warm * 1e3:8.2f} ms  ({pools} pools)")
+    print(f"cached:    {cached * 1e3:8.2f} ms/plan  ({generator.candidates.queries - queries} vector queries)")
+
+
+if __name__ == "__main__":
+    main()
@@ -58,9 +58,34 @@ SUPPLEMENTS_FILE = DATA_DIR / "supplements.json"
 STORAGE_DIR = BASE_DIR / "storage"
 USER_PROFILES_FILE = STORAGE_DIR / "user_profiles.json"
 WORKOUT_LOGS_FILE = STORAGE_DIR / "workout_logs.json"
+SQLITE_DB_FILE = STORAGE_DIR / "fitflow.db"
 
 STORAGE_DIR.mkdir(exist_ok=True)
 
+# Storage backend: "json" (one file per data type), "sharded" (per-user files)
+# or "sqlite" (WAL database)
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "json")
+# Encoding of SQLite record payloads: "json" (readable) or "msgpack" (compact binary)
+STORAGE_FORMAT = os.getenv("STORAGE_FORMAT", "json")
+# Hashed directory fan-out for the sharded backend (levels x hex chars per level)
+STORAGE_SHARD_LEVELS = int(os.getenv("STORAGE_SHARD_LEVELS", "2"))
+STORAGE_SHARD_WIDTH = int(os.getenv("STORAGE_SHARD_WIDTH", "2"))
+# Entries in the process-wide read-through storage cache (0 disables it)
+STORAGE_CACHE_SIZE = int(os.getenv("STORAGE_CACHE_SIZE", "1024"))
+# Commit "Mark Day Complete" writes on a background thread instead of in the click handler
+STORAGE_WRITE_BEHIND = os.getenv("STORAGE_WRITE_BEHIND", "0") == "1"
+
+# Days of raw workout logs / intensity records kept hot; older ones are rolled up and
+# archived by `python -m src.retention apply`
+RETENTION_HOT_DAYS = int(os.getenv("RETENTION_HOT_DAYS", "90"))
+# Banister fitness/fatigue model: impulse-response time constants (days) and gains
+BANISTER_FITNESS_DAYS = float(os.getenv("BANISTER_FITNESS_DAYS", "42"))
+BANISTER_FATIGUE_DAYS = float(os.getenv("BANISTER_FATIGUE_DAYS", "7"))
+BANISTER_FITNESS_GAIN = float(os.getenv("BANISTER_FITNESS_GAIN", "1.0"))
+BANISTER_FATIGUE_GAIN = float(os.getenv("BANISTER_FATIGUE_GAIN", "2.0"))
+# XP curve past level 10: each level costs this many times the previous one
+XP_LEVEL_GROWTH = float(os.getenv("XP_LEVEL_GROWTH", "1.1"))
+
 # LLM settings - Best Practice: Use Streamlit Secrets
 import sys
 
@@ -0,0 +1,212 @@
+"""
+Achievement Backfill for FitFlow AI
+Evaluates achievements retroactively for every member, so entries added to
+the catalog reach existing members without waiting for their next workout
+
+    python -m src.achievement_backfill                      # every achievement
+    python -m src.achievement_backfill --ids night_owl iron_beginner
+
+Users are processed in chunks. A chunk's event logs are flattened into
+NumPy arrays, and running totals per metric come from segmented cumulative
+sums (streaks from day differences). Each achievement then costs one
+searchsorted over the chunk, and each unlock is dated with the completion
+event that crossed the requirement, the same date a replay would give.
+Members with no events yet are dated by their last workout. Unlocks earn
+the usual achievement XP. XP and level achievements are checked against
+the final stats only. Writes are batched per chunk.
+"""
+
+from typing import Dict, Iterable, List, Optional, Tuple
+from datetime import datetime
+from pathlib import Path
+import argparse
+import time
+
+import numpy as np
+
+from config import STORAGE_DIR
+from src.achievement_index import metric_of, MUSCLE_METRIC_PREFIX
+from src.gamification import GamificationEngine, UserStats
+from src.storage import create_storage
+from src.unit_of_work import UnitOfWork
+
+
+# Metrics checked against current stats rather than the event log
+STATS_ONLY_METRICS = ('xp', 'level')
+
+# Per-user offset that keeps one chunk's running totals sorted as a whole
+SEGMENT = np.int64(1) << 40
+
+
+def targets_by_metric(catalog: List[Dict], achievement_ids: Optional[Iterable[str]] = None) -> Dict[str, List[Tuple[int, str]]]:
+    wanted = set(achievement_ids) if achievement_ids is not None else None
+    targets: Dict[str, List[Tuple[int, str]]] = {}
+    for achievement in catalog:
+        metric = metric_of(achievement)
+        if metric is None or (wanted is not None and achievement['id'] not in wanted):
+            continue
+        targets.setdefault(metric, []).append((achievement['requirement'], achievement['id']))
+    return targets
+
+
+def backfill_achievements(engine: GamificationEngine, user_ids: Optional[Iterable[str]] = None,
+                          achievement_ids: Optional[Iterable[str]] = None,
+                          chunk_size: int = 1000) -> Dict[str, int]:
+    """Unlock every achievement members already qualify for; returns counts"""
+    targets = targets_by_metric(engine._load_achievement_catalog(), achievement_ids)
+    counts = {"users": 0, "unlocked": 0}
+    chunk: List[str] = []
+    for user_id in (engine.storage.iter_user_ids() if user_ids is None else user_ids):
+        chunk.append(user_id)
+        if len(chunk) >= chunk_size:
+            _backfill_chunk(engine, chunk, targets, counts)
+            chunk = []
+    if chunk:
+        _backfill_chunk(engine, chunk, targets, counts)
+    return counts
+
+
+def _load_history(engine: GamificationEngine, user_id: str) -> Tuple[UserStats, Optional[Dict], List[Dict]]:
+    """(current stats, the stats replays start from or None, events after them)"""
+    stats = engine.get_user_stats(user_id)
+    snapshot = (engine.storage.get_user_document(engine.SNAPSHOT_DOCUMENT, user_id) or {}).get('base')
+    if snapshot is not None:
+        return stats, snapshot['stats'], engine.storage.get_events(user_id, snapshot['seq'])
+    if stats.event_seq == 0:
+        return stats, _stats_dict(stats), []  # nothing logged yet
+    return stats, None, engine.storage.get_events(user_id)
+
+
+def _stats_dict(stats: UserStats) -> Dict:
+    return {name: getattr(stats, name) for name in UserStats.__slots__}
+
+
+def _segmented_cumsum(values: np.ndarray, starts: np.ndarray, segment: np.ndarray) -> np.ndarray:
+    totals = np.cumsum(values)
+    before = np.concatenate(([0], totals))[starts]
+    return totals - before[segment]
+
+
+def _streaks(days: np.ndarray, starts: np.ndarray, segment: np.ndarray,
+             base_day: np.ndarray, base_streak: np.ndarray) -> np.ndarray:
+    """Current streak after each event, following apply_completion's day rules"""
+    n = len(days)
+    previous = np.empty(n, dtype=np.int64)
+    previous[1:] = days[:-1]
+    previous[starts[starts < n]] = base_day[segment[starts[starts < n]]]
+    gap = days - previous
+    restart = (gap > 1) | (previous < 0)
+    step = ((gap == 1) & ~restart).astype(np.int64)
+
+    # Runs begin at a restart or at a user's first event (which may continue the base streak)
+    run_start = np.zeros(n, dtype=bool)
+    run_start[restart] = True
+    run_start[starts[starts < n]] = True
+    run_index = np.maximum.accumulate(np.where(run_start, np.arange(n), 0))
+    totals = np.cumsum(step)
+    before = totals - step
+    start_value = np.where(restart, 1, base_streak[segment])
+    return start_value[run_index] + totals - before[run_index]
+
+
+def _backfill_chunk(engine: GamificationEngine, user_ids: List[str], targets: Dict[str, List[Tuple[int, str]]],
+                    counts: Dict[str, int]):
+    histories = [_load_history(engine, user_id) for user_id in user_ids]
+    users = len(user_ids)
+    lengths = np.array([len(events) for _, _, events in histories], dtype=np.int64)
+    starts = np.concatenate(([0], np.cumsum(lengths)[:-1])).astype(np.int64)
+    ends = starts + lengths
+    segment = np.repeat(np.arange(users), lengths)
+    events = [event for _, _, user_events in histories for event in user_events]
+    at = [event['at'] for event in events]
+    bases = [base or {} for _, base, _ in histories]
+    base_dates = [base.get('last_workout_date') for base in bases]
+
+    def base_values(field: str) -> np.ndarray:
+        return np.array([base.get(field) or 0 for base in bases], dtype=np.int64)
+
+    # Running value of each metric after every event
+    series: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}  # metric -> (base value, running values)
+    for metric, field in (('total_workouts', None), ('total_sets', 'total_sets'), ('total_reps', 'total_reps')):
+        if metric not in targets:
+            continue
+        increments = np.ones(len(events), dtype=np.int64) if field is None else \
+            np.array([event[field] for event in events], dtype=np.int64)
+        base = base_values(metric)
+        series[metric] = (base, base[segment] + _segmented_cumsum(increments, starts, segment))
+
+    if 'current_streak' in targets or 'longest_streak' in targets:
+        days = np.array(at, dtype='datetime64[us]').astype('datetime64[D]').astype(np.int64)
+        base_day = np.array([
+            np.datetime64(date, 'D').astype(np.int64) if date else -1 for date in base_dates
+        ], dtype=np.int64)
+        streak = _streaks(days, starts, segment, base_day, base_values('current_streak'))
+        longest = base_values('longest_streak')
+        running = np.maximum.accumulate(streak + segment * SEGMENT) - segment * SEGMENT
+        running = np.maximum(running, longest[segment])
+        # Streak achievements fire the first time the streak reaches them, i.e. on the running maximum
+        for metric in ('current_streak', 'longest_streak'):
+            series[metric] = (np.maximum(base_values('current_streak'), longest), running)
+
+    for metric in targets:
+        if metric.startswith(MUSCLE_METRIC_PREFIX):
+            group = metric[len(MUSCLE_METRIC_PREFIX):]
+            increments = np.array([event.get('muscle_groups', {}).get(group, 0) for event in events], dtype=np.int64)
+            base = np.array([(b.get('muscle_exercises') or {}).get(group, 0) for b in bases], dtype=np.int64)
+            series[metric] = (base, base[segment] + _segmented_cumsum(increments, starts, segment))
+
+    # First crossing of each requirement, one searchsorted per achievement over the whole chunk
+    qualified: List[Dict[str, str]] = [{} for _ in range(users)]
+    user_keys = np.arange(users, dtype=np.int64) * SEGMENT
+    for metric, (base, running) in series.items():
+        if metric not in targets:
+            continue
+        keys = running + segment * SEGMENT
+        for requirement, achievement_id in targets[metric]:
+            positions = np.searchsorted(keys, user_keys + requirement, side='left')
+            for u in np.nonzero((base >= requirement) | (positions < ends))[0]:
+                if base[u] >= requirement:
+                    qualified[u][achievement_id] = base_dates[u] or histories[u][0].last_workout_date or ''
+                else:
+                    qualified[u][achievement_id] = at[positions[u]]
+
+    uow = UnitOfWork(engine.storage)
+    for u, user_id in enumerate(user_ids):
+        stats = histories[u][0]
+        unlocked = dict(engine._get_user_unlocked_achievements(user_id))
+        new = {ach_id: date for ach_id, date in qualified[u].items() if ach_id not in unlocked}
+        if new:
+            engine.add_xp(stats, engine.XP_REWARDS['achievement_unlock'] * len(new))
+        for metric in STATS_ONLY_METRICS:
+            for requirement, achievement_id in targets.get(metric, ()):
+                if getattr(stats, metric) >= requirement and achievement_id not in unlocked:
+                    new.setdefault(achievement_id, stats.last_workout_date or datetime.now().isoformat())
+        if not new:
+            continue
+        unlocked.update(new)
+        stats.achievements_unlocked = len(unlocked)
+        uow.save_unlocked(user_id, unlocked)
+        engine.save_user_stats(stats, uow)
+        counts["unlocked"] += len(new)
+    uow.commit()
+    counts["users"] += users
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Unlock achievements members already qualify for")
+    parser.add_argument("--storage-dir", type=Path, default=STORAGE_DIR)
+    parser.add_argument("--ids", nargs="+", default=None, help="only these achievement ids (default: all)")
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    args = parser.parse_args()
+
+    storage = create_storage(args.storage_dir, cache_size=0)
+    engine = GamificationEngine(args.storage_dir, storage)
+    started = time.perf_counter()
+    counts = backfill_achievements(engine, achievement_ids=args.ids, chunk_size=args.chunk_size)
+    storage.close()
+    print(f"Checked {counts['users']} users; unlocked {counts['unlocked']} achievements "
+          f"in {time.perf_counter() - started:.1f} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""
+Achievement Index for FitFlow AI
+Achievement definitions compiled into per-metric sorted threshold arrays,
+so an update finds exactly the achievements it crossed with one bisect per
+changed metric, however many definitions the catalog holds
+"""
+
+from typing import Dict, Iterable, List, Optional
+from bisect import bisect_right
+
+
+# Metrics achievements can count; per-muscle-group counters are 'muscle:<group>'
+STAT_METRICS = ('total_workouts', 'current_streak', 'longest_streak', 'total_sets', 'total_reps', 'level', 'xp')
+MUSCLE_METRIC_PREFIX = 'muscle:'
+
+# Catalogs written before achievements carried a 'metric' field
+LEGACY_CATEGORY_METRICS = {'workout': 'total_workouts', 'streak': 'current_streak'}
+LEGACY_MUSCLE_WORDS = {
+    'chest': 'chest', 'back': 'back', 'leg': 'legs', 'legs': 'legs', 'shoulder': 'shoulders',
+    'shoulders': 'shoulders', 'arm': 'arms', 'arms': 'arms', 'core': 'core', 'cardio': 'cardio'
+}
+
+
+def muscle_metric(muscle_group: str) -> str:
+    return MUSCLE_METRIC_PREFIX + muscle_group
+
+
+def metric_of(achievement: Dict) -> Optional[str]:
+    """The metric an achievement's requirement is measured against (None if it cannot be told)"""
+    if achievement.get('metric'):
+        return achievement['metric']
+    category = achievement.get('category')
+    if category in LEGACY_CATEGORY_METRICS:
+        return LEGACY_CATEGORY_METRICS[category]
+    words = achievement['id'].split('_')
+    if category == 'progress':
+        if 'sets' in words:
+            return 'total_sets'
+        if 'reps' in words:
+            return 'total_reps'
+    if category == 'muscle':
+        for word in words:
+            if word in LEGACY_MUSCLE_WORDS:
+                return muscle_metric(LEGACY_MUSCLE_WORDS[word])
+    return None
+
+
+def metric_values(stats) -> Dict[str, int]:
+    """Every metric's current value for a UserStats"""
+    values = {metric: getattr(stats, metric) for metric in STAT_METRICS}
+    for muscle_group, count in stats.muscle_exercises.items():
+        values[muscle_metric(muscle_group)] = count
+    return values
+
+
+class AchievementIndex:
+    """Per-metric requirement arrays, sorted, with the achievement ids alongside.
+
+    crossed() is a pair of bisects per metric, so its cost depends on the
+    changed metrics and the achievements actually crossed, not on the
+    catalog size.
+    """
+
+    def __init__(self, achievements: Iterable[Dict]):
+        by_metric: Dict[str, List] = {}
+        self.unindexed: List[str] = []
+        for achievement in achievements:
+            metric = metric_of(achievement)
+            if metric is None:
+                self.unindexed.append(achievement['id'])
+                continue
+            by_metric.setdefault(metric, []).append((achievement['requirement'], achievement['id']))
+
+        self.thresholds: Dict[str, List[int]] = {}
+        self.ids: Dict[str, List[str]] = {}
+        for metric, entries in by_metric.items():
+            entries.sort()
+            self.thresholds[metric] = [requirement for requirement, _ in entries]
+            self.ids[metric] = [achievement_id for _, achievement_id in entries]
+
+    def reached(self, metric: str, value: int) -> List[str]:
+        """Achievements on metric whose requirement value meets"""
+        thresholds = self.thresholds.get(metric)
+        if not thresholds:
+            return []
+        return self.ids[metric][:bisect_right(thresholds, value)]
+
+    def crossed(self, before: Dict[str, int], after: Dict[str, int]) -> List[str]:
+        """Achievements whose requirement lies in (before, after] for some metric.
+
+        Metrics missing from before count from zero, so crossed({}, values)
+        is every achievement the values reach.
+        """
+        crossed = []
+        for metric, value in after.items():
+            thresholds = self.thresholds.get(metric)
+            old = before.get(metric, 0)
+            if not thresholds or value <= old:
+                continue
+            crossed.extend(self.ids[metric][bisect_right(thresholds, old):bisect_right(thresholds, value)])
+        return crossed
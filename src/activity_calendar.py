@@ -0,0 +1,127 @@
+"""
+Activity Calendar for FitFlow AI
+Per-member bitmap of the days they worked out, one bit per calendar day, so
+streaks, active-day counts and calendar heatmaps come from a few integer
+operations instead of scanning workout logs
+"""
+
+from typing import List, Optional, Tuple
+from datetime import date, datetime, timedelta
+
+
+class ActivityCalendar:
+    """Active days as bits of a Python int: bit i is the day `start` + i.
+
+    Lives on UserStats as activity_start (ISO date of bit 0) and
+    activity_days (the bits as a hex string, since msgpack integers stop at
+    64 bits), so it is part of the gamification projection and replays
+    rebuild it.
+    """
+
+    __slots__ = ('start', 'bits')
+
+    def __init__(self, start: Optional[date] = None, bits: int = 0):
+        self.start = start
+        self.bits = bits
+
+    @classmethod
+    def from_stats(cls, stats) -> 'ActivityCalendar':
+        if stats.activity_start:
+            return cls(date.fromisoformat(stats.activity_start), int(stats.activity_days or '0', 16))
+        calendar = cls()
+        if stats.last_workout_date and stats.current_streak:
+            # Stats from before the calendar: the current streak is all that is known of their history
+            last = datetime.fromisoformat(stats.last_workout_date).date()
+            calendar.add_run(last - timedelta(days=stats.current_streak - 1), stats.current_streak)
+        return calendar
+
+    def store(self, stats):
+        stats.activity_start = self.start.isoformat() if self.start else None
+        stats.activity_days = format(self.bits, 'x') if self.bits else ''
+
+    def _offset(self, day: date) -> int:
+        return (day - self.start).days
+
+    def add(self, day: date):
+        self.add_run(day, 1)
+
+    def add_run(self, first: date, days: int):
+        """Mark `days` consecutive days starting at first as active"""
+        if self.start is None:
+            self.start = first
+        offset = self._offset(first)
+        if offset < 0:
+            self.bits <<= -offset
+            self.start, offset = first, 0
+        self.bits |= ((1 << days) - 1) << offset
+
+    def is_active(self, day: date) -> bool:
+        if self.start is None:
+            return False
+        offset = self._offset(day)
+        return offset >= 0 and bool(self.bits >> offset & 1)
+
+    def last_day(self) -> Optional[date]:
+        if not self.bits:
+            return None
+        return self.start + timedelta(days=self.bits.bit_length() - 1)
+
+    def run_ending(self, day: date) -> int:
+        """Consecutive active days up to and including day"""
+        if not self.is_active(day):
+            return 0
+        offset = self._offset(day)
+        gaps = ~self.bits & ((1 << (offset + 1)) - 1)
+        return offset + 1 - gaps.bit_length()
+
+    def current_streak(self, today: Optional[date] = None) -> int:
+        """Streak as of today; one still counts until the end of the day after its last workout"""
+        today = today or datetime.now().date()
+        return self.run_ending(today) or self.run_ending(today - timedelta(days=1))
+
+    def longest_streak(self) -> int:
+        """Longest run of active days, in O(log n) big-int operations.
+
+        Doubles the run length while any run of that length exists
+        (runs & runs >> length), then extends by the smaller powers of two.
+        """
+        runs, length = self.bits, 1
+        if not runs:
+            return 0
+        powers = []
+        while True:
+            doubled = runs & (runs >> length)
+            if not doubled:
+                break
+            powers.append((length, runs))
+            runs, length = doubled, length * 2
+        for size, marks in reversed(powers):
+            longer = runs & (marks >> length)
+            if longer:
+                runs, length = longer, length + size
+        return length
+
+    def active_days(self, first: date, last: date) -> int:
+        """Number of active days from first to last inclusive"""
+        if self.start is None or last < first:
+            return 0
+        low, high = max(self._offset(first), 0), self._offset(last)
+        if high < 0:
+            return 0
+        return (self.bits >> low & ((1 << (high - low + 1)) - 1)).bit_count()
+
+    def weeks(self, last: Optional[date] = None, count: int = 53) -> Tuple[List[date], List[List[Optional[int]]]]:
+        """Heatmap grid of the `count` weeks ending with last's week.
+
+        Returns the Monday of each week and seven rows (Monday first) of
+        1 / 0 per week, with None for days after last.
+        """
+        last = last or datetime.now().date()
+        first = last - timedelta(days=last.weekday() + 7 * (count - 1))
+        mondays = [first + timedelta(weeks=week) for week in range(count)]
+        offset = self._offset(first) if self.start else 0
+        window = (self.bits >> offset if offset >= 0 else self.bits << -offset) if self.start else 0
+        rows = [[None] * count for _ in range(7)]
+        for i in range((last - first).days + 1):
+            rows[i % 7][i // 7] = window >> i & 1
+        return mondays, rows
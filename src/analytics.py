@@ -0,0 +1,347 @@
+"""
+Columnar Analytics Store for FitFlow AI
+Keeps a NumPy structured-array copy of workout logs and intensity history
+for gym-wide reporting, with vectorized aggregations over it
+
+    storage/analytics/logs.npy
+                      intensity.npy
+                      users.npy
+                      meta.json   (user ids, category dictionaries, per-user sync watermarks)
+
+Dates are int64 seconds since the epoch (naive timestamps are read as UTC).
+Run as a module to export or incrementally sync from the configured storage:
+    python -m src.analytics sync
+"""
+
+from typing import Dict, Iterable, List, Optional
+from datetime import datetime, timezone
+from pathlib import Path
+import argparse
+import os
+import tempfile
+
+import numpy as np
+
+from config import STORAGE_DIR
+from src.atomic_io import FileLock, read_json, atomic_write_json
+from src.storage import StorageBackend, create_storage
+
+
+SECONDS_PER_DAY = 86400
+
+LOG_DTYPE = np.dtype([
+    ('user', 'i4'),
+    ('date', 'i8'),
+    ('day_number', 'i2'),
+    ('exercises_completed', 'i2'),
+    ('total_exercises', 'i2'),
+    ('duration_minutes', 'i4'),
+    ('calories_burned', 'i4'),
+])
+
+INTENSITY_DTYPE = np.dtype([
+    ('user', 'i4'),
+    ('date', 'i8'),
+    ('total_sets', 'i4'),
+    ('total_reps', 'i4'),
+    ('estimated_volume', 'f8'),
+    ('intensity_score', 'f4'),
+    ('muscles', 'u8'),  # bit i set = muscle_groups[i] was trained
+])
+
+USER_DTYPE = np.dtype([
+    ('gym', 'i4'),
+    ('fitness_goal', 'i4'),
+    ('experience_level', 'i4'),
+    ('days_per_week', 'i2'),
+    ('created_at', 'i8'),
+])
+
+COHORT_FIELDS = ('gym', 'fitness_goal', 'experience_level')
+
+
+def to_epoch(value) -> int:
+    """ISO string or datetime to epoch seconds"""
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return int(value.timestamp())
+
+
+def _save_array(path: Path, array: np.ndarray):
+    fd, tmp_path = tempfile.mkstemp(dir=str(path.parent), prefix=f".{path.name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            np.save(f, array)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+
+
+def _load_array(path: Path, dtype: np.dtype) -> np.ndarray:
+    try:
+        return np.load(path)
+    except FileNotFoundError:
+        return np.empty(0, dtype=dtype)
+
+
+class ColumnarStore:
+    """Columnar copy of logs, intensities and the cohort attributes of each user.
+
+    Users are referred to by their row in ``users``; ``user_ids`` maps the
+    row back to the user_id. String attributes (gym, goal, level, muscle
+    group) are dictionary-encoded, with the dictionaries in ``categories``.
+    """
+
+    def __init__(self, root: Path = STORAGE_DIR / "analytics"):
+        self.root = Path(root)
+        self._load(read_json(self.root / "meta.json", {}))
+        self.logs = _load_array(self.root / "logs.npy", LOG_DTYPE)
+        self.intensity = _load_array(self.root / "intensity.npy", INTENSITY_DTYPE)
+        self.users = _load_array(self.root / "users.npy", USER_DTYPE)
+
+    def _load(self, meta: Dict):
+        self.user_ids: List[str] = meta.get("user_ids", [])
+        self.categories: Dict[str, List[str]] = meta.get("categories", {field: [] for field in COHORT_FIELDS + ('muscle',)})
+        marks = meta.get("watermarks", {})
+        # Per user: logs -> {"date": newest synced date, "ids": log_ids synced at that date},
+        # intensity -> newest synced date (a user's intensity records are keyed by date)
+        self.watermarks: Dict[str, Dict] = {
+            kind: marks[kind] if isinstance(marks.get(kind), dict) else {} for kind in ("logs", "intensity")
+        }
+        # Stores synced before per-user marks had one epoch-seconds mark per kind; it still covers users without one
+        self.legacy_watermarks: Dict[str, int] = meta.get("legacy_watermarks") or {
+            kind: mark for kind, mark in marks.items() if isinstance(mark, int)
+        }
+        self._user_index = {user_id: i for i, user_id in enumerate(self.user_ids)}
+        self._codes = {field: {value: i for i, value in enumerate(values)} for field, values in self.categories.items()}
+
+    def _code(self, field: str, value: str) -> int:
+        codes = self._codes[field]
+        if value not in codes:
+            codes[value] = len(self.categories[field])
+            self.categories[field].append(value)
+        return codes[value]
+
+    def _muscle_mask(self, muscle_groups: Iterable[str]) -> int:
+        mask = 0
+        for muscle in muscle_groups:
+            code = self._code('muscle', muscle)
+            if code >= 64:
+                raise ValueError("The columnar store supports at most 64 distinct muscle groups")
+            mask |= 1 << code
+        return mask
+
+    def _legacy_start(self, kind: str) -> Optional[str]:
+        mark = self.legacy_watermarks.get(kind, -1)
+        return datetime.fromtimestamp(mark, timezone.utc).replace(tzinfo=None).isoformat() if mark >= 0 else None
+
+    def _new_logs(self, storage: StorageBackend, user_id: str) -> List[Dict]:
+        mark = self.watermarks["logs"].get(user_id)
+        if mark is None:
+            legacy = self.legacy_watermarks.get("logs", -1)
+            logs, _ = storage.query_logs(user_id, start=self._legacy_start("logs"))
+            return [log for log in logs if to_epoch(log['date']) > legacy]
+        logs, _ = storage.query_logs(user_id, start=mark['date'])
+        return [log for log in logs if log['date'] > mark['date'] or log['log_id'] not in mark['ids']]
+
+    def _new_intensities(self, storage: StorageBackend, user_id: str) -> List[Dict]:
+        mark = self.watermarks["intensity"].get(user_id)
+        if mark is None:
+            legacy = self.legacy_watermarks.get("intensity", -1)
+            records = storage.query_intensities(user_id, start=self._legacy_start("intensity"))
+            return [record for record in records if to_epoch(record['date']) > legacy]
+        return [record for record in storage.query_intensities(user_id, start=mark) if record['date'] > mark]
+
+    def sync(self, storage: StorageBackend, user_ids: Optional[Iterable[str]] = None) -> Dict[str, int]:
+        """Append records newer than the last sync and refresh user attributes.
+
+        Each user has their own watermark (with the log ids at its date), so
+        only that user's newer records are read. A record back-dated to
+        before its user's previous sync is only seen by a full ``rebuild``.
+        """
+        if user_ids is None:
+            user_ids = storage.iter_user_ids()
+
+        log_rows, intensity_rows, user_rows = [], [], {}
+        log_marks, intensity_marks = {}, {}
+
+        for user_id in user_ids:
+            profile = storage.get_profile(user_id) or {}
+            if user_id not in self._user_index:
+                self._user_index[user_id] = len(self.user_ids)
+                self.user_ids.append(user_id)
+            user = self._user_index[user_id]
+            user_rows[user] = (
+                self._code('gym', profile.get('gym_id', '')),
+                self._code('fitness_goal', profile.get('fitness_goal', '')),
+                self._code('experience_level', profile.get('experience_level', '')),
+                profile.get('days_per_week', 0),
+                to_epoch(profile['created_at']) if profile.get('created_at') else 0,
+            )
+
+            logs = self._new_logs(storage, user_id)
+            for log in logs:
+                log_rows.append((
+                    user, to_epoch(log['date']), log.get('day_number', 0), len(log.get('exercises_completed', [])),
+                    log.get('total_exercises', 0), log.get('duration_minutes', 0), log.get('calories_burned', 0)
+                ))
+            if logs:
+                newest = max(log['date'] for log in logs)
+                mark = self.watermarks["logs"].get(user_id)
+                ids = mark['ids'] if mark is not None and mark['date'] == newest else []
+                ids = ids + [log['log_id'] for log in logs if log['date'] == newest]
+                log_marks[user_id] = {"date": newest, "ids": ids}
+
+            records = self._new_intensities(storage, user_id)
+            for record in records:
+                intensity_rows.append((
+                    user, to_epoch(record['date']), record.get('total_sets', 0), record.get('total_reps', 0),
+                    record.get('estimated_volume', 0.0), record.get('intensity_score', 0.0),
+                    self._muscle_mask(record.get('muscle_groups', []))
+                ))
+            if records:
+                intensity_marks[user_id] = max(record['date'] for record in records)
+
+        new_logs = np.array(log_rows, dtype=LOG_DTYPE)
+        new_intensity = np.array(intensity_rows, dtype=INTENSITY_DTYPE)
+        self.logs = np.concatenate([self.logs, new_logs])
+        self.intensity = np.concatenate([self.intensity, new_intensity])
+
+        users = np.zeros(len(self.user_ids), dtype=USER_DTYPE)
+        users[:len(self.users)] = self.users
+        if user_rows:
+            rows = np.fromiter(user_rows.keys(), dtype=np.int64, count=len(user_rows))
+            users[rows] = np.array(list(user_rows.values()), dtype=USER_DTYPE)
+        self.users = users
+
+        self.watermarks["logs"].update(log_marks)
+        self.watermarks["intensity"].update(intensity_marks)
+        return {"users": len(user_rows), "logs": len(new_logs), "intensity": len(new_intensity)}
+
+    def rebuild(self, storage: StorageBackend) -> Dict[str, int]:
+        """Drop the columnar copy and export everything again"""
+        self._load({})
+        self.logs = np.empty(0, dtype=LOG_DTYPE)
+        self.intensity = np.empty(0, dtype=INTENSITY_DTYPE)
+        self.users = np.empty(0, dtype=USER_DTYPE)
+        return self.sync(storage)
+
+    def save(self):
+        """Write arrays and metadata atomically; meta.json goes last so readers never see new meta with old arrays"""
+        self.root.mkdir(parents=True, exist_ok=True)
+        with FileLock(self.root / "meta.json"):
+            _save_array(self.root / "logs.npy", self.logs)
+            _save_array(self.root / "intensity.npy", self.intensity)
+            _save_array(self.root / "users.npy", self.users)
+            atomic_write_json(self.root / "meta.json", {
+                "user_ids": self.user_ids,
+                "categories": self.categories,
+                "watermarks": self.watermarks,
+                "legacy_watermarks": self.legacy_watermarks,
+            }, indent=None)
+
+
+# Vectorized aggregations
+
+def _in_window(dates: np.ndarray, start: Optional[datetime], end: Optional[datetime]) -> np.ndarray:
+    mask = np.ones(len(dates), dtype=bool)
+    if start is not None:
+        mask &= dates >= to_epoch(start)
+    if end is not None:
+        mask &= dates < to_epoch(end)
+    return mask
+
+
+def _per_day(dates: np.ndarray, weights: Optional[np.ndarray] = None) -> Dict[str, float]:
+    days = dates // SECONDS_PER_DAY
+    if len(days) == 0:
+        return {}
+    first = int(days.min())
+    totals = np.bincount(days - first, weights=weights)
+    nonzero = np.flatnonzero(totals)
+    labels = (nonzero + first).astype('datetime64[D]').astype(str)
+    return dict(zip(labels.tolist(), totals[nonzero].tolist()))
+
+
+def workouts_per_day(store: ColumnarStore, start: Optional[datetime] = None,
+                     end: Optional[datetime] = None) -> Dict[str, int]:
+    """Number of logged workouts per calendar day (UTC)"""
+    logs = store.logs[_in_window(store.logs['date'], start, end)]
+    return {day: int(count) for day, count in _per_day(logs['date']).items()}
+
+
+def calories_per_day(store: ColumnarStore, start: Optional[datetime] = None,
+                     end: Optional[datetime] = None) -> Dict[str, int]:
+    """Calories burned per calendar day (UTC)"""
+    logs = store.logs[_in_window(store.logs['date'], start, end)]
+    totals = _per_day(logs['date'], logs['calories_burned'].astype(np.float64))
+    return {day: int(total) for day, total in totals.items()}
+
+
+def volume_per_muscle(store: ColumnarStore, start: Optional[datetime] = None,
+                      end: Optional[datetime] = None) -> Dict[str, float]:
+    """Estimated volume per muscle group; a session's volume is split evenly across its groups"""
+    rows = store.intensity[_in_window(store.intensity['date'], start, end)]
+    muscles = store.categories['muscle']
+    if len(rows) == 0 or not muscles:
+        return {}
+
+    bits = (rows['muscles'][:, None] >> np.arange(len(muscles), dtype=np.uint64)) & np.uint64(1)
+    bits = bits.astype(np.float64)
+    groups_per_session = np.maximum(bits.sum(axis=1), 1)
+    volume = (rows['estimated_volume'] / groups_per_session) @ bits
+    return {muscle: round(float(v), 2) for muscle, v in zip(muscles, volume)}
+
+
+def adherence_by_cohort(store: ColumnarStore, cohort: str, start: datetime,
+                        end: datetime) -> Dict[str, Dict[str, float]]:
+    """Mean share of planned sessions (days_per_week) completed in [start, end), per cohort.
+
+    cohort is one of 'gym', 'fitness_goal', 'experience_level'.
+    """
+    if cohort not in COHORT_FIELDS:
+        raise ValueError(f"Unknown cohort field: {cohort}")
+
+    users = store.users
+    logs = store.logs[_in_window(store.logs['date'], start, end)]
+    done = np.bincount(logs['user'], minlength=len(users)).astype(np.float64)
+
+    weeks = (to_epoch(end) - to_epoch(start)) / (7 * SECONDS_PER_DAY)
+    planned = users['days_per_week'] * weeks
+    active = planned > 0
+    adherence = np.zeros(len(users))
+    adherence[active] = np.minimum(done[active] / planned[active], 1.0)
+
+    codes = users[cohort][active]
+    labels = store.categories[cohort]
+    members = np.bincount(codes, minlength=len(labels))
+    total = np.bincount(codes, weights=adherence[active], minlength=len(labels))
+
+    return {
+        labels[code]: {"users": int(members[code]), "adherence": round(float(total[code] / members[code]), 4)}
+        for code in np.flatnonzero(members)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Maintain the columnar analytics copy of workout data")
+    parser.add_argument("command", choices=["sync", "rebuild"])
+    parser.add_argument("--storage-dir", type=Path, default=STORAGE_DIR)
+    args = parser.parse_args()
+
+    storage = create_storage(args.storage_dir)
+    store = ColumnarStore(args.storage_dir / "analytics")
+    counts = store.rebuild(storage) if args.command == "rebuild" else store.sync(storage)
+    store.save()
+    storage.close()
+    print("Synced " + ", ".join(f"{n} {kind}" for kind, n in counts.items()))
+
+
+if __name__ == "__main__":
+    main()
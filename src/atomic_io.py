@@ -0,0 +1,257 @@
+"""
+Atomic File I/O for FitFlow AI
+Crash-safe JSON writes (temp file + rename) and per-file writer locks
+shared by threads and processes
+"""
+
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+from pathlib import Path
+import json
+import os
+import tempfile
+import threading
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+
+_thread_locks: Dict[str, threading.Lock] = {}
+_thread_locks_guard = threading.Lock()
+
+
+def _thread_lock_for(path: Path) -> threading.Lock:
+    key = str(path.resolve())
+    with _thread_locks_guard:
+        if key not in _thread_locks:
+            _thread_locks[key] = threading.Lock()
+        return _thread_locks[key]
+
+
+class FileLock:
+    """Exclusive writer lock for a data file, held on a sidecar .lock file.
+
+    Serializes writers across threads (in-process lock) and processes
+    (flock / msvcrt). Readers never take it: writes are atomic renames, so
+    a reader always sees either the old or the new complete file.
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.lock_path = self.path.with_name(self.path.name + ".lock")
+        self._thread_lock = _thread_lock_for(self.path)
+        self._fd = None
+
+    def acquire(self):
+        self._thread_lock.acquire()
+        try:
+            self.lock_path.parent.mkdir(parents=True, exist_ok=True)
+            self._fd = os.open(str(self.lock_path), os.O_RDWR | os.O_CREAT, 0o644)
+            if fcntl is not None:
+                fcntl.flock(self._fd, fcntl.LOCK_EX)
+            else:
+                while True:
+                    try:
+                        msvcrt.locking(self._fd, msvcrt.LK_LOCK, 1)
+                        break
+                    except OSError:
+                        continue
+        except BaseException:
+            self._release_fd()
+            self._thread_lock.release()
+            raise
+
+    def release(self):
+        self._release_fd()
+        self._thread_lock.release()
+
+    def _release_fd(self):
+        if self._fd is None:
+            return
+        try:
+            if fcntl is not None:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+            else:
+                os.lseek(self._fd, 0, os.SEEK_SET)
+                msvcrt.locking(self._fd, msvcrt.LK_UNLCK, 1)
+        finally:
+            os.close(self._fd)
+            self._fd = None
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.release()
+
+
+def read_json(path: Path, default: Any = None) -> Any:
+    """Read a JSON file without locking (safe because writes are atomic)"""
+    try:
+        with open(path, 'r') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return default
+
+
+def atomic_write_json(path: Path, data: Any, indent: int = 2):
+    """Write JSON to a temp file in the same directory, fsync, then rename over the target"""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=str(path.parent), prefix=f".{path.name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, 'w') as f:
+            json.dump(data, f, indent=indent)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+
+
+def update_json(path: Path, default: Callable[[], Any], mutate: Callable[[Any], Any]) -> Any:
+    """Locked read-modify-write: load, apply mutate in place, write atomically.
+
+    Returns whatever mutate returns.
+    """
+    with FileLock(path):
+        data = read_json(path)
+        if data is None:
+            data = default()
+        result = mutate(data)
+        atomic_write_json(path, data)
+        return result
+
+
+def append_json_lines(path: Path, records: List[Any], sort_key: Optional[Callable[[Any], Any]] = None):
+    """Append records as JSON lines under the writer lock and fsync.
+
+    With sort_key the file is kept sorted: records that would land before
+    the current last line trigger a (rare) sorted atomic rewrite instead of
+    an append.
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with FileLock(path):
+        _truncate_unfinished_line(path)
+
+        if sort_key is not None:
+            records = sorted(records, key=sort_key)
+            last = next(iter_json_lines_reversed(path), None)
+            if last is not None and sort_key(records[0]) < sort_key(last):
+                _write_json_lines(path, sorted(read_json_lines(path) + records, key=sort_key))
+                return
+
+        with open(path, 'a') as f:
+            f.write("".join(json.dumps(record) + "\n" for record in records))
+            f.flush()
+            os.fsync(f.fileno())
+
+
+def append_json_lines_after(path: Path, make_records: Callable[[Optional[Any]], List[Any]]) -> List[Any]:
+    """Append the records make_records(last line or None) returns, all under the writer lock; returns them"""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with FileLock(path):
+        _truncate_unfinished_line(path)
+        records = make_records(next(iter_json_lines_reversed(path), None))
+        with open(path, 'a') as f:
+            f.write("".join(json.dumps(record) + "\n" for record in records))
+            f.flush()
+            os.fsync(f.fileno())
+        return records
+
+
+def filter_json_lines(path: Path, keep: Callable[[Any], bool]):
+    """Rewrite a JSON-lines file atomically with only the records keep() accepts"""
+    path = Path(path)
+    with FileLock(path):
+        if path.exists():
+            _write_json_lines(path, [record for record in read_json_lines(path) if keep(record)])
+
+
+def _truncate_unfinished_line(path: Path):
+    """Drop a half-written last line left by a crashed writer (call with the lock held)"""
+    try:
+        with open(path, 'rb+') as f:
+            size = f.seek(0, os.SEEK_END)
+            if size == 0:
+                return
+            f.seek(size - 1)
+            if f.read(1) == b"\n":
+                return
+            f.seek(0)
+            keep = f.read().rfind(b"\n") + 1
+            f.truncate(keep)
+    except FileNotFoundError:
+        pass
+
+
+def _write_json_lines(path: Path, records: List[Any]):
+    fd, tmp_path = tempfile.mkstemp(dir=str(path.parent), prefix=f".{path.name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, 'w') as f:
+            f.write("".join(json.dumps(record) + "\n" for record in records))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+
+
+def read_json_lines(path: Path) -> List[Any]:
+    """Read a JSON-lines file, ignoring a trailing line that is still being written"""
+    try:
+        with open(path, 'r') as f:
+            content = f.read()
+    except FileNotFoundError:
+        return []
+
+    # Anything after the last newline is an append in progress
+    return [json.loads(line) for line in content.split("\n")[:-1] if line]
+
+
+def file_version(path: Path) -> Tuple[int, int, int]:
+    """Cheap change token for a file: atomic renames change the inode, appends the size"""
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return (0, 0, 0)
+    return (st.st_mtime_ns, st.st_size, st.st_ino)
+
+
+def iter_json_lines_reversed(path: Path, block_size: int = 65536) -> Iterator[Any]:
+    """Yield records of a JSON-lines file from last to first, reading backwards in blocks"""
+    try:
+        f = open(path, 'rb')
+    except FileNotFoundError:
+        return
+
+    with f:
+        position = f.seek(0, os.SEEK_END)
+        buffer = b""
+        complete_tail = False  # becomes True once we are past any half-written last line
+        while position > 0:
+            read_size = min(block_size, position)
+            position -= read_size
+            f.seek(position)
+            buffer = f.read(read_size) + buffer
+            lines = buffer.split(b"\n")
+            buffer = lines.pop(0)  # may be cut mid-line; keep for the next block
+            if not complete_tail:
+                if not lines:
+                    continue  # no newline yet: everything read so far is the unfinished tail
+                lines.pop()  # text after the last newline is an append in progress
+                complete_tail = True
+            for line in reversed(lines):
+                if line:
+                    yield json.loads(line)
+        if buffer and complete_tail:
+            yield json.loads(buffer)
@@ -0,0 +1,143 @@
+"""
+Bulk Export / Import for FitFlow AI
+Streams every member's workout logs to CSV or Parquet without loading
+them all into memory, and imports logs exported by other tracking apps
+in batches
+
+    python -m src.bulk_io export logs.csv
+    python -m src.bulk_io export logs.parquet
+    python -m src.bulk_io import other_app.csv --map user_id=member_id --map date=workout_date
+"""
+
+from typing import Dict, Iterable, Iterator, List, Optional
+from datetime import datetime
+from pathlib import Path
+import argparse
+import csv
+import uuid
+
+from config import STORAGE_DIR
+from src.storage import StorageBackend, create_storage
+
+
+LOG_COLUMNS = (
+    'log_id', 'user_id', 'date', 'day_number', 'exercises_completed', 'total_exercises',
+    'duration_minutes', 'calories_burned', 'notes'
+)
+INT_COLUMNS = ('day_number', 'total_exercises', 'duration_minutes', 'calories_burned')
+
+
+def _to_row(log: Dict) -> Dict:
+    row = {column: log.get(column, '') for column in LOG_COLUMNS}
+    row['exercises_completed'] = ";".join(log.get('exercises_completed', []))
+    return row
+
+
+def _chunked(items: Iterable, size: int) -> Iterator[List]:
+    chunk = []
+    for item in items:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def export_logs_csv(storage: StorageBackend, out_path: Path) -> int:
+    """Write every stored log to a CSV file, streaming; returns the number of rows"""
+    count = 0
+    with open(out_path, 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=LOG_COLUMNS)
+        writer.writeheader()
+        for log in storage.iter_logs():
+            writer.writerow(_to_row(log))
+            count += 1
+    return count
+
+
+def export_logs_parquet(storage: StorageBackend, out_path: Path, row_group_size: int = 100_000) -> int:
+    """Write every stored log to a Parquet file, one row group at a time (needs pyarrow)"""
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise ImportError("Parquet export needs the 'pyarrow' package (pip install pyarrow)")
+
+    schema = pa.schema([
+        ('log_id', pa.string()), ('user_id', pa.string()), ('date', pa.timestamp('us')),
+        ('day_number', pa.int32()), ('exercises_completed', pa.list_(pa.string())),
+        ('total_exercises', pa.int32()), ('duration_minutes', pa.int32()),
+        ('calories_burned', pa.int32()), ('notes', pa.string()),
+    ])
+
+    count = 0
+    with pq.ParquetWriter(str(out_path), schema) as writer:
+        for chunk in _chunked(storage.iter_logs(), row_group_size):
+            columns = {name: [log.get(name) for log in chunk] for name in LOG_COLUMNS}
+            columns['date'] = [datetime.fromisoformat(date) for date in columns['date']]
+            writer.write_table(pa.table(columns, schema=schema))
+            count += len(chunk)
+    return count
+
+
+def iter_csv_logs(path: Path, columns: Optional[Dict[str, str]] = None) -> Iterator[Dict]:
+    """Read logs from a CSV file as storage records.
+
+    columns maps our field names to the file's column names for exports
+    from other apps (e.g. {'user_id': 'member_id'}). Missing log_ids are
+    generated; exercises_completed is a ';'-separated list.
+    """
+    columns = columns or {}
+    with open(path, newline='') as f:
+        for row in csv.DictReader(f):
+            values = {field: row.get(columns.get(field, field)) for field in LOG_COLUMNS}
+            if not values['user_id'] or not values['date']:
+                raise ValueError(f"Row {row} has no user_id or date")
+
+            log = {
+                'log_id': values['log_id'] or str(uuid.uuid4()),
+                'user_id': values['user_id'],
+                'date': datetime.fromisoformat(values['date']).isoformat(),
+                'exercises_completed': [e for e in (values['exercises_completed'] or '').split(';') if e],
+                'notes': values['notes'] or '',
+            }
+            for field in INT_COLUMNS:
+                log[field] = int(float(values[field])) if values[field] else 0
+            yield log
+
+
+def import_logs_csv(storage: StorageBackend, path: Path, columns: Optional[Dict[str, str]] = None,
+                    chunk_size: int = 10_000) -> int:
+    """Import a CSV of logs in chunks of chunk_size; returns the number imported"""
+    return storage.import_logs(_chunked(iter_csv_logs(path, columns), chunk_size))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export or import workout logs in bulk")
+    parser.add_argument("--storage-dir", type=Path, default=STORAGE_DIR)
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    export_parser = sub.add_parser("export", help="export every log to .csv or .parquet")
+    export_parser.add_argument("path", type=Path)
+
+    import_parser = sub.add_parser("import", help="import logs from a CSV file")
+    import_parser.add_argument("path", type=Path)
+    import_parser.add_argument("--map", action="append", default=[], metavar="FIELD=COLUMN",
+                               help="read FIELD from the file's COLUMN")
+    import_parser.add_argument("--chunk-size", type=int, default=10_000)
+
+    args = parser.parse_args()
+
+    storage = create_storage(args.storage_dir)
+    if args.command == "export":
+        export = export_logs_parquet if args.path.suffix == ".parquet" else export_logs_csv
+        print(f"Exported {export(storage, args.path)} logs to {args.path}")
+    else:
+        columns = dict(mapping.split("=", 1) for mapping in args.map)
+        print(f"Imported {import_logs_csv(storage, args.path, columns, args.chunk_size)} logs")
+    storage.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""
+Candidate Pool for FitFlow AI
+Shared exercise retrievals for workout generation, so plans for members with
+the same gym, muscle split and level reuse one vector query
+
+The query text depends only on the muscle groups and experience level; the
+gym just filters the ranked results by equipment. So ranked ids are cached
+per (muscle groups, level) for the current catalog version, and filtered
+pools per (gym_id, muscle groups, level) tagged with the gym's equipment
+version. RAGEngine.reload_catalog and set_gym_equipment bump those versions,
+which makes the affected entries miss on their next lookup.
+
+Queries and filtering run outside the cache lock, so a slow build never
+holds up lookups of other pools; concurrent misses on the same pool wait
+for the one build already in flight instead of repeating it.
+"""
+
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+import threading
+
+from src.rag_engine import RAGEngine
+
+
+SplitKey = Tuple[Tuple[str, ...], str]  # (muscle groups, experience level)
+
+
+def query_text(muscle_groups: Sequence[str], level: str) -> str:
+    return f"{', '.join(muscle_groups)} exercises for {level} level"
+
+
+class CandidatePool:
+    """Process-wide cache of candidate exercises per (gym, muscle split, level).
+
+    Returned lists are shared between callers and must not be modified.
+    """
+
+    def __init__(self, rag: RAGEngine, n_results: int = 20):
+        self.rag = rag
+        self.n_results = n_results
+        self._ranked: Dict[SplitKey, List[str]] = {}
+        self._ranked_version = rag.catalog_version
+        # (gym_id, muscle groups, level) -> ((catalog version, gym version), exercises)
+        self._pools: Dict[Tuple[str, Tuple[str, ...], str], Tuple[Tuple[int, int], List[Dict]]] = {}
+        self._building: Dict[Tuple[str, Tuple[str, ...], str], threading.Event] = {}  # pools being built
+        self._lock = threading.Lock()
+        self.queries = 0  # vector queries run, for monitoring and benchmarks
+
+    def get(self, gym_id: str, muscle_groups: Sequence[str], level: str) -> List[Dict]:
+        """Up to n_results exercises for the split that the gym can do"""
+        groups = tuple(muscle_groups)
+        key = (gym_id, groups, level)
+        version = (self.rag.catalog_version, self.rag.gym_version(gym_id))
+        while True:
+            with self._lock:
+                cached = self._pools.get(key)
+                if cached is not None and cached[0] == version:
+                    return cached[1]
+                building = self._building.get(key)
+                if building is None:
+                    building = self._building[key] = threading.Event()
+                    break
+            building.wait()  # then look again; if that build failed, this caller builds
+
+        try:
+            ranked = self._ranked_ids([(groups, level)])[(groups, level)]
+            pool = self.rag.filter_exercises(ranked, gym_id, list(groups), n_results=self.n_results)
+            with self._lock:
+                self._pools[key] = (version, pool)
+            return pool
+        finally:
+            with self._lock:
+                del self._building[key]
+            building.set()
+
+    def _ranked_ids(self, splits: Iterable[SplitKey]) -> Dict[SplitKey, List[str]]:
+        """Ranked ids for each split, querying the ones not cached in one batch"""
+        splits = list(dict.fromkeys(splits))
+        with self._lock:
+            if self._ranked_version != self.rag.catalog_version:
+                self._ranked.clear()
+                self._ranked_version = self.rag.catalog_version
+            catalog_version = self._ranked_version
+            found = {split: self._ranked[split] for split in splits if split in self._ranked}
+        missing = [split for split in splits if split not in found]
+        if missing:
+            ranked = self.rag.rank_exercises([query_text(*split) for split in missing], self.n_results * 2)
+            found.update(zip(missing, ranked))
+            with self._lock:
+                self.queries += 1
+                if self._ranked_version == catalog_version:
+                    self._ranked.update(zip(missing, ranked))
+        return {split: found[split] for split in splits}
+
+    def warm(self, splits: Iterable[SplitKey], gym_ids: Optional[Iterable[str]] = None) -> int:
+        """Fill the pools for these splits at every gym (default: all gyms); returns pools built"""
+        splits = list(dict.fromkeys((tuple(groups), level) for groups, level in splits))
+        gym_ids = [gym['gym_id'] for gym in self.rag.gyms_data] if gym_ids is None else list(gym_ids)
+        self._ranked_ids(splits)
+        built = 0
+        for gym_id in gym_ids:
+            for groups, level in splits:
+                self.get(gym_id, groups, level)
+                built += 1
+        return built
+
+    def invalidate(self, gym_id: Optional[str] = None):
+        """Drop cached pools for one gym, or everything"""
+        with self._lock:
+            if gym_id is None:
+                self._ranked.clear()
+                self._pools.clear()
+            else:
+                for key in [key for key in self._pools if key[0] == gym_id]:
+                    del self._pools[key]
+
+    def __len__(self) -> int:
+        return len(self._pools)
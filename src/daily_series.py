@@ -0,0 +1,87 @@
+"""
+Daily Series for FitFlow AI
+Dense per-calendar-day totals with prefix sums, so the total over any
+window of days is O(1) no matter how many sessions fell on each day
+"""
+
+from typing import Dict, Optional
+from datetime import date, timedelta
+
+
+class DailySeries:
+    """Per-day totals for a run of consecutive calendar days.
+
+    Wraps a JSON-friendly dict so it can live inside a stored document:
+    'start' is the first day and each field is a prefix-sum list where
+    field[i] is the total of the days before start + i (so a series of
+    n days has n + 1 entries).
+    """
+
+    FIELDS = ('sessions', 'active_days', 'light_sessions', 'intensity_sum', 'volume')
+
+    def __init__(self, data: Optional[Dict] = None):
+        self.data = data if data is not None else self.empty()
+
+    @classmethod
+    def empty(cls) -> Dict:
+        return {'start': None, **{field: [0] for field in cls.FIELDS}}
+
+    def __len__(self) -> int:
+        return len(self.data['sessions']) - 1
+
+    def _offset(self, day: str) -> int:
+        return (date.fromisoformat(day) - date.fromisoformat(self.data['start'])).days
+
+    def extend_to(self, day: str):
+        """Make day part of the series, padding with empty days on either side"""
+        if self.data['start'] is None:
+            self.data['start'] = day
+        offset = self._offset(day)
+        if offset < 0:
+            for field in self.FIELDS:
+                prefix = self.data[field]
+                self.data[field] = [prefix[0]] * -offset + prefix
+            self.data['start'] = day
+        elif offset >= len(self):
+            missing = offset + 1 - len(self)
+            for field in self.FIELDS:
+                prefix = self.data[field]
+                prefix.extend([prefix[-1]] * missing)
+
+    def add(self, day: str, **values):
+        """Add values to one day's totals (O(1) for the latest day)"""
+        self.extend_to(day)
+        index = self._offset(day)
+        for field, value in values.items():
+            prefix = self.data[field]
+            for i in range(index + 1, len(prefix)):
+                prefix[i] += value
+
+    def trim(self, first_day: str):
+        """Drop the days before first_day"""
+        if self.data['start'] is None:
+            return
+        drop = self._offset(first_day)
+        if drop <= 0:
+            return
+        if drop >= len(self):
+            for field in self.FIELDS:
+                self.data[field] = [self.data[field][-1]]
+            self.data['start'] = first_day
+            return
+        for field in self.FIELDS:
+            self.data[field] = self.data[field][drop:]
+        self.data['start'] = (date.fromisoformat(self.data['start']) + timedelta(days=drop)).isoformat()
+
+    def sum(self, field: str, first_day: str, last_day: str):
+        """Total of field over first_day..last_day inclusive"""
+        if self.data['start'] is None:
+            return 0
+        prefix = self.data[field]
+        i = min(max(self._offset(first_day), 0), len(self))
+        j = min(max(self._offset(last_day) + 1, 0), len(self))
+        return prefix[j] - prefix[i] if j > i else 0
+
+    def window(self, first_day: str, last_day: str) -> Dict:
+        """Every field's total over first_day..last_day inclusive"""
+        return {field: self.sum(field, first_day, last_day) for field in self.FIELDS}
@@ -1,16 +1,31 @@
 """
 Gamification System for FitFlow AI
 Handles achievements, streaks, levels, and user progression
+
+Workout completions are appended to a per-user event log; stats, streaks,
+XP and unlocks are projections of it (apply_completion), so they can be
+rebuilt after a rule change with rebuild_user or src/gamification_replay.py.
 """
 
-from dataclasses import dataclass, asdict
-from typing import List, Dict, Optional
+from dataclasses import dataclass, asdict, field
+from typing import List, Dict, Optional, Tuple
 from datetime import datetime, timedelta
-import json
 from pathlib import Path
+from bisect import bisect_right
+import copy
+import hashlib
+import json
+import threading
+from config import XP_LEVEL_GROWTH
+from src.storage import StorageBackend, create_storage
+from src.achievement_index import AchievementIndex, metric_of, metric_values, muscle_metric
+from src.leaderboard import Leaderboards, week_key, month_key
+from src.activity_calendar import ActivityCalendar
+from src.atomic_io import FileLock, atomic_write_json, read_json, file_version
+from src.unit_of_work import UnitOfWork
 
 
-@dataclass
+@dataclass(slots=True)
 class Achievement:
     """Represents a single achievement"""
     id: str
@@ -21,9 +36,10 @@ class Achievement:
     requirement: int
     unlocked: bool = False
     unlocked_date: Optional[str] = None
+    metric: Optional[str] = None  # stat the requirement counts, e.g. total_sets or muscle:chest
 
 
-@dataclass
+@dataclass(slots=True)
 class UserStats:
     """User statistics for gamification"""
     user_id: str
@@ -36,16 +52,62 @@ class UserStats:
     total_reps: int = 0
     achievements_unlocked: int = 0
     last_workout_date: Optional[str] = None
+    muscle_exercises: Dict[str, int] = field(default_factory=dict)  # exercises done per muscle group
+    gym_id: Optional[str] = None
+    week_key: Optional[str] = None  # ISO week of week_volume, e.g. 2026-W42
+    week_volume: int = 0  # reps this week
+    month_key: Optional[str] = None  # e.g. 2026-10
+    month_workouts: int = 0
+    event_seq: int = 0  # last event applied to these stats
+    activity_start: Optional[str] = None  # first day of activity_days
+    activity_days: str = ''  # ActivityCalendar bits, one per day, as hex
+
+
+class XPCurve:
+    """Cumulative XP needed to reach each level, with no level cap.
+    
+    Levels in the base table keep their thresholds; after them each level
+    costs `growth` times the one before (rounded to 50 XP). The cumulative
+    table only grows as far as the XP values asked about, and level lookups
+    are a bisect over it.
+    """
+    
+    ROUNDING = 50
+    
+    def __init__(self, base: Dict[int, int], growth: float = XP_LEVEL_GROWTH):
+        self.cumulative = [base[level] for level in sorted(base)]  # cumulative[level - 1]
+        self.growth = growth
+        self._step = self.cumulative[-1] - self.cumulative[-2]
+        self._lock = threading.Lock()  # the curve is shared by every session
+    
+    def _extend(self, levels: int = 0, xp: int = -1):
+        """Grow the table to at least `levels` entries and past `xp`"""
+        with self._lock:
+            while len(self.cumulative) < levels or self.cumulative[-1] <= xp:
+                self._step = max(self.ROUNDING, round(self._step * self.growth / self.ROUNDING) * self.ROUNDING)
+                self.cumulative.append(self.cumulative[-1] + self._step)
+    
+    def xp_for_level(self, level: int) -> int:
+        """Total XP at which level is reached"""
+        if len(self.cumulative) < level:
+            self._extend(levels=level)
+        return self.cumulative[max(level, 1) - 1]
+    
+    def level_for_xp(self, xp: int) -> int:
+        if self.cumulative[-1] <= xp:
+            self._extend(xp=xp)
+        return max(1, bisect_right(self.cumulative, xp))
 
 
 class GamificationEngine:
     """Manages gamification features"""
     
-    # XP required for each level
+    # XP required for each level (the curve continues past 10, see XPCurve)
     XP_REQUIREMENTS = {
         1: 0, 2: 100, 3: 250, 4: 500, 5: 850,
         6: 1300, 7: 1900, 8: 2600, 9: 3500, 10: 5000
     }
+    XP_CURVE = XPCurve(XP_REQUIREMENTS)
     
     # XP rewards
     XP_REWARDS = {
@@ -56,74 +118,79 @@ class GamificationEngine:
         'perfect_form': 25
     }
     
-    def __init__(self, storage_dir: Path):
+    # Bump when apply_completion changes, so snapshots taken by the old code are not reused
+    PROJECTION_VERSION = 2
+    SNAPSHOT_DOCUMENT = 'gamification_snapshot'
+    SNAPSHOT_EVERY = 50  # events between projection snapshots
+    
+    def __init__(self, storage_dir: Path, storage: Optional[StorageBackend] = None,
+                 leaderboards: Optional[Leaderboards] = None):
         self.storage_dir = storage_dir
+        self.storage = storage or create_storage(storage_dir)
+        self.leaderboards = leaderboards
         self.achievements_file = storage_dir / "achievements.json"
-        self.user_stats_file = storage_dir / "user_stats.json"
+        self._catalog = None  # (file version, parsed achievements.json, AchievementIndex, entries by id)
+        self._rules = None  # (catalog file version, hash of the achievement rules)
+        # Completions for one user are projected one at a time
+        self._user_locks: Dict[str, threading.Lock] = {}
+        self._user_locks_guard = threading.Lock()
         self._initialize_achievements()
     
-    def _initialize_achievements(self):
-        """Initialize default achievements if file doesn't exist"""
-        if not self.achievements_file.exists():
-            default_achievements = [
-                # Workout Achievements
-                Achievement("first_workout", "First Step", "Complete your first workout", "🎯", "workout", 1),
-                Achievement("iron_beginner", "Iron Beginner", "Complete 10 workouts", "🏋️", "workout", 10),
-                Achievement("fitness_warrior", "Fitness Warrior", "Complete 50 workouts", "💪", "workout", 50),
-                Achievement("gym_legend", "Gym Legend", "Complete 100 workouts", "👑", "workout", 100),
-                
-                # Streak Achievements
-                Achievement("streak_3", "Getting Started", "3-day workout streak", "🔥", "streak", 3),
-                Achievement("streak_7", "Week Warrior", "7-day workout streak", "⚡", "streak", 7),
-                Achievement("streak_30", "Consistency King", "30-day workout streak", "👑", "streak", 30),
-                Achievement("streak_100", "Unstoppable", "100-day workout streak", "🌟", "streak", 100),
-                
-                # Volume Achievements
-                Achievement("hundred_sets", "Century Club", "Complete 100 total sets", "💯", "progress", 100),
-                Achievement("thousand_reps", "Rep Master", "Complete 1000 total reps", "🔢", "progress", 1000),
-                
-                # Muscle Group Achievements
-                Achievement("chest_champion", "Chest Champion", "Complete 20 chest exercises", "🦅", "muscle", 20),
-                Achievement("back_beast", "Back Beast", "Complete 20 back exercises", "🦁", "muscle", 20),
-                Achievement("leg_legend", "Leg Legend", "Complete 20 leg exercises", "🦵", "muscle", 20),
-            ]
+    def _initialize_achievements(self) -> List[str]:
+        """Write the default achievements, adding any missing from an existing file; returns the added ids"""
+        default_achievements = [
+            # Workout Achievements
+            Achievement("first_workout", "First Step", "Complete your first workout", "🎯", "workout", 1, metric="total_workouts"),
+            Achievement("iron_beginner", "Iron Beginner", "Complete 10 workouts", "🏋️", "workout", 10, metric="total_workouts"),
+            Achievement("fitness_warrior", "Fitness Warrior", "Complete 50 workouts", "💪", "workout", 50, metric="total_workouts"),
+            Achievement("gym_legend", "Gym Legend", "Complete 100 workouts", "👑", "workout", 100, metric="total_workouts"),
+            
+            # Streak Achievements
+            Achievement("streak_3", "Getting Started", "3-day workout streak", "🔥", "streak", 3, metric="current_streak"),
+            Achievement("streak_7", "Week Warrior", "7-day workout streak", "⚡", "streak", 7, metric="current_streak"),
+            Achievement("streak_30", "Consistency King", "30-day workout streak", "👑", "streak", 30, metric="current_streak"),
+            Achievement("streak_100", "Unstoppable", "100-day workout streak", "🌟", "streak", 100, metric="current_streak"),
+            
+            # Volume Achievements
+            Achievement("hundred_sets", "Century Club", "Complete 100 total sets", "💯", "progress", 100, metric="total_sets"),
+            Achievement("thousand_reps", "Rep Master", "Complete 1000 total reps", "🔢", "progress", 1000, metric="total_reps"),
             
-            self._save_achievements([asdict(a) for a in default_achievements])
+            # Muscle Group Achievements
+            Achievement("chest_champion", "Chest Champion", "Complete 20 chest exercises", "🦅", "muscle", 20, metric=muscle_metric("chest")),
+            Achievement("back_beast", "Back Beast", "Complete 20 back exercises", "🦁", "muscle", 20, metric=muscle_metric("back")),
+            Achievement("leg_legend", "Leg Legend", "Complete 20 leg exercises", "🦵", "muscle", 20, metric=muscle_metric("legs")),
+        ]
+        
+        current = read_json(self.achievements_file, [])
+        known = {ach['id'] for ach in current}
+        added = [asdict(a) for a in default_achievements if a.id not in known]
+        if added:
+            self._save_achievements(current + added)
+        return [ach['id'] for ach in added]
     
     def get_user_stats(self, user_id: str) -> UserStats:
         """Get user statistics"""
-        if not self.user_stats_file.exists():
-            return UserStats(user_id=user_id)
-        
-        with open(self.user_stats_file, 'r') as f:
-            all_stats = json.load(f)
-        
-        user_data = all_stats.get(user_id, {"user_id": user_id})
+        user_data = self.storage.get_user_stats(user_id) or {"user_id": user_id}
         return UserStats(**user_data)
-    
-    def save_user_stats(self, stats: UserStats):
-        """Save user statistics"""
-        all_stats = {}
-        if self.user_stats_file.exists():
-            with open(self.user_stats_file, 'r') as f:
-                all_stats = json.load(f)
-        
-        all_stats[stats.user_id] = asdict(stats)
-        
-        with open(self.user_stats_file, 'w') as f:
-            json.dump(all_stats, f, indent=2)
+
+    def get_activity_calendar(self, user_id: str) -> ActivityCalendar:
+        """The days a user worked out, for streaks, active-day counts and heatmaps"""
+        return ActivityCalendar.from_stats(self.get_user_stats(user_id))
+
+    def save_user_stats(self, stats: UserStats, uow: Optional[UnitOfWork] = None):
+        """Save user statistics (staged on uow when given)"""
+        (uow or self.storage).save_user_stats(stats.user_id, asdict(stats))
     
     def get_achievements(self, user_id: str) -> List[Achievement]:
         """Get all achievements with unlock status"""
-        with open(self.achievements_file, 'r') as f:
-            achievements_data = json.load(f)
+        achievements_data = self._load_achievement_catalog()
         
         # Load user's unlocked achievements
         user_unlocked = self._get_user_unlocked_achievements(user_id)
         
         achievements = []
         for ach_data in achievements_data:
-            ach = Achievement(**ach_data)
+            ach = self._build_achievement(ach_data)
             if ach.id in user_unlocked:
                 ach.unlocked = True
                 ach.unlocked_date = user_unlocked[ach.id]
@@ -131,67 +198,87 @@ class GamificationEngine:
         
         return achievements
     
+    def _load_achievement_catalog(self) -> List[Dict]:
+        """Parsed achievements.json, re-read (and re-indexed) only when the file changes"""
+        version = file_version(self.achievements_file)
+        if self._catalog is None or self._catalog[0] != version:
+            catalog = read_json(self.achievements_file, [])
+            self._catalog = (version, catalog, AchievementIndex(catalog), {a['id']: a for a in catalog})
+        return self._catalog[1]
+    
+    def _achievement_index(self) -> AchievementIndex:
+        self._load_achievement_catalog()
+        return self._catalog[2]
+    
+    @staticmethod
+    def _build_achievement(ach_data: Dict) -> Achievement:
+        ach = Achievement(**ach_data)
+        ach.metric = metric_of(ach_data)
+        return ach
+    
     def _get_user_unlocked_achievements(self, user_id: str) -> Dict[str, str]:
         """Get user's unlocked achievements"""
-        unlocked_file = self.storage_dir / f"unlocked_{user_id}.json"
-        if not unlocked_file.exists():
-            return {}
-        
-        with open(unlocked_file, 'r') as f:
-            return json.load(f)
+        return self.storage.get_unlocked(user_id)
     
     def _save_achievements(self, achievements: List[Dict]):
         """Save achievements to file"""
-        with open(self.achievements_file, 'w') as f:
-            json.dump(achievements, f, indent=2)
+        with FileLock(self.achievements_file):
+            atomic_write_json(self.achievements_file, achievements)
     
-    def check_and_unlock_achievements(self, user_id: str, stats: UserStats) -> List[Achievement]:
-        """Check and unlock new achievements"""
-        achievements = self.get_achievements(user_id)
+    def check_and_unlock_achievements(self, user_id: str, stats: UserStats,
+                                      achievements: Optional[List[Achievement]] = None,
+                                      uow: Optional[UnitOfWork] = None,
+                                      previous: Optional[Dict[str, int]] = None) -> List[Achievement]:
+        """Check and unlock new achievements (updates achievements in place when passed).
+        
+        previous is metric_values() from before the update; only achievements
+        crossed since then are considered. Without it every reached one is.
+        """
+        crossed = self._achievement_index().crossed(previous or {}, metric_values(stats))
+        unlocked_date = datetime.now().isoformat()
         newly_unlocked = []
         
-        for ach in achievements:
-            if ach.unlocked:
-                continue
-            
-            # Check conditions based on category
-            if ach.category == "workout" and stats.total_workouts >= ach.requirement:
-                ach.unlocked = True
-                ach.unlocked_date = datetime.now().isoformat()
-                newly_unlocked.append(ach)
-            
-            elif ach.category == "streak" and stats.current_streak >= ach.requirement:
-                ach.unlocked = True
-                ach.unlocked_date = datetime.now().isoformat()
-                newly_unlocked.append(ach)
-            
-            elif ach.category == "progress":
-                if "sets" in ach.id and stats.total_sets >= ach.requirement:
+        if achievements is not None:
+            by_id = {ach.id: ach for ach in achievements}
+            for ach_id in crossed:
+                ach = by_id.get(ach_id)
+                if ach is not None and not ach.unlocked:
                     ach.unlocked = True
-                    ach.unlocked_date = datetime.now().isoformat()
-                    newly_unlocked.append(ach)
-                elif "reps" in ach.id and stats.total_reps >= ach.requirement:
-                    ach.unlocked = True
-                    ach.unlocked_date = datetime.now().isoformat()
+                    ach.unlocked_date = unlocked_date
                     newly_unlocked.append(ach)
+            if newly_unlocked:
+                self._save_unlocked_achievements(user_id, achievements, uow)
+            return newly_unlocked
         
-        # Save unlocked achievements
+        unlocked = dict(self._get_user_unlocked_achievements(user_id))
+        newly_unlocked = self._unlock(crossed, unlocked, unlocked_date)
         if newly_unlocked:
-            self._save_unlocked_achievements(user_id, achievements)
-        
+            (uow or self.storage).save_unlocked(user_id, unlocked)
         return newly_unlocked
     
-    def _save_unlocked_achievements(self, user_id: str, achievements: List[Achievement]):
+    def _unlock(self, achievement_ids: List[str], unlocked: Dict[str, str], unlocked_date: str) -> List[Achievement]:
+        """Record the given achievements in unlocked (in place) unless already there; returns the new ones.
+        Only these are built, not the whole catalog."""
+        catalog = self._catalog[3]
+        newly_unlocked = []
+        for ach_id in achievement_ids:
+            if ach_id not in unlocked:
+                ach = self._build_achievement(catalog[ach_id])
+                ach.unlocked = True
+                ach.unlocked_date = unlocked[ach_id] = unlocked_date
+                newly_unlocked.append(ach)
+        return newly_unlocked
+    
+    def _save_unlocked_achievements(self, user_id: str, achievements: List[Achievement],
+                                    uow: Optional[UnitOfWork] = None):
         """Save unlocked achievements for user"""
-        unlocked_file = self.storage_dir / f"unlocked_{user_id}.json"
         unlocked = {
             ach.id: ach.unlocked_date 
             for ach in achievements 
             if ach.unlocked and ach.unlocked_date
         }
         
-        with open(unlocked_file, 'w') as f:
-            json.dump(unlocked, f, indent=2)
+        (uow or self.storage).save_unlocked(user_id, unlocked)
     
     def add_xp(self, stats: UserStats, xp_amount: int) -> Dict:
         """Add XP and handle level ups"""
@@ -199,9 +286,7 @@ class GamificationEngine:
         old_level = stats.level
         
         # Check for level up
-        for level, required_xp in self.XP_REQUIREMENTS.items():
-            if stats.xp >= required_xp:
-                stats.level = level
+        stats.level = self.XP_CURVE.level_for_xp(stats.xp)
         
         leveled_up = stats.level > old_level
         
@@ -215,8 +300,8 @@ class GamificationEngine:
     
     def get_level_progress(self, stats: UserStats) -> Dict:
         """Get progress to next level"""
-        current_level_xp = self.XP_REQUIREMENTS.get(stats.level, 0)
-        next_level_xp = self.XP_REQUIREMENTS.get(stats.level + 1, current_level_xp)
+        current_level_xp = self.XP_CURVE.xp_for_level(stats.level)
+        next_level_xp = self.XP_CURVE.xp_for_level(stats.level + 1)
         
         xp_in_current_level = stats.xp - current_level_xp
         xp_needed_for_next = next_level_xp - current_level_xp
@@ -231,50 +316,206 @@ class GamificationEngine:
             "progress_percentage": min(100, progress_percentage)
         }
     
-    def update_workout_completion(self, user_id: str, exercises_completed: int, total_sets: int, total_reps: int) -> Dict:
-        """Update stats when workout is completed"""
-        stats = self.get_user_stats(user_id)
-        
-        # Update streak
-        today = datetime.now().date()
-        last_workout = datetime.fromisoformat(stats.last_workout_date).date() if stats.last_workout_date else None
+    def rules_fingerprint(self) -> str:
+        """Identifies the rules projections are computed with (XP, levels, achievement catalog)"""
+        catalog = self._load_achievement_catalog()
+        if self._rules is None or self._rules[0] != self._catalog[0]:
+            achievements = sorted((a['id'], metric_of(a), a['requirement']) for a in catalog)
+            self._rules = (self._catalog[0], hashlib.sha1(json.dumps(achievements).encode()).hexdigest())
+        rules = {
+            'projection': self.PROJECTION_VERSION,
+            'xp_requirements': self.XP_REQUIREMENTS,
+            'xp_growth': self.XP_CURVE.growth,
+            'xp_rewards': self.XP_REWARDS,
+            'achievements': self._rules[1],
+        }
+        return hashlib.sha1(json.dumps(rules, sort_keys=True).encode()).hexdigest()
+    
+    def apply_completion(self, stats: UserStats, unlocked: Dict[str, str], event: Dict) -> Dict:
+        """Project one workout_completed event onto stats and unlocked (both updated in place).
         
-        if last_workout:
-            days_diff = (today - last_workout).days
-            if days_diff == 1:
-                stats.current_streak += 1
-            elif days_diff > 1:
-                stats.current_streak = 1
-        else:
-            stats.current_streak = 1
+        Everything is derived from the event, including today's date, so
+        replaying a user's log reproduces the same state.
+        """
+        previous = metric_values(stats)
+        today = datetime.fromisoformat(event['at']).date()
         
+        # Update streak: the run of active days ending at the latest one
+        calendar = ActivityCalendar.from_stats(stats)
+        calendar.add(today)
+        calendar.store(stats)
+        stats.current_streak = calendar.run_ending(calendar.last_day())
         stats.longest_streak = max(stats.longest_streak, stats.current_streak)
-        stats.last_workout_date = datetime.now().isoformat()
+        stats.last_workout_date = event['at']
         
         # Update workout stats
         stats.total_workouts += 1
-        stats.total_sets += total_sets
-        stats.total_reps += total_reps
+        stats.total_sets += event['total_sets']
+        stats.total_reps += event['total_reps']
+        muscle_exercises = dict(stats.muscle_exercises)  # stored stats may be a shared cached value
+        for muscle_group, count in event.get('muscle_groups', {}).items():
+            muscle_exercises[muscle_group] = muscle_exercises.get(muscle_group, 0) + count
+        stats.muscle_exercises = muscle_exercises
+        
+        # Period totals for the weekly / monthly leaderboards
+        stats.gym_id = event.get('gym_id') or stats.gym_id
+        if stats.week_key != week_key(today):
+            stats.week_key, stats.week_volume = week_key(today), 0
+        stats.week_volume += event['total_reps']
+        if stats.month_key != month_key(today):
+            stats.month_key, stats.month_workouts = month_key(today), 0
+        stats.month_workouts += 1
         
         # Add XP
         xp_result = self.add_xp(stats, self.XP_REWARDS['workout_complete'])
         
         # Check achievements
-        newly_unlocked = self.check_and_unlock_achievements(user_id, stats)
+        crossed = self._achievement_index().crossed(previous, metric_values(stats))
+        newly_unlocked = self._unlock(crossed, unlocked, event['at'])
         
         # Bonus XP for achievements
-        if newly_unlocked:
-            for _ in newly_unlocked:
-                self.add_xp(stats, self.XP_REWARDS['achievement_unlock'])
+        for _ in newly_unlocked:
+            self.add_xp(stats, self.XP_REWARDS['achievement_unlock'])
+        
+        stats.achievements_unlocked = len(unlocked)
+        stats.event_seq = event['seq']
+        
+        return {"xp_result": xp_result, "newly_unlocked": newly_unlocked}
+    
+    def _user_lock(self, user_id: str) -> threading.Lock:
+        with self._user_locks_guard:
+            return self._user_locks.setdefault(user_id, threading.Lock())
+    
+    def update_workout_completion(self, user_id: str, exercises_completed: int, total_sets: int, total_reps: int,
+                                  uow: Optional[UnitOfWork] = None,
+                                  muscle_groups: Optional[Dict[str, int]] = None,
+                                  gym_id: Optional[str] = None) -> Dict:
+        """Record a completed workout and update the projections (writes are staged on uow when given).
         
-        stats.achievements_unlocked = len([a for a in self.get_achievements(user_id) if a.unlocked])
+        muscle_groups counts the workout's exercises per muscle group.
+        The event's seq is only final once storage has it: a direct write
+        projects with the seq storage assigned, and a unit of work whose
+        event was moved past someone else's (another process, or a completion
+        still queued for write-behind) has its projections rebuilt from the
+        log after it commits.
+        """
+        with self._user_lock(user_id):
+            return self._record_completion(user_id, exercises_completed, total_sets, total_reps, uow,
+                                           muscle_groups, gym_id)
+    
+    def _record_completion(self, user_id: str, exercises_completed: int, total_sets: int, total_reps: int,
+                           uow: Optional[UnitOfWork], muscle_groups: Optional[Dict[str, int]],
+                           gym_id: Optional[str]) -> Dict:
+        target = uow or self.storage
+        stats = self.get_user_stats(user_id)
+        unlocked = dict(self._get_user_unlocked_achievements(user_id))
+        before = asdict(stats) if self.leaderboards is not None else None
+        if stats.event_seq == 0 and stats.total_workouts:
+            # Stats from before the event log: keep them as the base every replay starts from
+            self._save_snapshot(user_id, stats, unlocked, target, base=True)
         
-        # Save stats
-        self.save_user_stats(stats)
+        # Storage moves seq past the last stored event if another writer got there first
+        event = {
+            'seq': stats.event_seq + 1,
+            'type': 'workout_completed',
+            'at': datetime.now().isoformat(),
+            'exercises_completed': exercises_completed,
+            'total_sets': total_sets,
+            'total_reps': total_reps,
+            'muscle_groups': dict(muscle_groups or {}),
+            'gym_id': gym_id,
+        }
+        if uow is None:
+            stored = self.storage.append_event(user_id, event)
+            if stored['seq'] != event['seq']:
+                stats, unlocked = self._replay(user_id, before_seq=stored['seq'])
+            event = stored
+        else:
+            uow.append_event(user_id, event)
+        result = self.apply_completion(stats, unlocked, event)
+        
+        # Save projections
+        if result['newly_unlocked']:
+            target.save_unlocked(user_id, unlocked)
+        self.save_user_stats(stats, uow)
+        if stats.event_seq % self.SNAPSHOT_EVERY == 0:
+            self._save_snapshot(user_id, stats, unlocked, target)
+        self._update_leaderboards(user_id, before, stats, uow)
+        if uow is not None:
+            uow.after_commit(lambda: self._check_sequenced(user_id, event))
         
         return {
             "stats": stats,
-            "xp_result": xp_result,
-            "newly_unlocked": newly_unlocked,
+            "xp_result": result['xp_result'],
+            "newly_unlocked": result['newly_unlocked'],
             "streak_milestone": stats.current_streak in [3, 7, 14, 30, 50, 100]
-        }
\ No newline at end of file
+        }
+    
+    def _save_snapshot(self, user_id: str, stats: UserStats, unlocked: Dict[str, str], target, base: bool = False):
+        """Store the projections at stats.event_seq as the latest snapshot (or as the pre-log base)"""
+        document = dict(self.storage.get_user_document(self.SNAPSHOT_DOCUMENT, user_id) or {})
+        document['base' if base else 'latest'] = {
+            'seq': stats.event_seq,
+            'rules': None if base else self.rules_fingerprint(),
+            'stats': asdict(stats),
+            'unlocked': dict(unlocked),
+        }
+        target.save_user_document(self.SNAPSHOT_DOCUMENT, user_id, document)
+    
+    def rebuild_user(self, user_id: str, uow: Optional[UnitOfWork] = None, full: bool = False) -> Optional[UserStats]:
+        """Recompute a user's stats and unlocks from their event log and save them.
+        
+        Replay starts from the latest snapshot when it was taken under the
+        current rules (unless full), otherwise from the pre-log base or from
+        scratch. Returns None for users with nothing to replay.
+        """
+        document = self.storage.get_user_document(self.SNAPSHOT_DOCUMENT, user_id) or {}
+        if not document and self.get_user_stats(user_id).event_seq == 0:
+            return None  # no events yet: the stored stats are all there is
+        
+        before = asdict(self.get_user_stats(user_id)) if self.leaderboards is not None else None
+        stats, unlocked = self._replay(user_id, full=full, document=document)
+        
+        target = uow or self.storage
+        self.save_user_stats(stats, uow)
+        target.save_unlocked(user_id, unlocked)
+        if stats.event_seq:
+            self._save_snapshot(user_id, stats, unlocked, target)
+        self._update_leaderboards(user_id, before, stats, uow)
+        return stats
+    
+    def _replay(self, user_id: str, full: bool = False, before_seq: Optional[int] = None,
+                document: Optional[Dict] = None) -> Tuple[UserStats, Dict[str, str]]:
+        """Projections from the latest usable snapshot (see rebuild_user) plus the logged events
+        after it, stopping before before_seq when given"""
+        if document is None:
+            document = self.storage.get_user_document(self.SNAPSHOT_DOCUMENT, user_id) or {}
+        start = document.get('latest')
+        if (full or start is None or start['rules'] != self.rules_fingerprint()
+                or (before_seq is not None and start['seq'] >= before_seq)):
+            start = document.get('base')
+        stats = UserStats(**copy.deepcopy(start['stats'])) if start else UserStats(user_id=user_id)
+        unlocked = dict(start['unlocked']) if start else {}
+        for event in self.storage.get_events(user_id, stats.event_seq):
+            if before_seq is not None and event['seq'] >= before_seq:
+                break
+            self.apply_completion(stats, unlocked, event)
+        return stats, unlocked
+    
+    def _check_sequenced(self, user_id: str, event: Dict):
+        """After a unit of work commits: if storage moved its event to a later seq, the projections
+        it saved were computed without the event that took that seq, so rebuild them from the log"""
+        if self.storage.get_events(user_id, event['seq'] - 1)[:1] != [event]:
+            with self._user_lock(user_id):
+                self.rebuild_user(user_id)
+    
+    def _update_leaderboards(self, user_id: str, before: Optional[Dict], stats: UserStats,
+                             uow: Optional[UnitOfWork]):
+        """Move the user on the boards once the new stats are stored (after uow commits, when given)"""
+        if self.leaderboards is None:
+            return
+        after = asdict(stats)
+        if uow is None:
+            self.leaderboards.update(user_id, before, after)
+        else:
+            uow.after_commit(lambda: self.leaderboards.update(user_id, before, after))
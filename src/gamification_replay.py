@@ -0,0 +1,67 @@
+"""
+Gamification Replay for FitFlow AI
+Rebuilds every member's stats, streaks, XP and unlocked achievements from
+their workout completion events
+
+    python -m src.gamification_replay            # from each user's latest snapshot
+    python -m src.gamification_replay --full     # ignore snapshots, replay whole logs
+
+Snapshots taken under different rules (XP tables, achievement catalog,
+GamificationEngine.PROJECTION_VERSION) are skipped automatically, so after
+a rule change the plain command already replays from the start. Users are
+written in batches of --chunk-size (one transaction on SQLite). Run it while
+the app is stopped; running apps rebuild their leaderboards on restart.
+"""
+
+from typing import Dict, Iterable, List, Optional
+from pathlib import Path
+import argparse
+import time
+
+from config import STORAGE_DIR
+from src.gamification import GamificationEngine
+from src.storage import create_storage
+from src.unit_of_work import UnitOfWork
+
+
+def replay_all(engine: GamificationEngine, user_ids: Optional[Iterable[str]] = None, full: bool = False,
+               chunk_size: int = 1000) -> Dict[str, int]:
+    """Rebuild the given users (default: everyone); returns counts"""
+    counts = {"users": 0, "rebuilt": 0}
+    chunk: List[str] = []
+    for user_id in (engine.storage.iter_user_ids() if user_ids is None else user_ids):
+        chunk.append(user_id)
+        if len(chunk) >= chunk_size:
+            _replay_chunk(engine, chunk, full, counts)
+            chunk = []
+    if chunk:
+        _replay_chunk(engine, chunk, full, counts)
+    return counts
+
+
+def _replay_chunk(engine: GamificationEngine, user_ids: List[str], full: bool, counts: Dict[str, int]):
+    uow = UnitOfWork(engine.storage)
+    for user_id in user_ids:
+        if engine.rebuild_user(user_id, uow, full=full) is not None:
+            counts["rebuilt"] += 1
+    uow.commit()
+    counts["users"] += len(user_ids)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rebuild gamification state from the event log")
+    parser.add_argument("--storage-dir", type=Path, default=STORAGE_DIR)
+    parser.add_argument("--full", action="store_true", help="replay every log from the start")
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    args = parser.parse_args()
+
+    storage = create_storage(args.storage_dir, cache_size=0)
+    engine = GamificationEngine(args.storage_dir, storage)
+    started = time.perf_counter()
+    counts = replay_all(engine, full=args.full, chunk_size=args.chunk_size)
+    storage.close()
+    print(f"Rebuilt {counts['rebuilt']} of {counts['users']} users in {time.perf_counter() - started:.1f} s")
+
+
+if __name__ == "__main__":
+    main()
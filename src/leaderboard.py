@@ -0,0 +1,341 @@
+"""
+Leaderboards for FitFlow AI
+Per-gym rankings by XP, current streak, weekly volume and workouts per
+month, kept in memory as sorted structures and updated in O(log n) on each
+workout completion
+
+Windowed boards are keyed by period ('2026-W42', '2026-10'), so a new week
+or month simply starts an empty board; only the last WINDOWS_KEPT periods
+of each are held. Streak boards are keyed by day: a streak whose last
+workout was on day D is on the boards for D and D + 1, the days it still
+counts (ActivityCalendar.current_streak), so lapsed streaks drop off at
+midnight without rescoring anyone.
+"""
+
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+from bisect import bisect_left, insort
+from datetime import date, datetime, timedelta
+import threading
+
+
+ALL_TIME = 'all'
+
+# Board metric -> (UserStats score field, UserStats window field or None for all-time)
+METRICS = {
+    'xp': ('xp', None),
+    'streak': ('current_streak', 'last_workout_date'),  # day windows, see streak_windows
+    'weekly_volume': ('week_volume', 'week_key'),
+    'monthly_workouts': ('month_workouts', 'month_key'),
+}
+WINDOWS_KEPT = 2
+
+BoardKey = Tuple[str, str, str]  # (metric, gym_id, window)
+Entry = Tuple[int, str, float]  # (rank, user_id, score)
+
+
+def week_key(day: date) -> str:
+    year, week, _ = day.isocalendar()
+    return f"{year}-W{week:02d}"
+
+
+def month_key(day: date) -> str:
+    return f"{day.year}-{day.month:02d}"
+
+
+def streak_windows(last_workout_date: Optional[str]) -> List[str]:
+    """Days a streak ending with last_workout_date still counts: that day and the next"""
+    if not last_workout_date:
+        return []
+    last = datetime.fromisoformat(last_workout_date).date()
+    return [last.isoformat(), (last + timedelta(days=1)).isoformat()]
+
+
+def current_window(metric: str, day: Optional[date] = None) -> str:
+    window_field = METRICS[metric][1]
+    day = day or datetime.now().date()
+    if window_field is None:
+        return ALL_TIME
+    if window_field == 'last_workout_date':
+        return day.isoformat()
+    return week_key(day) if window_field == 'week_key' else month_key(day)
+
+
+def board_scores(stats: Dict) -> Dict[BoardKey, float]:
+    """Every board a stored stats record appears on, with its score there"""
+    gym_id = stats.get('gym_id') or ''
+    scores = {}
+    for metric, (score_field, window_field) in METRICS.items():
+        if window_field is None:
+            windows = [ALL_TIME]
+        elif window_field == 'last_workout_date':
+            windows = streak_windows(stats.get(window_field))
+        else:
+            windows = [stats.get(window_field)]
+        score = stats.get(score_field) or 0
+        for window in windows:
+            if window and score:
+                scores[(metric, gym_id, window)] = score
+    return scores
+
+
+class SortedKeyList:
+    """Sorted list of comparable items kept in buckets of LOAD to 2 * LOAD.
+
+    Insert and remove touch one bucket (a bisect over the bucket maxima plus
+    an insort); positions come from a Fenwick tree over the bucket lengths,
+    so index() and slicing are O(log n) to find the start.
+    """
+
+    LOAD = 512
+
+    def __init__(self, items: Iterable = ()):
+        items = sorted(items)
+        self._buckets = [items[i:i + self.LOAD] for i in range(0, len(items), self.LOAD)]
+        self._maxes = [bucket[-1] for bucket in self._buckets]
+        self._len = len(items)
+        self._build_tree()
+
+    def __len__(self) -> int:
+        return self._len
+
+    def _build_tree(self):
+        tree = [0] + [len(bucket) for bucket in self._buckets]
+        for i in range(1, len(tree)):
+            parent = i + (i & -i)
+            if parent < len(tree):
+                tree[parent] += tree[i]
+        self._tree = tree
+
+    def _tree_add(self, bucket: int, delta: int):
+        i = bucket + 1
+        while i < len(self._tree):
+            self._tree[i] += delta
+            i += i & -i
+
+    def _before(self, bucket: int) -> int:
+        """Number of items in the buckets before this one"""
+        total, i = 0, bucket
+        while i > 0:
+            total += self._tree[i]
+            i -= i & -i
+        return total
+
+    def _locate(self, index: int) -> Tuple[int, int]:
+        """(bucket, offset) of the item at position index"""
+        bucket, step = 0, 1 << len(self._tree).bit_length()
+        while step:
+            nxt = bucket + step
+            if nxt < len(self._tree) and self._tree[nxt] <= index:
+                bucket = nxt
+                index -= self._tree[nxt]
+            step >>= 1
+        return bucket, index
+
+    def add(self, item):
+        if not self._buckets:
+            self._buckets, self._maxes, self._len = [[item]], [item], 1
+            self._build_tree()
+            return
+        i = min(bisect_left(self._maxes, item), len(self._buckets) - 1)
+        bucket = self._buckets[i]
+        insort(bucket, item)
+        self._maxes[i] = bucket[-1]
+        self._len += 1
+        if len(bucket) > 2 * self.LOAD:
+            self._buckets.insert(i + 1, bucket[self.LOAD:])
+            del bucket[self.LOAD:]
+            self._maxes[i] = bucket[-1]
+            self._maxes.insert(i + 1, self._buckets[i + 1][-1])
+            self._build_tree()
+        else:
+            self._tree_add(i, 1)
+
+    def remove(self, item):
+        i = bisect_left(self._maxes, item)
+        bucket = self._buckets[i] if i < len(self._buckets) else []
+        j = bisect_left(bucket, item)
+        if j == len(bucket) or bucket[j] != item:
+            raise ValueError(f"{item!r} not in list")
+        del bucket[j]
+        self._len -= 1
+        if bucket:
+            self._maxes[i] = bucket[-1]
+            self._tree_add(i, -1)
+        else:
+            del self._buckets[i], self._maxes[i]
+            self._build_tree()
+
+    def index(self, item) -> int:
+        i = bisect_left(self._maxes, item)
+        if i == len(self._buckets):
+            raise ValueError(f"{item!r} not in list")
+        bucket = self._buckets[i]
+        j = bisect_left(bucket, item)
+        if j == len(bucket) or bucket[j] != item:
+            raise ValueError(f"{item!r} not in list")
+        return self._before(i) + j
+
+    def islice(self, start: int, stop: int) -> Iterator:
+        """Items at positions start..stop-1"""
+        start, stop = max(start, 0), min(stop, self._len)
+        if start >= stop:
+            return
+        bucket, offset = self._locate(start)
+        remaining = stop - start
+        while remaining > 0:
+            chunk = self._buckets[bucket][offset:offset + remaining]
+            yield from chunk
+            remaining -= len(chunk)
+            bucket, offset = bucket + 1, 0
+
+
+class Board:
+    """One ranking, highest score first (ties broken by user id)"""
+
+    def __init__(self, scores: Optional[Dict[str, float]] = None):
+        self.scores = dict(scores or {})
+        self._order = SortedKeyList((-score, user_id) for user_id, score in self.scores.items())
+
+    def __len__(self) -> int:
+        return len(self.scores)
+
+    def update(self, user_id: str, score: float):
+        old = self.scores.get(user_id)
+        if old == score:
+            return
+        if old is not None:
+            self._order.remove((-old, user_id))
+        self.scores[user_id] = score
+        self._order.add((-score, user_id))
+
+    def remove(self, user_id: str):
+        old = self.scores.pop(user_id, None)
+        if old is not None:
+            self._order.remove((-old, user_id))
+
+    def rank(self, user_id: str) -> Optional[int]:
+        """1-based rank, or None when the user is not on the board"""
+        score = self.scores.get(user_id)
+        return None if score is None else self._order.index((-score, user_id)) + 1
+
+    def entries(self, start: int, stop: int) -> List[Entry]:
+        """Entries at 0-based positions start..stop-1"""
+        start = max(start, 0)
+        return [
+            (start + i + 1, user_id, -negated)
+            for i, (negated, user_id) in enumerate(self._order.islice(start, stop))
+        ]
+
+    def top(self, k: int = 10) -> List[Entry]:
+        return self.entries(0, k)
+
+    def around(self, user_id: str, n: int = 2) -> List[Entry]:
+        """The user's entry with up to n neighbours above and below"""
+        rank = self.rank(user_id)
+        if rank is None:
+            return []
+        return self.entries(rank - 1 - n, rank + n)
+
+
+class Leaderboards:
+    """Every board, keyed by (metric, gym_id, window), for one app process.
+
+    Built from stored stats with load(), or on first use when created with
+    a storage backend, then kept current by update() once
+    GamificationEngine's writes are committed.
+    """
+
+    def __init__(self, storage=None):
+        self._boards: Dict[BoardKey, Board] = {}
+        self._lock = threading.Lock()
+        self._storage = storage  # boards are built from it on first use
+
+    @classmethod
+    def load(cls, storage) -> 'Leaderboards':
+        """Bulk-build the boards from every user's stored stats"""
+        leaderboards = cls()
+        leaderboards._build(storage)
+        return leaderboards
+
+    def _build(self, storage):
+        grouped: Dict[BoardKey, Dict[str, float]] = {}
+        for stats in storage.iter_user_stats():
+            for key, score in board_scores(stats).items():
+                grouped.setdefault(key, {})[stats['user_id']] = score
+        recent = self._recent_windows(grouped)
+        self._boards = {
+            key: Board(scores) for key, scores in grouped.items() if key[2] in recent[(key[0], key[1])]
+        }
+
+    def _ensure_loaded(self):
+        """Build the boards from storage if that has not happened yet (lock held)"""
+        if self._storage is not None:
+            storage, self._storage = self._storage, None
+            self._build(storage)
+
+    @staticmethod
+    def _recent_windows(keys: Iterable[BoardKey]) -> Dict[Tuple[str, str], set]:
+        windows: Dict[Tuple[str, str], List[str]] = {}
+        for metric, gym_id, window in keys:
+            windows.setdefault((metric, gym_id), []).append(window)
+        return {family: set(sorted(found)[-WINDOWS_KEPT:]) for family, found in windows.items()}
+
+    def _board(self, key: BoardKey) -> Board:
+        board = self._boards.get(key)
+        if board is None:
+            board = self._boards[key] = Board()
+            metric, gym_id, window = key
+            if window != ALL_TIME:
+                # A new period started: drop the ones that fell out of the kept range
+                family = [k for k in self._boards if k[0] == metric and k[1] == gym_id]
+                keep = self._recent_windows(family)[(metric, gym_id)]
+                for old in family:
+                    if old[2] not in keep:
+                        del self._boards[old]
+        return board
+
+    def update(self, user_id: str, before: Optional[Dict], after: Dict):
+        """Move a user from their scores in stats `before` to those in `after`"""
+        old = board_scores(before) if before else {}
+        new = board_scores(after)
+        # Past periods keep their final scores; a gym change moves the user's current ones
+        current = {(metric, window) for metric, _, window in new}
+        with self._lock:
+            self._ensure_loaded()
+            for key in old.keys() - new.keys():
+                metric, _, window = key
+                board = self._boards.get(key)
+                if board is not None and (window == ALL_TIME or (metric, window) in current):
+                    board.remove(user_id)
+            for key, score in new.items():
+                if old.get(key) != score or key not in self._boards:
+                    self._board(key).update(user_id, score)
+
+    def _get(self, metric: str, gym_id: str, window: Optional[str]) -> Optional[Board]:
+        return self._boards.get((metric, gym_id or '', window or current_window(metric)))
+
+    def top(self, metric: str, gym_id: str, k: int = 10, window: Optional[str] = None) -> List[Entry]:
+        """Best k of a board (window defaults to the current period)"""
+        with self._lock:
+            self._ensure_loaded()
+            board = self._get(metric, gym_id, window)
+            return board.top(k) if board else []
+
+    def rank(self, metric: str, gym_id: str, user_id: str, window: Optional[str] = None) -> Optional[int]:
+        with self._lock:
+            self._ensure_loaded()
+            board = self._get(metric, gym_id, window)
+            return board.rank(user_id) if board else None
+
+    def around(self, metric: str, gym_id: str, user_id: str, n: int = 2,
+               window: Optional[str] = None) -> List[Entry]:
+        with self._lock:
+            self._ensure_loaded()
+            board = self._get(metric, gym_id, window)
+            return board.around(user_id, n) if board else []
+
+    def size(self, metric: str, gym_id: str, window: Optional[str] = None) -> int:
+        with self._lock:
+            self._ensure_loaded()
+            board = self._get(metric, gym_id, window)
+            return len(board) if board else 0
@@ -0,0 +1,130 @@
+"""
+Muscle Activation Model for FitFlow AI
+Exercise x muscle activation matrix built from the exercise catalog, and
+per-user muscle fatigue that decays exponentially between sessions
+
+Fatigue is measured in activation-weighted sets: 4 sets of bench press
+add 4.0 to chest, 2.0 to triceps and 1.6 to front delts, and every
+muscle's fatigue halves each FATIGUE_HALF_LIFE_HOURS.
+"""
+
+from typing import Dict, Iterable, List, Optional, Tuple
+from datetime import datetime
+from pathlib import Path
+import json
+import math
+
+import numpy as np
+
+from config import EXERCISES_FILE
+
+
+# Regions drawn on the muscle heatmap, in vector order
+FINE_MUSCLES = (
+    'chest', 'front_delts', 'rear_delts', 'biceps', 'forearms', 'triceps', 'abs',
+    'upper_back', 'lower_back', 'quads', 'glutes', 'hamstrings', 'calves'
+)
+MUSCLE_INDEX = {muscle: i for i, muscle in enumerate(FINE_MUSCLES)}
+
+# Coarse catalog muscle groups; also the fallback activation for exercises without one
+COARSE_GROUPS = {
+    'chest': ('chest',),
+    'shoulders': ('front_delts', 'rear_delts'),
+    'arms': ('biceps', 'forearms', 'triceps'),
+    'core': ('abs',),
+    'back': ('upper_back', 'lower_back'),
+    'legs': ('quads', 'glutes', 'hamstrings', 'calves'),
+    'cardio': ('quads', 'hamstrings', 'calves'),
+}
+FINE_TO_COARSE = {
+    fine: coarse for coarse, fines in COARSE_GROUPS.items() if coarse != 'cardio' for fine in fines
+}
+
+FATIGUE_HALF_LIFE_HOURS = 48.0
+DECAY_PER_HOUR = math.log(2) / FATIGUE_HALF_LIFE_HOURS
+
+
+class ActivationMatrix:
+    """Exercise x fine-muscle activation weights, one row per catalog exercise.
+
+    The catalog is small (tens of exercises x 13 muscles), so the matrix is
+    kept dense; a session's muscle load is its sets vector times the matrix.
+    """
+
+    def __init__(self, exercises: List[Dict]):
+        self.exercise_ids = [exercise['id'] for exercise in exercises]
+        self.index = {exercise_id: row for row, exercise_id in enumerate(self.exercise_ids)}
+        self.matrix = np.zeros((len(exercises), len(FINE_MUSCLES)))
+        self.default_sets = np.zeros(len(exercises))
+
+        for row, exercise in enumerate(exercises):
+            activation = exercise.get('activation') or {
+                muscle: 1.0 for muscle in COARSE_GROUPS.get(exercise['muscle_group'], ())
+            }
+            for muscle, weight in activation.items():
+                self.matrix[row, MUSCLE_INDEX[muscle]] = weight
+            self.default_sets[row] = sum(exercise.get('sets_range', [3, 3])) / 2
+
+    @classmethod
+    def load(cls, path: Path = EXERCISES_FILE) -> 'ActivationMatrix':
+        with open(path, 'r') as f:
+            return cls(json.load(f)['exercises'])
+
+    def sets_vector(self, sets: Dict[str, float]) -> np.ndarray:
+        """Per-exercise sets as a catalog-ordered vector (unknown exercises are ignored)"""
+        vector = np.zeros(len(self.exercise_ids))
+        for exercise_id, count in sets.items():
+            row = self.index.get(exercise_id)
+            if row is not None:
+                vector[row] += count
+        return vector
+
+    def session_load(self, sets: Dict[str, float]) -> np.ndarray:
+        """Fatigue added to each fine muscle by one session"""
+        return self.sets_vector(sets) @ self.matrix
+
+    def default_session_sets(self, exercise_ids: Iterable[str]) -> Dict[str, float]:
+        """Typical sets per exercise, for logs that only record which exercises were done"""
+        return {
+            exercise_id: self.default_sets[self.index[exercise_id]]
+            for exercise_id in exercise_ids if exercise_id in self.index
+        }
+
+    def history_fatigue(self, sessions: List[Tuple[datetime, Dict[str, float]]], at: datetime) -> np.ndarray:
+        """Fatigue at `at` from a whole history of (time, {exercise_id: sets}) in one pass:
+        a sessions x exercises matmul for the loads, then a decay-weighted sum."""
+        if not sessions:
+            return np.zeros(len(FINE_MUSCLES))
+        sets = np.zeros((len(sessions), len(self.exercise_ids)))
+        hours = np.empty(len(sessions))
+        for i, (when, session_sets) in enumerate(sessions):
+            hours[i] = (at - when).total_seconds() / 3600
+            for exercise_id, count in session_sets.items():
+                row = self.index.get(exercise_id)
+                if row is not None:
+                    sets[i, row] += count
+        weights = np.where(hours >= 0, np.exp(-DECAY_PER_HOUR * np.maximum(hours, 0)), 0.0)
+        return weights @ (sets @ self.matrix)
+
+
+def decay(fatigue: np.ndarray, hours: float) -> np.ndarray:
+    """Fatigue left after `hours` without training"""
+    return fatigue * math.exp(-DECAY_PER_HOUR * max(hours, 0.0))
+
+
+def add_session(fatigue: np.ndarray, fatigue_at: Optional[datetime], load: np.ndarray,
+                when: datetime) -> Tuple[np.ndarray, datetime]:
+    """Fold a session's load into fatigue measured at fatigue_at; returns (fatigue, measured at).
+    Sessions older than fatigue_at are decayed to it instead."""
+    if fatigue_at is None or when >= fatigue_at:
+        hours = 0.0 if fatigue_at is None else (when - fatigue_at).total_seconds() / 3600
+        return decay(fatigue, hours) + load, when
+    return fatigue + decay(load, (fatigue_at - when).total_seconds() / 3600), fatigue_at
+
+
+def to_vector(values: Dict[str, float]) -> np.ndarray:
+    return np.array([values.get(muscle, 0.0) for muscle in FINE_MUSCLES])
+
+
+def to_dict(fatigue: np.ndarray) -> Dict[str, float]:
+    return {muscle: round(float(value), 4) for muscle, value in zip(FINE_MUSCLES, fatigue)}
@@ -3,13 +3,27 @@ Muscle Heatmap Component for FitFlow AI
 Generates interactive body diagram showing workout coverage
 """
 
-from typing import Dict, List
+from typing import Dict, List, Optional
 
+from src.muscle_activation import FINE_TO_COARSE
 
-def generate_muscle_heatmap_svg(muscle_status: Dict[str, Dict]) -> str:
+
+# Fatigue (activation-weighted sets) at or above which a region gets each color;
+# with a 48h half-life a 10-set session steps down after about 2, 4 and 6 days, as in the legend
+FATIGUE_COLOR_THRESHOLDS = (
+    (5.0, "red"),
+    (2.5, "orange"),
+    (1.2, "yellow"),
+    (0.01, "blue"),
+)
+
+
+def generate_muscle_heatmap_svg(muscle_status: Dict[str, Dict], fatigue: Optional[Dict[str, float]] = None) -> str:
     """
     Generate SVG body diagram with color-coded muscles
     muscle_status: Dict with muscle names and their status data
+    fatigue: optional per-region fatigue (see src/muscle_activation.py); when
+    given, each region is colored from its own fatigue instead of its muscle group
     """
     
     # Color mapping
@@ -30,6 +44,21 @@ def generate_muscle_heatmap_svg(muscle_status: Dict[str, Dict]) -> str:
             return colors.get(muscle_status[muscle_name]["color"], default_color)
         return default_color
     
+    # Color and tooltip for a fine-grained region (e.g. 'biceps')
+    def region_color(region: str) -> str:
+        if fatigue is None:
+            return get_color(FINE_TO_COARSE[region])
+        for threshold, color in FATIGUE_COLOR_THRESHOLDS:
+            if fatigue.get(region, 0.0) >= threshold:
+                return colors[color]
+        return default_color
+    
+    def region_title(region: str, label: str) -> str:
+        if fatigue is not None and fatigue.get(region, 0.0) >= FATIGUE_COLOR_THRESHOLDS[-1][0]:
+            return f"{label} - fatigue {fatigue[region]:.1f} sets"
+        days = muscle_status.get(FINE_TO_COARSE[region], {}).get('days_since_workout', 'Never')
+        return f"{label} - {days} days ago"
+    
     svg = f"""
     <svg viewBox="0 0 1000 750" xmlns="http://www.w3.org/2000/svg" style="max-width: 100%; height: auto; background: linear-gradient(135deg, #1A1A2E 0%, #16213E 100%); border-radius: 16px; padding: 20px;">
         
@@ -48,43 +77,43 @@ def generate_muscle_heatmap_svg(muscle_status: Dict[str, Dict]) -> str:
             
             <!-- Shoulders -->
             <g class="muscle-group">
-                <circle cx="185" cy="145" r="25" fill="{get_color('shoulders')}" opacity="0.9" stroke="#FFF" stroke-width="2"/>
-                <circle cx="315" cy="145" r="25" fill="{get_color('shoulders')}" opacity="0.9" stroke="#FFF" stroke-width="2"/>
-                <title>Shoulders - {muscle_status.get('shoulders', {}).get('days_since_workout', 'Never')} days ago</title>
+                <circle cx="185" cy="145" r="25" fill="{region_color('front_delts')}" opacity="0.9" stroke="#FFF" stroke-width="2"/>
+                <circle cx="315" cy="145" r="25" fill="{region_color('front_delts')}" opacity="0.9" stroke="#FFF" stroke-width="2"/>
+                <title>{region_title('front_delts', 'Shoulders')}</title>
             </g>
             
             <!-- Chest -->
             <g class="muscle-group">
-                <ellipse cx="220" cy="180" rx="32" ry="40" fill="{get_color('chest')}" opacity="0.9" stroke="#FFF" stroke-width="2"/>
-                <ellipse cx="280" cy="180" rx="32" ry="40" fill="{get_color('chest')}" opacity="0.9" stroke="#FFF" stroke-width="2"/>
-                <title>Chest - {muscle_status.get('chest', {}).get('days_since_workout', 'Never')} days ago</title>
+                <ellipse cx="220" cy="180" rx="32" ry="40" fill="{region_color('chest')}" opacity="0.9" stroke="#FFF" stroke-width="2"/>
+                <ellipse cx="280" cy="180" rx="32" ry="40" fill="{region_color('chest')}" opacity="0.9" stroke="#FFF" stroke-width="2"/>
+                <title>{region_title('chest', 'Chest')}</title>
             </g>
             
             <!-- Biceps -->
             <g class="muscle-group">
-                <ellipse cx="155" cy="190" rx="15" ry="35" fill="{get_color('arms')}" opacity="0.9" stroke="#FFF" stroke-width="2"/>
-                <ellipse cx="345" cy="190" rx="15" ry="35" fill="{get_color('arms')}" opacity="0.9" stroke="#FFF" stroke-width="2"/>
-                <title>Biceps - {muscle_status.get('arms', {}).get('days_since_workout', 'Never')} days ago</title>
+                <ellipse cx="155" cy="190" rx="15" ry="35" fill="{region_color('biceps')}" opacity="0.9" stroke="#FFF" stroke-width="2"/>
+                <ellipse cx="345" cy="190" rx="15" ry="35" fill="{region_color('biceps')}" opacity="0.9" stroke="#FFF" stroke-width="2"/>
+                <title>{region_title('biceps', 'Biceps')}</title>
             </g>
             
             <!-- Forearms -->
             <g class="muscle-group">
-                <rect x="145" y="230" width="20" height="50" rx="10" fill="{get_color('arms')}" opacity="0.8" stroke="#FFF" stroke-width="1"/>
-                <rect x="335" y="230" width="20" height="50" rx="10" fill="{get_color('arms')}" opacity="0.8" stroke="#FFF" stroke-width="1"/>
-                <title>Forearms - {muscle_status.get('arms', {}).get('days_since_workout', 'Never')} days ago</title>
+                <rect x="145" y="230" width="20" height="50" rx="10" fill="{region_color('forearms')}" opacity="0.8" stroke="#FFF" stroke-width="1"/>
+                <rect x="335" y="230" width="20" height="50" rx="10" fill="{region_color('forearms')}" opacity="0.8" stroke="#FFF" stroke-width="1"/>
+                <title>{region_title('forearms', 'Forearms')}</title>
             </g>
             
             <!-- Core/Abs -->
             <g class="muscle-group">
-                <rect x="210" y="225" width="80" height="70" rx="12" fill="{get_color('core')}" opacity="0.9" stroke="#FFF" stroke-width="2"/>
-                <title>Core - {muscle_status.get('core', {}).get('days_since_workout', 'Never')} days ago</title>
+                <rect x="210" y="225" width="80" height="70" rx="12" fill="{region_color('abs')}" opacity="0.9" stroke="#FFF" stroke-width="2"/>
+                <title>{region_title('abs', 'Core')}</title>
             </g>
             
             <!-- Quads -->
             <g class="muscle-group">
-                <rect x="215" y="300" width="30" height="105" rx="15" fill="{get_color('legs')}" opacity="0.9" stroke="#FFF" stroke-width="2"/>
-                <rect x="255" y="300" width="30" height="105" rx="15" fill="{get_color('legs')}" opacity="0.9" stroke="#FFF" stroke-width="2"/>
-                <title>Quads - {muscle_status.get('legs', {}).get('days_since_workout', 'Never')} days ago</title>
+                <rect x="215" y="300" width="30" height="105" rx="15" fill="{region_color('quads')}" opacity="0.9" stroke="#FFF" stroke-width="2"/>
+                <rect x="255" y="300" width="30" height="105" rx="15" fill="{region_color('quads')}" opacity="0.9" stroke="#FFF" stroke-width="2"/>
+                <title>{region_title('quads', 'Quads')}</title>
             </g>
             
             <!-- Label -->
@@ -107,47 +136,47 @@ def generate_muscle_heatmap_svg(muscle_status: Dict[str, Dict]) -> str:
             
             <!-- Rear Shoulders -->
             <g class="muscle-group">
-                <circle cx="185" cy="145" r="25" fill="{get_color('shoulders')}" opacity="0.7" stroke="#FFF" stroke-width="1"/>
-                <circle cx="315" cy="145" r="25" fill="{get_color('shoulders')}" opacity="0.7" stroke="#FFF" stroke-width="1"/>
-                <title>Rear Shoulders - {muscle_status.get('shoulders', {}).get('days_since_workout', 'Never')} days ago</title>
+                <circle cx="185" cy="145" r="25" fill="{region_color('rear_delts')}" opacity="0.7" stroke="#FFF" stroke-width="1"/>
+                <circle cx="315" cy="145" r="25" fill="{region_color('rear_delts')}" opacity="0.7" stroke="#FFF" stroke-width="1"/>
+                <title>{region_title('rear_delts', 'Rear Shoulders')}</title>
             </g>
             
             <!-- Upper Back & Lats -->
             <g class="muscle-group">
                 <path d="M 200 155 L 185 175 L 185 235 L 200 260 L 250 270 L 300 260 L 315 235 L 315 175 L 300 155 L 250 150 Z" 
-                      fill="{get_color('back')}" opacity="0.9" stroke="#FFF" stroke-width="2"/>
-                <title>Back - {muscle_status.get('back', {}).get('days_since_workout', 'Never')} days ago</title>
+                      fill="{region_color('upper_back')}" opacity="0.9" stroke="#FFF" stroke-width="2"/>
+                <title>{region_title('upper_back', 'Back')}</title>
             </g>
             
             <!-- Lower Back -->
-            <rect x="215" y="270" width="70" height="30" rx="10" fill="{get_color('back')}" opacity="0.8" stroke="#FFF" stroke-width="1"/>
+            <rect x="215" y="270" width="70" height="30" rx="10" fill="{region_color('lower_back')}" opacity="0.8" stroke="#FFF" stroke-width="1"/>
             
             <!-- Triceps -->
             <g class="muscle-group">
-                <ellipse cx="155" cy="190" rx="15" ry="35" fill="{get_color('arms')}" opacity="0.9" stroke="#FFF" stroke-width="2"/>
-                <ellipse cx="345" cy="190" rx="15" ry="35" fill="{get_color('arms')}" opacity="0.9" stroke="#FFF" stroke-width="2"/>
-                <title>Triceps - {muscle_status.get('arms', {}).get('days_since_workout', 'Never')} days ago</title>
+                <ellipse cx="155" cy="190" rx="15" ry="35" fill="{region_color('triceps')}" opacity="0.9" stroke="#FFF" stroke-width="2"/>
+                <ellipse cx="345" cy="190" rx="15" ry="35" fill="{region_color('triceps')}" opacity="0.9" stroke="#FFF" stroke-width="2"/>
+                <title>{region_title('triceps', 'Triceps')}</title>
             </g>
             
             <!-- Glutes -->
             <g class="muscle-group">
-                <ellipse cx="230" cy="310" rx="25" ry="20" fill="{get_color('legs')}" opacity="0.9" stroke="#FFF" stroke-width="2"/>
-                <ellipse cx="270" cy="310" rx="25" ry="20" fill="{get_color('legs')}" opacity="0.9" stroke="#FFF" stroke-width="2"/>
-                <title>Glutes - {muscle_status.get('legs', {}).get('days_since_workout', 'Never')} days ago</title>
+                <ellipse cx="230" cy="310" rx="25" ry="20" fill="{region_color('glutes')}" opacity="0.9" stroke="#FFF" stroke-width="2"/>
+                <ellipse cx="270" cy="310" rx="25" ry="20" fill="{region_color('glutes')}" opacity="0.9" stroke="#FFF" stroke-width="2"/>
+                <title>{region_title('glutes', 'Glutes')}</title>
             </g>
             
             <!-- Hamstrings -->
             <g class="muscle-group">
-                <rect x="215" y="335" width="30" height="60" rx="15" fill="{get_color('legs')}" opacity="0.8" stroke="#FFF" stroke-width="1"/>
-                <rect x="255" y="335" width="30" height="60" rx="15" fill="{get_color('legs')}" opacity="0.8" stroke="#FFF" stroke-width="1"/>
-                <title>Hamstrings - {muscle_status.get('legs', {}).get('days_since_workout', 'Never')} days ago</title>
+                <rect x="215" y="335" width="30" height="60" rx="15" fill="{region_color('hamstrings')}" opacity="0.8" stroke="#FFF" stroke-width="1"/>
+                <rect x="255" y="335" width="30" height="60" rx="15" fill="{region_color('hamstrings')}" opacity="0.8" stroke="#FFF" stroke-width="1"/>
+                <title>{region_title('hamstrings', 'Hamstrings')}</title>
             </g>
             
             <!-- Calves -->
             <g class="muscle-group">
-                <ellipse cx="230" cy="410" rx="12" ry="25" fill="{get_color('legs')}" opacity="0.9" stroke="#FFF" stroke-width="2"/>
-                <ellipse cx="270" cy="410" rx="12" ry="25" fill="{get_color('legs')}" opacity="0.9" stroke="#FFF" stroke-width="2"/>
-                <title>Calves - {muscle_status.get('legs', {}).get('days_since_workout', 'Never')} days ago</title>
+                <ellipse cx="230" cy="410" rx="12" ry="25" fill="{region_color('calves')}" opacity="0.9" stroke="#FFF" stroke-width="2"/>
+                <ellipse cx="270" cy="410" rx="12" ry="25" fill="{region_color('calves')}" opacity="0.9" stroke="#FFF" stroke-width="2"/>
+                <title>{region_title('calves', 'Calves')}</title>
             </g>
             
             <!-- Label -->
@@ -4,6 +4,7 @@ from chromadb.config import Settings
 from sentence_transformers import SentenceTransformer
 from typing import List, Dict, Optional
 from config import CHROMA_PERSIST_DIR, COLLECTION_NAME, EXERCISES_FILE, GYMS_FILE, SUPPLEMENTS_FILE
+from src.atomic_io import atomic_write_json
 
 class RAGEngine:
     
@@ -12,8 +13,12 @@ class RAGEngine:
         self.client = chromadb.PersistentClient(path=CHROMA_PERSIST_DIR)
         self.collection = None
         self.exercises_data = self._load_exercises()
+        self.exercises_by_id = {ex['id']: ex for ex in self.exercises_data}
         self.gyms_data = self._load_gyms()
         self.supplements_data = self._load_supplements()
+        # Bumped on reload_catalog / set_gym_equipment so cached retrievals can tell they are stale
+        self.catalog_version = 0
+        self.gym_versions: Dict[str, int] = {}
         
     def _load_exercises(self) -> List[Dict]:
         with open(EXERCISES_FILE, 'r') as f:
@@ -39,6 +44,17 @@ class RAGEngine:
             self._populate_database()
             print("Created and populated new exercise database")
     
+    def reload_catalog(self):
+        """Re-read the exercise and gym files and rebuild the vector collection"""
+        self.exercises_data = self._load_exercises()
+        self.exercises_by_id = {ex['id']: ex for ex in self.exercises_data}
+        self.gyms_data = self._load_gyms()
+        if self.collection is not None:
+            self.client.delete_collection(name=COLLECTION_NAME)
+            self.collection = self.client.create_collection(name=COLLECTION_NAME)
+            self._populate_database()
+        self.catalog_version += 1
+    
     def _populate_database(self):
         documents = []
         metadatas = []
@@ -78,6 +94,28 @@ class RAGEngine:
                 return gym['equipment']
         return []
     
+    def set_gym_equipment(self, gym_id: str, equipment: List[str]):
+        """Replace a gym's equipment list and save it to the gyms file"""
+        for gym in self.gyms_data:
+            if gym['gym_id'] == gym_id:
+                gym['equipment'] = list(equipment)
+                break
+        else:
+            raise KeyError(f"Unknown gym: {gym_id}")
+        atomic_write_json(GYMS_FILE, {"gyms": self.gyms_data})
+        self.gym_versions[gym_id] = self.gym_versions.get(gym_id, 0) + 1
+    
+    def gym_version(self, gym_id: str) -> int:
+        return self.gym_versions.get(gym_id, 0)
+    
+    def rank_exercises(self, queries: List[str], n_results: int) -> List[List[str]]:
+        """Exercise ids by similarity for each query, in one vector query"""
+        results = self.collection.query(
+            query_texts=queries,
+            n_results=n_results
+        )
+        return results['ids']
+    
     def search_exercises(self, 
                         query: str, 
                         gym_id: str,
@@ -85,16 +123,21 @@ class RAGEngine:
                         difficulty: str = None,
                         n_results: int = 15) -> List[Dict]:
         
+        ranked = self.rank_exercises([query], n_results * 2)[0]
+        return self.filter_exercises(ranked, gym_id, muscle_groups, difficulty, n_results)
+    
+    def filter_exercises(self,
+                         ranked_ids: List[str],
+                         gym_id: str,
+                         muscle_groups: List[str] = None,
+                         difficulty: str = None,
+                         n_results: int = 15) -> List[Dict]:
+        """The first n_results ranked exercises the gym can do that match the filters"""
         available_equipment = self.get_gym_equipment(gym_id)
         
-        results = self.collection.query(
-            query_texts=[query],
-            n_results=n_results * 2
-        )
-        
         exercises = []
-        for idx, ex_id in enumerate(results['ids'][0]):
-            exercise = next((ex for ex in self.exercises_data if ex['id'] == ex_id), None)
+        for ex_id in ranked_ids:
+            exercise = self.exercises_by_id.get(ex_id)
             
             if not exercise:
                 continue
@@ -116,7 +159,7 @@ class RAGEngine:
         return exercises
     
     def get_exercise_by_id(self, exercise_id: str) -> Dict:
-        return next((ex for ex in self.exercises_data if ex['id'] == exercise_id), None)
+        return self.exercises_by_id.get(exercise_id)
     
     def get_exercise_alternatives(self, exercise_id: str, gym_id: str) -> List[Dict]:
         exercise = self.get_exercise_by_id(exercise_id)
@@ -5,12 +5,25 @@ Analyzes workout intensity and recommends optimal recovery
 
 from dataclasses import dataclass, asdict
 from typing import List, Dict, Optional
-from datetime import datetime, timedelta
-import json
+from datetime import date, datetime, timedelta
+from collections import OrderedDict
+import copy
+import math
+import threading
 from pathlib import Path
 
+import numpy as np
 
-@dataclass
+from config import BANISTER_FITNESS_DAYS, BANISTER_FATIGUE_DAYS, BANISTER_FITNESS_GAIN, BANISTER_FATIGUE_GAIN
+from src.storage import StorageBackend, create_storage
+from src.unit_of_work import UnitOfWork
+from src.daily_series import DailySeries
+from src.muscle_heatmap import calculate_coverage_score
+from src import muscle_activation
+from src.muscle_activation import ActivationMatrix
+
+
+@dataclass(slots=True)
 class WorkoutIntensity:
     """Represents workout intensity metrics"""
     date: str
@@ -21,6 +34,19 @@ class WorkoutIntensity:
     intensity_score: float  # 0-10 scale
 
 
+@dataclass(slots=True)
+class RecoveryReport:
+    """Everything the recovery views show, computed from one read of the workload aggregates"""
+    user_id: str
+    weekly_load: Dict
+    deload: Dict
+    muscle_status: Dict[str, Dict]
+    rest_day: Dict
+    coverage: int
+    fatigue: Dict[str, float]  # fine muscle -> activation-weighted sets, decayed to now
+    readiness: Dict  # Banister fitness/fatigue/readiness and a 14-day forecast
+
+
 @dataclass
 class RecoveryMetrics:
     """User recovery metrics"""
@@ -35,6 +61,12 @@ class RecoveryMetrics:
             self.sore_muscles = []
 
 
+def impulse_response(days_ago: np.ndarray, impulses: np.ndarray, time_constant: float) -> float:
+    """Sum of training impulses, each decayed by exp(-age / time_constant); future ones are ignored"""
+    past = days_ago >= 0
+    return float(np.exp(-days_ago[past] / time_constant) @ impulses[past])
+
+
 class RecoveryAnalyzer:
     """Analyzes recovery and provides recommendations"""
     
@@ -51,10 +83,31 @@ class RecoveryAnalyzer:
         'very_high': 9.5
     }
     
-    def __init__(self, storage_dir: Path):
+    # Exponentially weighted workload: acute ~ last week, chronic ~ last 4 weeks
+    ACUTE_DAYS = 7
+    CHRONIC_DAYS = 28
+    ACWR_HIGH = 1.5  # acute:chronic ratio above this is a load spike
+    
+    # Banister impulse-response model: readiness = k1 * fitness - k2 * fatigue, where each
+    # session's intensity score feeds both and they decay with their own time constants
+    FITNESS_DAYS = BANISTER_FITNESS_DAYS
+    FATIGUE_DAYS = BANISTER_FATIGUE_DAYS
+    FITNESS_GAIN = BANISTER_FITNESS_GAIN
+    FATIGUE_GAIN = BANISTER_FATIGUE_GAIN
+    FORECAST_DAYS = 14
+    
+    REPORT_CACHE_SIZE = 1024
+    
+    def __init__(self, storage_dir: Path, storage: Optional[StorageBackend] = None,
+                 activation: Optional[ActivationMatrix] = None):
         self.storage_dir = storage_dir
-        self.intensity_file = storage_dir / "workout_intensity.json"
+        self.storage = storage or create_storage(storage_dir)
+        self.activation = activation or ActivationMatrix.load()
         self.recovery_file = storage_dir / "recovery_metrics.json"
+        self._reports = OrderedDict()  # user_id -> (token, RecoveryReport), LRU order
+        self._reports_lock = threading.Lock()
+        self._user_locks: Dict[str, threading.Lock] = {}
+        self._user_locks_guard = threading.Lock()
     
     def calculate_intensity(self, workout_data: Dict, difficulty_level: str = 'intermediate') -> WorkoutIntensity:
         """Calculate workout intensity"""
@@ -86,56 +139,326 @@ class RecoveryAnalyzer:
             intensity_score=round(intensity_score, 2)
         )
     
-    def save_workout_intensity(self, user_id: str, intensity: WorkoutIntensity):
-        """Save workout intensity data"""
-        all_data = {}
-        if self.intensity_file.exists():
-            with open(self.intensity_file, 'r') as f:
-                all_data = json.load(f)
-        
-        if user_id not in all_data:
-            all_data[user_id] = []
-        
-        all_data[user_id].append(asdict(intensity))
-        
-        # Keep only last 90 days
-        all_data[user_id] = all_data[user_id][-90:]
-        
-        with open(self.intensity_file, 'w') as f:
-            json.dump(all_data, f, indent=2)
+    def rescore_intensity(self, intensity_data: Dict, difficulty_level: str = 'intermediate') -> Dict:
+        """A stored intensity record scored again with the current multipliers (same date)"""
+        intensity = self.calculate_intensity(intensity_data, difficulty_level)
+        return {
+            **intensity_data,
+            'estimated_volume': intensity.estimated_volume,
+            'intensity_score': intensity.intensity_score
+        }
+    
+    def _user_lock(self, user_id: str) -> threading.Lock:
+        with self._user_locks_guard:
+            return self._user_locks.setdefault(user_id, threading.Lock())
+    
+    def save_workout_intensity(self, user_id: str, intensity: WorkoutIntensity, uow: Optional[UnitOfWork] = None,
+                               exercise_sets: Optional[Dict[str, float]] = None):
+        """Save workout intensity data and fold it into the workload aggregates.
+
+        With uow the record is staged and the aggregates are updated once it
+        is stored (after commit), so they never count a rolled-back or failed
+        session and never miss one still queued for write-behind.
+        exercise_sets ({exercise_id: sets}) feeds the per-muscle fatigue model.
+        History is never truncated here; old records are rolled up and
+        archived by the retention job (src/retention.py).
+        """
+        intensity_data = asdict(intensity)
+        load = self.activation.session_load(exercise_sets) if exercise_sets else None
+        self._load_workload(user_id, create=True)  # so folding never rebuilds over sessions not yet folded
+        if uow is None:
+            self.storage.append_intensity(user_id, intensity_data)
+            self._fold_session(user_id, intensity_data, load)
+        else:
+            uow.append_intensity(user_id, intensity_data)
+            uow.after_commit(lambda: self._fold_session(user_id, intensity_data, load))
+    
+    def _fold_session(self, user_id: str, intensity_data: Dict, load=None):
+        """Add one stored session to the stored aggregates (a read-modify-write, serialized per user)"""
+        with self._user_lock(user_id):
+            workload = copy.deepcopy(self.storage.get_user_document('workload', user_id) or self._empty_workload())
+            when = datetime.fromisoformat(intensity_data['date'])
+            self._add_session(workload, intensity_data)
+            self._add_impulse(workload, when, intensity_data['intensity_score'])
+            if load is not None:
+                self._add_fatigue(workload, when, load)
+            self.storage.save_user_document('workload', user_id, workload)
+        with self._reports_lock:
+            self._reports.pop(user_id, None)
     
     def get_recent_intensities(self, user_id: str, days: int = 7) -> List[WorkoutIntensity]:
         """Get recent workout intensities"""
-        if not self.intensity_file.exists():
-            return []
-        
-        with open(self.intensity_file, 'r') as f:
-            all_data = json.load(f)
-        
-        user_data = all_data.get(user_id, [])
         cutoff_date = datetime.now() - timedelta(days=days)
+        user_data = self.storage.query_intensities(user_id, start=cutoff_date.isoformat())
+        return [WorkoutIntensity(**intensity_data) for intensity_data in user_data]
+    
+    # Workload aggregates: one 'workload' user document per user holding
+    # EWMA acute/chronic load (overall and per muscle group, volume split
+    # evenly across a session's muscle groups) decayed to 'day', plus a
+    # DailySeries of per-calendar-day totals for the last CHRONIC_DAYS days,
+    # fine-muscle fatigue (src/muscle_activation.py) as of 'fatigue.at', and
+    # the Banister fitness/fatigue state as of 'banister.at'
+    
+    @staticmethod
+    def _alpha(days: int) -> float:
+        return 2 / (days + 1)
+    
+    @staticmethod
+    def _empty_workload() -> Dict:
+        return {"day": None, "since": None, "acute": 0.0, "chronic": 0.0, "muscles": {},
+                "series": DailySeries.empty(), "fatigue": {"at": None, "values": {}},
+                "banister": {"at": None, "fitness": 0.0, "fatigue": 0.0}}
+    
+    def _decay_workload(self, workload: Dict, day: str):
+        """Advance the EWMAs to day and drop series days older than the chronic window"""
+        if workload['day'] is not None:
+            gap = (date.fromisoformat(day) - date.fromisoformat(workload['day'])).days
+            if gap <= 0:
+                return
+            acute_keep = (1 - self._alpha(self.ACUTE_DAYS)) ** gap
+            chronic_keep = (1 - self._alpha(self.CHRONIC_DAYS)) ** gap
+            for load in [workload, *workload['muscles'].values()]:
+                load['acute'] *= acute_keep
+                load['chronic'] *= chronic_keep
+        workload['day'] = day
+        
+        first_kept = date.fromisoformat(day) - timedelta(days=self.CHRONIC_DAYS - 1)
+        DailySeries(workload['series']).trim(first_kept.isoformat())
+    
+    def _add_session(self, workload: Dict, intensity_data: Dict):
+        """Fold one session into the aggregates; sessions older than 'day' are weighted by their age"""
+        day = intensity_data['date'][:10]
+        self._decay_workload(workload, day)
+        age = (date.fromisoformat(workload['day']) - date.fromisoformat(day)).days
+        acute_weight = self._alpha(self.ACUTE_DAYS) * (1 - self._alpha(self.ACUTE_DAYS)) ** age
+        chronic_weight = self._alpha(self.CHRONIC_DAYS) * (1 - self._alpha(self.CHRONIC_DAYS)) ** age
+        
+        volume = intensity_data['estimated_volume']
+        workload['acute'] += acute_weight * volume
+        workload['chronic'] += chronic_weight * volume
+        
+        muscles = intensity_data['muscle_groups']
+        for muscle in muscles:
+            load = workload['muscles'].setdefault(muscle, {"acute": 0.0, "chronic": 0.0, "last_worked": None})
+            load['acute'] += acute_weight * volume / len(muscles)
+            load['chronic'] += chronic_weight * volume / len(muscles)
+            if load['last_worked'] is None or intensity_data['date'] > load['last_worked']:
+                load['last_worked'] = intensity_data['date']
+        
+        if workload['since'] is None or day < workload['since']:
+            workload['since'] = day
+        
+        if age < self.CHRONIC_DAYS:
+            series = DailySeries(workload['series'])
+            score = intensity_data['intensity_score']
+            series.add(
+                day,
+                sessions=1,
+                active_days=0 if series.sum('sessions', day, day) else 1,
+                light_sessions=0 if score > self.INTENSITY_THRESHOLDS['high'] else 1,
+                intensity_sum=score,
+                volume=volume
+            )
+    
+    def _add_fatigue(self, workload: Dict, when: datetime, load):
+        fatigue = workload['fatigue']
+        at = datetime.fromisoformat(fatigue['at']) if fatigue['at'] else None
+        vector, at = muscle_activation.add_session(muscle_activation.to_vector(fatigue['values']), at, load, when)
+        workload['fatigue'] = {"at": at.isoformat(), "values": muscle_activation.to_dict(vector)}
+    
+    def _add_impulse(self, workload: Dict, when: datetime, impulse: float):
+        """Fold one session into the Banister state; sessions older than 'at' are decayed to it"""
+        model = workload['banister']
+        at = datetime.fromisoformat(model['at']) if model['at'] else None
+        if at is None or when >= at:
+            gap = (when - at).total_seconds() / 86400 if at else 0.0
+            fitness = model['fitness'] * math.exp(-gap / self.FITNESS_DAYS) + impulse
+            fatigue = model['fatigue'] * math.exp(-gap / self.FATIGUE_DAYS) + impulse
+            at = when
+        else:
+            age = (at - when).total_seconds() / 86400
+            fitness = model['fitness'] + impulse * math.exp(-age / self.FITNESS_DAYS)
+            fatigue = model['fatigue'] + impulse * math.exp(-age / self.FATIGUE_DAYS)
+        workload['banister'] = {"at": at.isoformat(), "fitness": fitness, "fatigue": fatigue}
+    
+    def _batch_banister(self, intensities: List[Dict], at: datetime) -> Dict:
+        """Banister state at `at` from a whole history in one vectorized pass"""
+        if not intensities:
+            return {"at": None, "fitness": 0.0, "fatigue": 0.0}
+        days_ago = np.array([(at - datetime.fromisoformat(i['date'])).total_seconds() / 86400 for i in intensities])
+        impulses = np.array([i['intensity_score'] for i in intensities], dtype=float)
+        return {
+            "at": at.isoformat(),
+            "fitness": impulse_response(days_ago, impulses, self.FITNESS_DAYS),
+            "fatigue": impulse_response(days_ago, impulses, self.FATIGUE_DAYS)
+        }
+    
+    def _rebuild_workload(self, user_id: str, intensities: Optional[List[Dict]] = None) -> Dict:
+        """Recompute the aggregates from history (older sessions' weight is negligible);
+        intensities (oldest first) replaces the stored intensity history when given"""
+        workload = self._empty_workload()
+        now = datetime.now()
+        start = (now - timedelta(days=max(self.CHRONIC_DAYS, self.FITNESS_DAYS) * 4)).isoformat()
+        if intensities is None:
+            intensities = self.storage.query_intensities(user_id, start=start)
+        else:
+            intensities = [record for record in intensities if record['date'] >= start]
+        for intensity_data in intensities:
+            self._add_session(workload, intensity_data)
+        workload['banister'] = self._batch_banister(intensities, now)
+        
+        # Logs only record which exercises were done, so assume their typical sets
+        logs, _ = self.storage.query_logs(user_id, start=(now - timedelta(days=self.CHRONIC_DAYS)).isoformat())
+        if logs:
+            sessions = [
+                (datetime.fromisoformat(log['date']),
+                 self.activation.default_session_sets(log.get('exercises_completed', [])))
+                for log in logs
+            ]
+            self._add_fatigue(workload, now, self.activation.history_fatigue(sessions, now))
+        return workload
+    
+    def _load_workload(self, user_id: str, create: bool = False) -> Dict:
+        """Stored aggregates (read-only), rebuilt and saved once for history that predates them
+        (create saves them even when there is no history yet)"""
+        workload = self.storage.get_user_document('workload', user_id)
+        if workload is not None and 'banister' in workload:
+            return workload
+        with self._user_lock(user_id):
+            workload = self.storage.get_user_document('workload', user_id)
+            if workload is None or 'banister' not in workload:
+                workload = self._rebuild_workload(user_id)
+                if create or workload['day'] is not None or workload['fatigue']['at'] is not None:
+                    self.storage.save_user_document('workload', user_id, workload)
+        return workload
+    
+    def recompute_workload(self, user_id: str, uow: Optional[UnitOfWork] = None,
+                           intensities: Optional[List[Dict]] = None) -> Dict:
+        """Rebuild and save a user's aggregates from history, e.g. after a backfill or import"""
+        with self._user_lock(user_id):
+            workload = self._rebuild_workload(user_id, intensities)
+            (uow or self.storage).save_user_document('workload', user_id, workload)
+        with self._reports_lock:
+            self._reports.pop(user_id, None)
+        return workload
+    
+    def _established(self, since: Optional[str]) -> bool:
+        """Whether there is a full chronic window of history, so long-term comparisons mean something"""
+        return since is not None and (date.today() - date.fromisoformat(since)).days >= self.CHRONIC_DAYS
+    
+    def _ratio(self, load: Dict, since: Optional[str]) -> Optional[float]:
+        """Acute:chronic ratio, or None until there is a full chronic window of history"""
+        if not self._established(since) or load['chronic'] <= 0:
+            return None
+        return round(load['acute'] / load['chronic'], 2)
+    
+    def _window(self, workload: Dict, days: int, offset: int = 0) -> Dict:
+        """Series totals for the `days` calendar days ending `offset` days before 'day' (O(1))"""
+        end = date.fromisoformat(workload['day']) - timedelta(days=offset)
+        first = end - timedelta(days=days - 1)
+        return DailySeries(workload['series']).window(first.isoformat(), end.isoformat())
+    
+    def get_workload(self, user_id: str) -> Dict:
+        """Workload aggregates decayed to today, with acute:chronic ratios overall and per muscle group"""
+        workload = copy.deepcopy(self._load_workload(user_id))
+        self._decay_workload(workload, date.today().isoformat())
+        workload['acute_chronic_ratio'] = self._ratio(workload, workload['since'])
+        for load in workload['muscles'].values():
+            load['acute_chronic_ratio'] = self._ratio(load, workload['since'])
+        return workload
+    
+    def _fatigue(self, workload: Dict) -> Dict[str, float]:
+        fatigue = workload['fatigue']
+        if fatigue['at'] is None:
+            return {}
+        hours = (datetime.now() - datetime.fromisoformat(fatigue['at'])).total_seconds() / 3600
+        vector = muscle_activation.decay(muscle_activation.to_vector(fatigue['values']), hours)
+        return muscle_activation.to_dict(vector)
+    
+    def _readiness(self, workload: Dict, days: int = FORECAST_DAYS) -> Dict:
+        """Current Banister fitness, fatigue and readiness, plus a forecast assuming no training"""
+        model = workload['banister']
+        if model['at'] is None:
+            return {"fitness": 0.0, "fatigue": 0.0, "readiness": 0.0, "recovered_in_days": 0, "forecast": []}
+        
+        elapsed = (datetime.now() - datetime.fromisoformat(model['at'])).total_seconds() / 86400
+        ahead = elapsed + np.arange(days + 1)
+        fitness = model['fitness'] * np.exp(-ahead / self.FITNESS_DAYS)
+        fatigue = model['fatigue'] * np.exp(-ahead / self.FATIGUE_DAYS)
+        readiness = self.FITNESS_GAIN * fitness - self.FATIGUE_GAIN * fatigue
+        
+        recovered = np.flatnonzero(readiness >= 0)
+        today = date.today()
+        return {
+            "fitness": round(float(fitness[0]), 2),
+            "fatigue": round(float(fatigue[0]), 2),
+            "readiness": round(float(readiness[0]), 2),
+            "recovered_in_days": int(recovered[0]) if len(recovered) else None,
+            "forecast": [
+                {"date": (today + timedelta(days=day)).isoformat(), "readiness": round(float(value), 2)}
+                for day, value in enumerate(readiness[1:], 1)
+            ]
+        }
+    
+    def get_readiness_forecast(self, user_id: str, days: int = FORECAST_DAYS) -> Dict:
+        """Banister readiness today and for each of the next `days` days"""
+        return self._readiness(self._load_workload(user_id), days)
+    
+    def get_muscle_fatigue(self, user_id: str) -> Dict[str, float]:
+        """Fatigue per fine muscle (activation-weighted sets) decayed to now; empty if never tracked"""
+        return self._fatigue(self._load_workload(user_id))
+    
+    def build_report(self, user_id: str) -> RecoveryReport:
+        """All recovery recommendations from a single read of the user's workload aggregates.
+
+        Memoized until the user's workload document changes (or the hour
+        rolls over); the returned report is shared, so treat it as read-only.
+        """
+        version = self.storage.version('doc:workload', user_id)
+        token = None if version is None else (version, datetime.now().strftime('%Y-%m-%dT%H'))
+        with self._reports_lock:
+            cached = self._reports.get(user_id)
+            if token is not None and cached is not None and cached[0] == token:
+                self._reports.move_to_end(user_id)
+                return cached[1]
+        
+        workload = self.get_workload(user_id)
+        muscle_status = self._muscle_recovery_status(workload)
+        report = RecoveryReport(
+            user_id=user_id,
+            weekly_load=self._weekly_load(workload),
+            deload=self._deload_need(workload),
+            muscle_status=muscle_status,
+            rest_day=self._rest_day_recommendation(workload),
+            coverage=calculate_coverage_score(muscle_status),
+            fatigue=self._fatigue(workload),
+            readiness=self._readiness(workload)
+        )
         
-        recent = []
-        for intensity_data in user_data:
-            workout_date = datetime.fromisoformat(intensity_data['date'])
-            if workout_date >= cutoff_date:
-                recent.append(WorkoutIntensity(**intensity_data))
-        
-        return recent
+        if token is not None:
+            with self._reports_lock:
+                self._reports[user_id] = (token, report)
+                self._reports.move_to_end(user_id)
+                while len(self._reports) > self.REPORT_CACHE_SIZE:
+                    self._reports.popitem(last=False)
+        return report
     
     def analyze_weekly_load(self, user_id: str) -> Dict:
         """Analyze weekly training load"""
-        intensities = self.get_recent_intensities(user_id, days=7)
+        return self._weekly_load(self.get_workload(user_id))
+    
+    def _weekly_load(self, workload: Dict) -> Dict:
+        week = self._window(workload, 7)
         
-        if not intensities:
+        if not week['sessions']:
             return {
                 "status": "no_data",
                 "recommendation": "Start tracking your workouts to get personalized recovery insights!"
             }
         
-        avg_intensity = sum(i.intensity_score for i in intensities) / len(intensities)
-        total_volume = sum(i.estimated_volume for i in intensities)
-        workout_count = len(intensities)
+        avg_intensity = week['intensity_sum'] / week['sessions']
+        total_volume = week['volume']
+        workout_count = week['sessions']
         
         # Determine status
         if avg_intensity < self.INTENSITY_THRESHOLDS['moderate']:
@@ -151,35 +474,37 @@ class RecoveryAnalyzer:
             status = "very_high_intensity"
             recommendation = "⚠️ Very high intensity detected. Consider a deload week to prevent overtraining."
         
+        ratio = workload['acute_chronic_ratio']
+        if ratio is not None and ratio > self.ACWR_HIGH and status != "very_high_intensity":
+            recommendation += " Your load jumped well above your 4-week average, so build up gradually."
+        
         return {
             "status": status,
             "avg_intensity": round(avg_intensity, 2),
             "total_volume": round(total_volume, 0),
             "workout_count": workout_count,
+            "acute_chronic_ratio": ratio,
             "recommendation": recommendation
         }
     
     def detect_deload_need(self, user_id: str) -> Dict:
         """Detect if user needs a deload week"""
-        # Get last 3 weeks of data
-        intensities = self.get_recent_intensities(user_id, days=21)
+        return self._deload_need(self.get_workload(user_id))
+    
+    def _deload_need(self, workload: Dict) -> Dict:
+        # Last 3 calendar weeks, most recent first
+        weeks = [self._window(workload, 7, offset=7 * i) for i in range(3)]
         
-        if len(intensities) < 6:  # Need at least 6 workouts
+        if sum(week['sessions'] for week in weeks) < 6:  # Need at least 6 workouts
             return {
                 "needs_deload": False,
                 "reason": "Insufficient data"
             }
         
-        # Split into weeks
-        week1 = intensities[-7:] if len(intensities) >= 7 else intensities
-        week2 = intensities[-14:-7] if len(intensities) >= 14 else []
-        week3 = intensities[-21:-14] if len(intensities) >= 21 else []
-        
         # Calculate weekly averages
-        weeks = [week for week in [week1, week2, week3] if week]
         weekly_avgs = [
-            sum(i.intensity_score for i in week) / len(week)
-            for week in weeks
+            week['intensity_sum'] / week['sessions']
+            for week in weeks if week['sessions']
         ]
         
         # Check if intensity has been high for multiple weeks
@@ -195,10 +520,18 @@ class RecoveryAnalyzer:
             needs_deload = True
             reason = "Recent very high intensity after sustained hard training. Deload recommended."
         
+        # Fatigue that would take over a week of rest to clear also calls for a deload
+        readiness = self._readiness(workload)
+        recovered_in = readiness['recovered_in_days']
+        if not needs_deload and self._established(workload['since']) and (recovered_in is None or recovered_in > 7):
+            needs_deload = True
+            reason = "Accumulated fatigue would take over a week of rest to clear. Deload recommended."
+        
         return {
             "needs_deload": needs_deload,
             "reason": reason,
             "weekly_intensities": [round(avg, 2) for avg in weekly_avgs],
+            "readiness": readiness['readiness'],
             "deload_week_suggestion": self._generate_deload_plan() if needs_deload else None
         }
     
@@ -212,21 +545,21 @@ class RecoveryAnalyzer:
             "benefits": "Muscle repair, CNS recovery, prevent overtraining"
         }
     
+    
     def get_muscle_recovery_status(self, user_id: str) -> Dict:
-        """Get recovery status for each muscle group"""
-        intensities = self.get_recent_intensities(user_id, days=7)
-        
-        muscle_last_worked = {}
-        for intensity in intensities:
-            for muscle in intensity.muscle_groups:
-                workout_date = datetime.fromisoformat(intensity.date)
-                if muscle not in muscle_last_worked or workout_date > datetime.fromisoformat(muscle_last_worked[muscle]):
-                    muscle_last_worked[muscle] = intensity.date
+        """Get recovery status for each muscle group worked in the last week"""
+        return self._muscle_recovery_status(self.get_workload(user_id))
+    
+    def _muscle_recovery_status(self, workload: Dict) -> Dict:
+        now = datetime.now()
+        cutoff = (now - timedelta(days=7)).isoformat()
         
-        # Calculate days since last workout
         muscle_status = {}
-        for muscle, last_date in muscle_last_worked.items():
-            days_ago = (datetime.now() - datetime.fromisoformat(last_date)).days
+        for muscle, load in workload['muscles'].items():
+            last_date = load['last_worked']
+            if last_date is None or last_date < cutoff:
+                continue
+            days_ago = (now - datetime.fromisoformat(last_date)).days
             
             if days_ago <= 2:
                 status = "recently_worked"
@@ -245,39 +578,50 @@ class RecoveryAnalyzer:
                 "days_since_workout": days_ago,
                 "last_workout": last_date,
                 "status": status,
-                "color": color
+                "color": color,
+                "acute_chronic_ratio": load['acute_chronic_ratio']
             }
         
         return muscle_status
     
     def get_rest_day_recommendation(self, user_id: str) -> Dict:
         """Recommend if user should take a rest day"""
-        recent = self.get_recent_intensities(user_id, days=3)
+        return self._rest_day_recommendation(self.get_workload(user_id))
+    
+    def _rest_day_recommendation(self, workload: Dict) -> Dict:
+        recent = self._window(workload, 3)
         
-        if not recent:
+        if not recent['sessions']:
             return {
                 "should_rest": False,
                 "reason": "No recent workout data."
             }
         
         # Check if worked out consecutive days with high intensity
-        consecutive_high = all(i.intensity_score > self.INTENSITY_THRESHOLDS['high'] for i in recent)
+        consecutive_high = recent['light_sessions'] == 0
         
-        avg_recent = sum(i.intensity_score for i in recent) / len(recent)
+        avg_recent = recent['intensity_sum'] / recent['sessions']
         
         should_rest = False
         reason = ""
         
-        if len(recent) >= 3 and consecutive_high:
+        if recent['active_days'] >= 3 and consecutive_high:
             should_rest = True
             reason = "3+ consecutive high-intensity days. Rest recommended for recovery."
         elif avg_recent > self.INTENSITY_THRESHOLDS['very_high']:
             should_rest = True
             reason = "Very high recent intensity. A rest day will optimize gains."
         
+        readiness = self._readiness(workload)
+        if not should_rest and self._established(workload['since']) and readiness['readiness'] < 0:
+            should_rest = True
+            reason = (f"Fatigue currently outweighs fitness; readiness turns positive in "
+                      f"{readiness['recovered_in_days'] or 'more than 14'} day(s) of rest.")
+        
         return {
             "should_rest": should_rest,
             "reason": reason,
             "avg_intensity": round(avg_recent, 2),
-            "consecutive_days": len(recent)
-        }
\ No newline at end of file
+            "consecutive_days": recent['active_days'],
+            "readiness": readiness['readiness']
+        }
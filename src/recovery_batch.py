@@ -0,0 +1,165 @@
+"""
+Batch Recovery Recompute for FitFlow AI
+Re-scores every member's stored workout intensity with the current
+DIFFICULTY_MULTIPLIERS / INTENSITY_THRESHOLDS and rebuilds their recovery
+aggregates, in parallel worker processes over user-hash shards
+
+    python -m src.recovery_batch --workers 8 --shards 64
+    python -m src.recovery_batch --restart     # ignore the saved checkpoint
+
+Each shard is written in one batch (one transaction on SQLite, one atomic
+rewrite per file on JSON) and recorded in storage/recovery_batch.json, so an
+interrupted run resumes with the unfinished shards. The checkpoint is tied to
+the scoring settings: change them again and the next run starts over.
+Run it while the app is quiet, like the retention job; archived records are
+re-scored for the aggregates but the archive itself is left as is.
+"""
+
+from typing import Callable, Dict, List, Optional
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+import argparse
+import hashlib
+import json
+import multiprocessing
+import os
+import time
+import zlib
+
+from config import STORAGE_DIR
+from src.atomic_io import read_json, atomic_write_json
+from src.recovery_analyzer import RecoveryAnalyzer
+from src.retention import ArchivedStorage, ColdArchive
+from src.storage import StorageBackend, create_storage
+from src.unit_of_work import UnitOfWork
+
+
+CHECKPOINT_FILE = "recovery_batch.json"
+
+# Per-process worker state, set up once by _init_worker
+_worker = {}
+
+
+def scoring_fingerprint(shards: int) -> str:
+    """Identifies the settings a run re-scores with; a checkpoint only resumes a run with the same one"""
+    settings = {
+        'difficulty_multipliers': RecoveryAnalyzer.DIFFICULTY_MULTIPLIERS,
+        'intensity_thresholds': RecoveryAnalyzer.INTENSITY_THRESHOLDS,
+        'banister': [RecoveryAnalyzer.FITNESS_DAYS, RecoveryAnalyzer.FATIGUE_DAYS,
+                     RecoveryAnalyzer.FITNESS_GAIN, RecoveryAnalyzer.FATIGUE_GAIN],
+        'shards': shards,
+    }
+    return hashlib.sha1(json.dumps(settings, sort_keys=True).encode()).hexdigest()
+
+
+def shard_of(user_id: str, shards: int) -> int:
+    return zlib.crc32(user_id.encode()) % shards
+
+
+def recompute_users(analyzer: RecoveryAnalyzer, hot: StorageBackend, user_ids: List[str],
+                    archive: Optional[ColdArchive] = None) -> int:
+    """Re-score and rebuild the given users in one batch; returns the number of hot records re-scored.
+
+    analyzer.storage must see the full history (reading through `archive`, if any),
+    hot only the backend.
+    """
+    uow = UnitOfWork(hot)
+    records = 0
+    for user_id in user_ids:
+        profile = hot.get_profile(user_id) or {}
+        level = profile.get('experience_level', 'intermediate')
+
+        history = [analyzer.rescore_intensity(r, level) for r in analyzer.storage.query_intensities(user_id)]
+        if archive is None or archive.archived_range(user_id, 'intensity') is None:
+            rescored = history
+        else:
+            # Hot records are mostly the tail of history; only archived-but-unpruned ones need scoring again
+            by_date = {record['date']: record for record in history}
+            rescored = [
+                by_date.get(record['date']) or analyzer.rescore_intensity(record, level)
+                for record in hot.query_intensities(user_id)
+            ]
+        if rescored:
+            uow.update_intensities(user_id, rescored)
+        analyzer.recompute_workload(user_id, uow, intensities=history)
+        records += len(rescored)
+    uow.commit()
+    return records
+
+
+def _init_worker(storage_dir: Path, backend: Optional[str]):
+    hot = create_storage(storage_dir, backend, cache_size=0, archive=False)
+    archive = ColdArchive(Path(storage_dir) / "archive")
+    _worker['hot'] = hot
+    _worker['archive'] = archive
+    _worker['analyzer'] = RecoveryAnalyzer(Path(storage_dir), ArchivedStorage(hot, archive))
+
+
+def _recompute_shard(shard: int, user_ids: List[str]):
+    records = recompute_users(_worker['analyzer'], _worker['hot'], user_ids, _worker['archive'])
+    return shard, len(user_ids), records
+
+
+def recompute_all(storage_dir: Path = STORAGE_DIR, backend: Optional[str] = None, workers: Optional[int] = None,
+                  shards: int = 64, restart: bool = False,
+                  progress: Optional[Callable[[str], None]] = print) -> Dict[str, int]:
+    """Re-score every user's intensity history and rebuild their aggregates; returns totals for this run"""
+    storage_dir = Path(storage_dir)
+    checkpoint_path = storage_dir / CHECKPOINT_FILE
+    fingerprint = scoring_fingerprint(shards)
+    checkpoint = {} if restart else read_json(checkpoint_path, {})
+    if checkpoint.get('fingerprint') != fingerprint:
+        checkpoint = {'fingerprint': fingerprint, 'done': []}
+    done = set(checkpoint['done'])
+
+    # Stream user ids once and deal them into shards that still need work
+    pending: Dict[int, List[str]] = {}
+    storage = create_storage(storage_dir, backend, cache_size=0, archive=False)
+    for user_id in storage.iter_user_ids():
+        shard = shard_of(user_id, shards)
+        if shard not in done:
+            pending.setdefault(shard, []).append(user_id)
+    storage.close()
+    for shard in range(shards):
+        if shard not in done and shard not in pending:
+            done.add(shard)  # no users hash here
+
+    totals = {'shards': 0, 'users': 0, 'records': 0}
+    started = time.perf_counter()
+    # spawn: worker processes open their own SQLite connections and file locks
+    context = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(workers or os.cpu_count(), mp_context=context,
+                             initializer=_init_worker, initargs=(storage_dir, backend)) as pool:
+        futures = [pool.submit(_recompute_shard, shard, user_ids) for shard, user_ids in pending.items()]
+        for future in as_completed(futures):
+            shard, users, records = future.result()
+            done.add(shard)
+            checkpoint['done'] = sorted(done)
+            atomic_write_json(checkpoint_path, checkpoint)
+
+            totals['shards'] += 1
+            totals['users'] += users
+            totals['records'] += records
+            if progress:
+                rate = totals['users'] / (time.perf_counter() - started)
+                progress(f"[{len(done)}/{shards} shards] {totals['users']} users, "
+                         f"{totals['records']} records re-scored ({rate:,.0f} users/s)")
+    checkpoint['done'] = sorted(done)
+    atomic_write_json(checkpoint_path, checkpoint)
+    return totals
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Re-score intensity history and rebuild recovery aggregates")
+    parser.add_argument("--storage-dir", type=Path, default=STORAGE_DIR)
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: CPU count)")
+    parser.add_argument("--shards", type=int, default=64, help="user-hash shards (units of work and resume)")
+    parser.add_argument("--restart", action="store_true", help="ignore the checkpoint and redo every shard")
+    args = parser.parse_args()
+
+    totals = recompute_all(args.storage_dir, workers=args.workers, shards=args.shards, restart=args.restart)
+    print(f"Done: {totals['users']} users in {totals['shards']} shards, {totals['records']} records re-scored")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,470 @@
+"""
+Data Retention for FitFlow AI
+Keeps recent workout logs and intensity records hot, rolls older ones up
+into daily and weekly aggregates and moves the raw records into
+compressed, month-partitioned archive segments
+
+    storage/archive/logs/<YYYY-MM>/<bucket>.jsonl.gz
+                    intensity/<YYYY-MM>/<bucket>.jsonl.gz
+                    rollups/<bucket>.json   (daily / weekly aggregates per user)
+                    index/<bucket>.json     (archived date range per user)
+
+Reads through ArchivedStorage fall back to the archive transparently.
+Run the retention job periodically, e.g. from a nightly cron:
+    python -m src.retention apply --hot-days 90
+"""
+
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from pathlib import Path
+import argparse
+import gzip
+import hashlib
+import heapq
+import json
+import os
+import tempfile
+import threading
+
+from config import STORAGE_DIR, RETENTION_HOT_DAYS
+from src.atomic_io import FileLock, read_json, update_json, file_version
+from src.storage import StorageBackend, create_storage, log_sort_key, encode_log_cursor, paginate_logs
+
+
+KINDS = ('logs', 'intensity')
+
+
+def _bucket(user_id: str) -> str:
+    return hashlib.sha1(user_id.encode("utf-8")).hexdigest()[:3]
+
+
+def _week(date: str) -> str:
+    year, week, _ = datetime.fromisoformat(date).isocalendar()
+    return f"{year}-W{week:02d}"
+
+
+def _months_desc(last: str, first: str) -> Iterator[str]:
+    """'YYYY-MM' partitions from last back to first, inclusive"""
+    year, month = int(last[:4]), int(last[5:7])
+    while f"{year:04d}-{month:02d}" >= first:
+        yield f"{year:04d}-{month:02d}"
+        year, month = (year, month - 1) if month > 1 else (year - 1, 12)
+
+
+def _sort_key(kind: str):
+    return log_sort_key if kind == 'logs' else (lambda record: record['date'])
+
+
+def _dedupe_key(kind: str, record: Dict):
+    return record['log_id'] if kind == 'logs' else json.dumps(record, sort_keys=True)
+
+
+def _read_segment(path: Path) -> List[Dict]:
+    try:
+        with gzip.open(path, 'rt') as f:
+            return [json.loads(line) for line in f if line.strip()]
+    except FileNotFoundError:
+        return []
+
+
+def _write_segment(path: Path, lines: List[Dict]):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=str(path.parent), prefix=f".{path.name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            with gzip.GzipFile(fileobj=f, mode='wb') as gz:
+                gz.write("".join(json.dumps(line) + "\n" for line in lines).encode("utf-8"))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+
+
+def _add_to_rollup(totals: Dict, kind: str, record: Dict):
+    if kind == 'logs':
+        totals['workouts'] = totals.get('workouts', 0) + 1
+        totals['calories'] = totals.get('calories', 0) + record.get('calories_burned', 0)
+        totals['minutes'] = totals.get('minutes', 0) + record.get('duration_minutes', 0)
+    else:
+        totals['sessions'] = totals.get('sessions', 0) + 1
+        totals['sets'] = totals.get('sets', 0) + record.get('total_sets', 0)
+        totals['reps'] = totals.get('reps', 0) + record.get('total_reps', 0)
+        totals['volume'] = round(totals.get('volume', 0.0) + record.get('estimated_volume', 0.0), 2)
+        totals['intensity_sum'] = round(totals.get('intensity_sum', 0.0) + record.get('intensity_score', 0.0), 2)
+        muscles = totals.setdefault('muscles', {})
+        for muscle in record.get('muscle_groups', []):
+            muscles[muscle] = muscles.get(muscle, 0) + 1
+
+
+class ColdArchive:
+    """Compressed raw segments, roll-ups and the per-user archive index.
+
+    Every file is rewritten atomically under its writer lock, and each step
+    of the retention job records its own watermark, so an interrupted run
+    can simply be repeated.
+    """
+
+    INDEX_CACHE_SIZE = 256
+
+    def __init__(self, root: Path = STORAGE_DIR / "archive"):
+        self.root = Path(root)
+        self._index_cache: "OrderedDict[Path, Tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _index_file(self, bucket: str) -> Path:
+        return self.root / "index" / f"{bucket}.json"
+
+    def _rollup_file(self, bucket: str) -> Path:
+        return self.root / "rollups" / f"{bucket}.json"
+
+    def _segment_file(self, kind: str, month: str, bucket: str) -> Path:
+        return self.root / kind / month / f"{bucket}.jsonl.gz"
+
+    def archived_range(self, user_id: str, kind: str) -> Optional[Tuple[str, str]]:
+        """(first, before): every archived record has first <= date < before"""
+        path = self._index_file(_bucket(user_id))
+        version = file_version(path)
+        with self._lock:
+            cached = self._index_cache.get(path)
+        if cached is None or cached[0] != version:
+            cached = (version, read_json(path, {}))
+            with self._lock:
+                self._index_cache[path] = cached
+                self._index_cache.move_to_end(path)
+                while len(self._index_cache) > self.INDEX_CACHE_SIZE:
+                    self._index_cache.popitem(last=False)
+
+        entry = cached[1].get(user_id, {}).get(kind)
+        return (entry['first'], entry['before']) if entry else None
+
+    def read(self, user_id: str, kind: str, start: Optional[str] = None,
+             end: Optional[str] = None) -> Iterator[Dict]:
+        """Archived records of a user with start <= date < end, newest first, one month at a time"""
+        archived = self.archived_range(user_id, kind)
+        if archived is None:
+            return
+        first, before = archived
+        end = min(end, before) if end is not None else before
+        start = max(start, first) if start is not None else first
+        if start >= end:
+            return
+
+        bucket = _bucket(user_id)
+        for month in _months_desc(end[:7], start[:7]):
+            records = {}
+            for line in _read_segment(self._segment_file(kind, month, bucket)):
+                record = line['record']
+                if line['user_id'] == user_id and start <= record['date'] < end:
+                    records[_dedupe_key(kind, record)] = record
+            yield from sorted(records.values(), key=_sort_key(kind), reverse=True)
+
+    def iter_all(self, kind: str) -> Iterator[Dict]:
+        """Every archived record of a kind, one segment file in memory at a time"""
+        for segment in sorted(self.root.glob(f"{kind}/*/*.jsonl.gz")):
+            records = {}
+            for line in _read_segment(segment):
+                records[(line['user_id'], _dedupe_key(kind, line['record']))] = line['record']
+            yield from records.values()
+
+    def get_rollups(self, user_id: str, kind: str, period: str = 'weekly') -> Dict[str, Dict]:
+        """Aggregates of the archived records keyed by day (YYYY-MM-DD) or ISO week (YYYY-Www)"""
+        rollups = read_json(self._rollup_file(_bucket(user_id)), {})
+        return rollups.get(user_id, {}).get(kind, {}).get(period, {})
+
+    def store(self, kind: str, records_by_user: Dict[str, List[Dict]], cutoff: str) -> int:
+        """Archive records dated before cutoff: raw segments, then roll-ups, then the index.
+
+        Records already in the archive (from an interrupted run) are skipped,
+        and records older than a user's archived range (e.g. imported later)
+        are merged into their month's segment. Returns the number added.
+        """
+        by_bucket: Dict[str, Dict[str, List[Dict]]] = {}
+        for user_id, records in records_by_user.items():
+            if records:
+                by_bucket.setdefault(_bucket(user_id), {})[user_id] = records
+
+        added = 0
+        for bucket, users in by_bucket.items():
+            added += self._append_segments(kind, bucket, users)
+            update_json(self._rollup_file(bucket), dict, self._roll_up(kind, bucket, users, cutoff))
+            update_json(self._index_file(bucket), dict, self._extend_index(kind, users, cutoff))
+        return added
+
+    def _append_segments(self, kind: str, bucket: str, users: Dict[str, List[Dict]]) -> int:
+        by_month: Dict[str, List[Dict]] = {}
+        for user_id, records in users.items():
+            for record in records:
+                by_month.setdefault(record['date'][:7], []).append({"user_id": user_id, "record": record})
+
+        added = 0
+        for month, lines in by_month.items():
+            path = self._segment_file(kind, month, bucket)
+            with FileLock(path):
+                segment = _read_segment(path)
+                seen = {(line['user_id'], _dedupe_key(kind, line['record'])) for line in segment}
+                new = []
+                for line in lines:
+                    key = (line['user_id'], _dedupe_key(kind, line['record']))
+                    if key not in seen:
+                        seen.add(key)
+                        new.append(line)
+                if new:
+                    _write_segment(path, segment + new)
+                    added += len(new)
+        return added
+
+    def _roll_up(self, kind: str, bucket: str, users: Dict[str, List[Dict]], cutoff: str):
+        """Recompute the users' roll-ups from every archived segment of their bucket"""
+        fresh = {user_id: {"before": cutoff, "daily": {}, "weekly": {}} for user_id in users}
+        for segment in sorted(self.root.glob(f"{kind}/*/{bucket}.jsonl.gz")):
+            seen = set()
+            for line in _read_segment(segment):
+                key = (line['user_id'], _dedupe_key(kind, line['record']))
+                if line['user_id'] not in fresh or key in seen:
+                    continue
+                seen.add(key)
+                record, entry = line['record'], fresh[line['user_id']]
+                _add_to_rollup(entry['daily'].setdefault(record['date'][:10], {}), kind, record)
+                _add_to_rollup(entry['weekly'].setdefault(_week(record['date']), {}), kind, record)
+
+        def replace(rollups):
+            for user_id, entry in fresh.items():
+                kinds = rollups.setdefault(user_id, {})
+                if kind in kinds:
+                    entry['before'] = max(entry['before'], kinds[kind]['before'])
+                kinds[kind] = entry
+        return replace
+
+    @staticmethod
+    def _extend_index(kind: str, users: Dict[str, List[Dict]], cutoff: str):
+        def extend(index):
+            for user_id, records in users.items():
+                first = min(record['date'] for record in records)
+                entry = index.setdefault(user_id, {}).setdefault(kind, {"first": first, "before": cutoff})
+                entry['first'] = min(entry['first'], first)
+                entry['before'] = max(entry['before'], cutoff)
+        return extend
+
+
+class ArchivedStorage(StorageBackend):
+    """Storage backend wrapper whose log and intensity reads reach into the cold archive.
+
+    Anything dated before a user's archived ``before`` date is served from
+    the archive merged with the hot records still dated in that range
+    (archived but not yet pruned, or added since, e.g. by an import); a
+    record in both is returned once.
+    """
+
+    def __init__(self, backend: StorageBackend, archive: ColdArchive):
+        self.backend = backend
+        self.archive = archive
+
+    def _archived_before(self, user_id: str, kind: str) -> Optional[str]:
+        archived = self.archive.archived_range(user_id, kind)
+        return archived[1] if archived else None
+
+    def get_user_logs(self, user_id: str) -> List[Dict]:
+        hot = self.backend.get_user_logs(user_id)
+        before = self._archived_before(user_id, 'logs')
+        if before is None:
+            return hot
+        hot_ids = {log['log_id'] for log in hot}
+        archived = [log for log in self.archive.read(user_id, 'logs') if log['log_id'] not in hot_ids]
+        archived.reverse()
+        return archived + hot
+
+    def _older_logs(self, user_id: str, start: Optional[str], end: Optional[str], before: str) -> Iterator[Dict]:
+        """Logs dated before `before` (and in start..end), newest first: archived ones merged with hot ones"""
+        older_end = min(end, before) if end is not None else before
+        hot, _ = self.backend.query_logs(user_id, start, older_end)
+        hot_ids = {log['log_id'] for log in hot}
+        archived = (log for log in self.archive.read(user_id, 'logs', start, end) if log['log_id'] not in hot_ids)
+        return heapq.merge(hot, archived, key=log_sort_key, reverse=True)
+
+    def query_logs(self, user_id: str, start: Optional[str] = None, end: Optional[str] = None,
+                   limit: Optional[int] = None, cursor: Optional[str] = None) -> Tuple[List[Dict], Optional[str]]:
+        before = self._archived_before(user_id, 'logs')
+        if before is None:
+            return self.backend.query_logs(user_id, start, end, limit, cursor)
+
+        hot_start = max(start, before) if start is not None else before
+        if end is not None and end <= hot_start:
+            page, next_cursor = [], None
+        else:
+            page, next_cursor = self.backend.query_logs(user_id, hot_start, end, limit, cursor)
+        if next_cursor is not None or (start is not None and start >= before):
+            return page, next_cursor
+
+        # The hot side is exhausted: continue the page from the archive
+        archived = self._older_logs(user_id, start, end, before)
+        after = encode_log_cursor(page[-1]) if page else cursor
+        if limit is None:
+            rest, _ = paginate_logs(archived, start, end, None, after)
+            return page + rest, None
+        if len(page) == limit:
+            more, _ = paginate_logs(archived, start, end, 1, after)
+            return page, encode_log_cursor(page[-1]) if more else None
+        rest, next_cursor = paginate_logs(archived, start, end, limit - len(page), after)
+        return page + rest, next_cursor
+
+    def get_intensities(self, user_id: str) -> List[Dict]:
+        return self.query_intensities(user_id)
+
+    def query_intensities(self, user_id: str, start: Optional[str] = None, end: Optional[str] = None) -> List[Dict]:
+        before = self._archived_before(user_id, 'intensity')
+        if before is None:
+            return self.backend.query_intensities(user_id, start, end)
+
+        archived = []
+        if start is None or start < before:
+            older_end = min(end, before) if end is not None else before
+            hot_older = self.backend.query_intensities(user_id, start, older_end)
+            hot_keys = {_dedupe_key('intensity', record) for record in hot_older}
+            archived = [
+                record for record in self.archive.read(user_id, 'intensity', start, end)
+                if _dedupe_key('intensity', record) not in hot_keys
+            ]
+            archived = sorted(archived + hot_older, key=_sort_key('intensity'))
+        hot_start = max(start, before) if start is not None else before
+        hot = self.backend.query_intensities(user_id, hot_start, end) if end is None or end > hot_start else []
+        return archived + hot
+
+    # Everything else goes straight to the backend
+    def get_profile(self, user_id: str) -> Optional[Dict]:
+        return self.backend.get_profile(user_id)
+
+    def save_profile(self, profile_data: Dict):
+        self.backend.save_profile(profile_data)
+
+    def append_log(self, log_data: Dict):
+        self.backend.append_log(log_data)
+
+    def get_user_stats(self, user_id: str) -> Optional[Dict]:
+        return self.backend.get_user_stats(user_id)
+
+    def save_user_stats(self, user_id: str, stats_data: Dict):
+        self.backend.save_user_stats(user_id, stats_data)
+
+    def get_unlocked(self, user_id: str) -> Dict[str, str]:
+        return self.backend.get_unlocked(user_id)
+
+    def save_unlocked(self, user_id: str, unlocked: Dict[str, str]):
+        self.backend.save_unlocked(user_id, unlocked)
+
+    def append_intensity(self, user_id: str, intensity_data: Dict, max_entries: Optional[int] = None):
+        self.backend.append_intensity(user_id, intensity_data, max_entries)
+
+    def update_intensities(self, user_id: str, records: List[Dict]):
+        self.backend.update_intensities(user_id, records)
+
+    def append_event(self, user_id: str, event: Dict) -> Dict:
+        return self.backend.append_event(user_id, event)
+
+    def get_events(self, user_id: str, after_seq: int = 0) -> List[Dict]:
+        return self.backend.get_events(user_id, after_seq)
+
+    def get_user_document(self, name: str, user_id: str) -> Optional[Dict]:
+        return self.backend.get_user_document(name, user_id)
+
+    def save_user_document(self, name: str, user_id: str, data: Dict):
+        self.backend.save_user_document(name, user_id, data)
+
+    def prune_before(self, kind: str, cutoff: str, user_ids: Iterable[str]):
+        self.backend.prune_before(kind, cutoff, user_ids)
+
+    def iter_user_ids(self) -> Iterator[str]:
+        return self.backend.iter_user_ids()
+
+    def iter_user_stats(self) -> Iterator[Dict]:
+        return self.backend.iter_user_stats()
+
+    def iter_logs(self) -> Iterator[Dict]:
+        """Every hot log, then the archived logs that are not also still hot"""
+        hot_archived = set()  # hot logs in the archived range; few, since retention prunes them
+        for log in self.backend.iter_logs():
+            before = self._archived_before(log['user_id'], 'logs')
+            if before is not None and log['date'] < before:
+                hot_archived.add((log['user_id'], log['log_id']))
+            yield log
+        for log in self.archive.iter_all('logs'):
+            if (log['user_id'], log['log_id']) not in hot_archived:
+                yield log
+
+    def import_logs(self, chunks: Iterable[List[Dict]]) -> int:
+        return self.backend.import_logs(chunks)
+
+    @property
+    def atomic_batches(self) -> bool:
+        return self.backend.atomic_batches
+
+    def apply_batch(self, operations: List[Tuple[str, tuple]]):
+        self.backend.apply_batch(operations)
+
+    def version(self, kind: str, user_id: str):
+        return self.backend.version(kind, user_id)
+
+    def close(self):
+        self.backend.close()
+
+
+def apply_retention(storage: StorageBackend, archive: ColdArchive, hot_days: int = RETENTION_HOT_DAYS,
+                    now: Optional[datetime] = None, user_ids: Optional[Iterable[str]] = None,
+                    chunk_size: int = 1000) -> Dict[str, int]:
+    """Archive and prune logs and intensity records older than hot_days.
+
+    storage must be the plain backend (create_storage(..., archive=False)) so
+    that hot records already archived by an interrupted run are visible and
+    get pruned.
+    """
+    cutoff = ((now or datetime.now()) - timedelta(days=hot_days)).isoformat()
+    counts = {"users": 0, "logs": 0, "intensity": 0}
+
+    chunk = []
+    for user_id in (storage.iter_user_ids() if user_ids is None else user_ids):
+        chunk.append(user_id)
+        if len(chunk) >= chunk_size:
+            _retain_chunk(storage, archive, chunk, cutoff, counts)
+            chunk = []
+    if chunk:
+        _retain_chunk(storage, archive, chunk, cutoff, counts)
+    return counts
+
+
+def _retain_chunk(storage: StorageBackend, archive: ColdArchive, user_ids: List[str], cutoff: str, counts: Dict):
+    counts["users"] += len(user_ids)
+    for kind in KINDS:
+        to_archive, to_prune = {}, []
+        for user_id in user_ids:
+            if kind == 'logs':
+                old, _ = storage.query_logs(user_id, end=cutoff)
+            else:
+                old = storage.query_intensities(user_id, end=cutoff)
+            if not old:
+                continue
+            to_archive[user_id] = old  # including any dated before the archived range, e.g. imports
+            to_prune.append(user_id)
+
+        counts[kind] += archive.store(kind, to_archive, cutoff)
+        if to_prune:
+            storage.prune_before(kind, cutoff, to_prune)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Archive and roll up old workout data")
+    parser.add_argument("command", choices=["apply"])
+    parser.add_argument("--storage-dir", type=Path, default=STORAGE_DIR)
+    parser.add_argument("--hot-days", type=int, default=RETENTION_HOT_DAYS)
+    args = parser.parse_args()
+
+    storage = create_storage(args.storage_dir, archive=False)
+    counts = apply_retention(storage, ColdArchive(args.storage_dir / "archive"), args.hot_days)
+    storage.close()
+    print(f"Checked {counts['users']} users; archived {counts['logs']} logs and {counts['intensity']} intensity records")
+
+
+if __name__ == "__main__":
+    main()
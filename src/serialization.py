@@ -0,0 +1,140 @@
+"""
+Compact Record Serialization for FitFlow AI
+Versioned msgpack encoding for stored records: field names become small
+integer keys and ISO timestamps become integer epoch microseconds
+"""
+
+from typing import Any, Dict, Union
+from datetime import datetime, timedelta
+import json
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+
+FORMAT_VERSION = 1
+
+EPOCH = datetime(1970, 1, 1)
+
+# Field order is part of the format: append new fields, never reorder
+# (reordering needs a FORMAT_VERSION bump)
+SCHEMAS = {
+    'profile': (
+        'user_id', 'name', 'fitness_goal', 'experience_level', 'days_per_week', 'session_duration',
+        'injuries_limitations', 'preferred_muscle_groups', 'gym_id', 'created_at', 'total_workouts',
+        'current_streak', 'last_workout_date'
+    ),
+    'log': (
+        'log_id', 'user_id', 'date', 'day_number', 'exercises_completed', 'total_exercises',
+        'duration_minutes', 'calories_burned', 'notes'
+    ),
+    'stats': (
+        'user_id', 'level', 'xp', 'total_workouts', 'current_streak', 'longest_streak', 'total_sets',
+        'total_reps', 'achievements_unlocked', 'last_workout_date', 'muscle_exercises',
+        'gym_id', 'week_key', 'week_volume', 'month_key', 'month_workouts', 'event_seq',
+        'activity_start', 'activity_days'
+    ),
+    'intensity': (
+        'date', 'total_sets', 'total_reps', 'estimated_volume', 'muscle_groups', 'intensity_score'
+    ),
+    'event': (
+        'seq', 'type', 'at', 'exercises_completed', 'total_sets', 'total_reps', 'muscle_groups', 'gym_id'
+    ),
+}
+
+DATE_FIELDS = {
+    'profile': {'created_at', 'last_workout_date'},
+    'log': {'date'},
+    'stats': {'last_workout_date'},
+    'intensity': {'date'},
+    'event': {'at'},
+}
+
+# Timestamp fields that are datetime objects (not strings) on the dataclasses
+DATETIME_FIELDS = {
+    'profile': {'created_at'},
+    'log': {'date'},
+    'stats': set(),
+    'intensity': set(),
+    'event': set(),
+}
+
+_FIELD_KEYS = {kind: {name: i for i, name in enumerate(fields)} for kind, fields in SCHEMAS.items()}
+
+
+def _require_msgpack():
+    if msgpack is None:
+        raise ImportError("The msgpack record format needs the 'msgpack' package (pip install msgpack)")
+
+
+def _pack_date(value):
+    """ISO string -> epoch microseconds, only when that round-trips to the same string"""
+    if not isinstance(value, str):
+        return value
+    try:
+        moment = datetime.fromisoformat(value)
+    except ValueError:
+        return value
+    if moment.tzinfo is not None or moment.isoformat() != value:
+        return value
+    return (moment - EPOCH) // timedelta(microseconds=1)
+
+
+def _unpack_date(value, as_datetime: bool):
+    if not isinstance(value, int):
+        return value
+    moment = EPOCH + timedelta(microseconds=value)
+    return moment if as_datetime else moment.isoformat()
+
+
+def pack(kind: str, record: Dict) -> bytes:
+    """Encode one record as msgpack [FORMAT_VERSION, {field index | unknown name: value}]"""
+    _require_msgpack()
+    keys = _FIELD_KEYS[kind]
+    dates = DATE_FIELDS[kind]
+    body = {}
+    for name, value in record.items():
+        if name in dates:
+            value = _pack_date(value)
+        body[keys.get(name, name)] = value
+    return msgpack.packb([FORMAT_VERSION, body], use_bin_type=True)
+
+
+def unpack(kind: str, data: bytes, typed: bool = False) -> Dict:
+    """Decode a record from pack().
+
+    With typed=True the dataclasses' datetime fields come back as datetime
+    objects, so constructors skip ISO parsing; otherwise every timestamp is
+    an ISO string, exactly as the JSON format stores it.
+    """
+    _require_msgpack()
+    version, body = msgpack.unpackb(data, raw=False, strict_map_key=False)
+    if version != FORMAT_VERSION:
+        raise ValueError(f"Unsupported record format version {version} (expected {FORMAT_VERSION})")
+
+    fields = SCHEMAS[kind]
+    dates = DATE_FIELDS[kind]
+    datetimes = DATETIME_FIELDS[kind] if typed else ()
+    record = {}
+    for key, value in body.items():
+        name = fields[key] if isinstance(key, int) else key
+        record[name] = _unpack_date(value, name in datetimes) if name in dates else value
+    return record
+
+
+def encode_record(kind: str, record: Dict, record_format: str) -> Union[str, bytes]:
+    """Encode for storage as JSON text or msgpack bytes"""
+    if record_format == "msgpack":
+        return pack(kind, record)
+    if record_format == "json":
+        return json.dumps(record)
+    raise ValueError(f"Unknown record format: {record_format}")
+
+
+def decode_record(kind: str, data: Union[str, bytes]) -> Dict[str, Any]:
+    """Decode either format; the stored type tells them apart, so mixed data needs no migration"""
+    if isinstance(data, (bytes, bytearray, memoryview)):
+        return unpack(kind, bytes(data))
+    return json.loads(data)
@@ -0,0 +1,407 @@
+"""
+Sharded Storage Layout for FitFlow AI
+Each user's data lives in its own directory, spread over a hashed
+directory fan-out, so a single-user update never touches other users
+
+    storage/users/<h0>/<h1>/<user_id>/profile.json
+                                      logs.jsonl      (sorted by date)
+                                      stats.json
+                                      unlocked.json
+                                      intensity.json
+                                      events.jsonl    (gamification events, by seq)
+                                      docs/<name>.json (user documents)
+
+Run as a module to migrate flat JSON files or rebalance the fan-out:
+    python -m src.sharding migrate
+    python -m src.sharding rebalance --levels 3 --width 2
+"""
+
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+from pathlib import Path
+from urllib.parse import quote, unquote
+import argparse
+import hashlib
+import os
+
+from config import STORAGE_DIR, STORAGE_SHARD_LEVELS, STORAGE_SHARD_WIDTH
+from src.atomic_io import (
+    FileLock, read_json, atomic_write_json, update_json, append_json_lines, append_json_lines_after, read_json_lines,
+    iter_json_lines_reversed, filter_json_lines, file_version
+)
+from src.storage import (
+    JSONStorage, StorageBackend, event_sort_key, log_sort_key, paginate_logs, replace_by_date, sequence_events
+)
+
+
+class ShardRouter:
+    """Maps a user_id to its directory under the hashed fan-out.
+
+    ``levels`` directories of ``width`` hex characters each are taken from
+    the SHA-1 of the user_id, e.g. levels=2, width=2 gives 65,536 leaf
+    buckets. The active layout is recorded in ``layout.json`` so routers
+    never disagree about where a user lives.
+    """
+
+    LAYOUT_FILE = "layout.json"
+
+    def __init__(self, root: Path, levels: int = STORAGE_SHARD_LEVELS, width: int = STORAGE_SHARD_WIDTH):
+        self.root = Path(root)
+        layout = read_json(self.root / self.LAYOUT_FILE)
+        if layout is None:
+            layout = {"levels": levels, "width": width}
+            atomic_write_json(self.root / self.LAYOUT_FILE, layout)
+        self.levels = layout["levels"]
+        self.width = layout["width"]
+
+    @staticmethod
+    def bucket_path(user_id: str, levels: int, width: int) -> Path:
+        digest = hashlib.sha1(user_id.encode("utf-8")).hexdigest()
+        parts = [digest[i * width:(i + 1) * width] for i in range(levels)]
+        return Path(*parts, path_name(user_id))
+
+    def user_dir(self, user_id: str) -> Path:
+        return self.root / self.bucket_path(user_id, self.levels, self.width)
+
+    def iter_user_dirs(self) -> Iterator[Tuple[str, Path]]:
+        """Yield (user_id, directory) for every stored user"""
+        for user_id in iter_users_in_layout(self.root, self.levels, self.width):
+            yield user_id, self.user_dir(user_id)
+
+
+def path_name(text: str) -> str:
+    """text as a single path component (unquote reverses it); "." and ".." are escaped too"""
+    name = quote(text, safe="-_.")
+    return name.replace(".", "%2E") if name in (".", "..") else name
+
+
+class ShardedJSONStorage(StorageBackend):
+    """JSON backend with one small set of files per user"""
+
+    def __init__(self, storage_dir: Path, levels: int = STORAGE_SHARD_LEVELS, width: int = STORAGE_SHARD_WIDTH):
+        self.storage_dir = Path(storage_dir)
+        self.router = ShardRouter(self.storage_dir / "users", levels, width)
+
+    def _file(self, user_id: str, name: str) -> Path:
+        return self.router.user_dir(user_id) / name
+
+    def _document_file(self, user_id: str, name: str) -> Path:
+        return self._file(user_id, f"docs/{path_name(name)}.json")
+
+    def _stored_document_file(self, user_id: str, name: str) -> Path:
+        """Where to read a document: docs/, or the user directory for one last saved before docs/ existed"""
+        path = self._document_file(user_id, name)
+        legacy = self._file(user_id, f"{name}.json")
+        if not path.exists() and legacy.name not in self.FILES.values() and legacy.exists():
+            return legacy
+        return path
+
+    def get_profile(self, user_id: str) -> Optional[Dict]:
+        return read_json(self._file(user_id, "profile.json"))
+
+    def save_profile(self, profile_data: Dict):
+        update_json(*self._mutation('save_profile', profile_data))
+
+    def append_log(self, log_data: Dict):
+        append_json_lines(self._file(log_data['user_id'], "logs.jsonl"), [log_data], log_sort_key)
+
+    def get_user_logs(self, user_id: str) -> List[Dict]:
+        return read_json_lines(self._file(user_id, "logs.jsonl"))
+
+    def query_logs(self, user_id: str, start: Optional[str] = None, end: Optional[str] = None,
+                   limit: Optional[int] = None, cursor: Optional[str] = None) -> Tuple[List[Dict], Optional[str]]:
+        """logs.jsonl is kept in date order, so a page is read backwards from the end of the file"""
+        newest_first = iter_json_lines_reversed(self._file(user_id, "logs.jsonl"))
+        return paginate_logs(newest_first, start, end, limit, cursor)
+
+    def get_user_stats(self, user_id: str) -> Optional[Dict]:
+        return read_json(self._file(user_id, "stats.json"))
+
+    def save_user_stats(self, user_id: str, stats_data: Dict):
+        update_json(*self._mutation('save_user_stats', user_id, stats_data))
+
+    def get_unlocked(self, user_id: str) -> Dict[str, str]:
+        return read_json(self._file(user_id, "unlocked.json"), {})
+
+    def save_unlocked(self, user_id: str, unlocked: Dict[str, str]):
+        update_json(*self._mutation('save_unlocked', user_id, unlocked))
+
+    def get_user_document(self, name: str, user_id: str) -> Optional[Dict]:
+        return read_json(self._stored_document_file(user_id, name))
+
+    def save_user_document(self, name: str, user_id: str, data: Dict):
+        update_json(*self._mutation('save_user_document', name, user_id, data))
+
+    def get_intensities(self, user_id: str) -> List[Dict]:
+        return read_json(self._file(user_id, "intensity.json"), [])
+
+    def append_intensity(self, user_id: str, intensity_data: Dict, max_entries: Optional[int] = None):
+        update_json(*self._mutation('append_intensity', user_id, intensity_data, max_entries))
+
+    def update_intensities(self, user_id: str, records: List[Dict]):
+        update_json(*self._mutation('update_intensities', user_id, records))
+
+    def append_event(self, user_id: str, event: Dict) -> Dict:
+        return _append_events(self._file(user_id, "events.jsonl"), [event])[0]
+
+    def get_events(self, user_id: str, after_seq: int = 0) -> List[Dict]:
+        """Reads backwards from the end, so a short tail after a snapshot is cheap"""
+        tail = []
+        for event in iter_json_lines_reversed(self._file(user_id, "events.jsonl")):
+            if event['seq'] <= after_seq:
+                break
+            tail.append(event)
+        tail.reverse()
+        return tail
+
+    def prune_before(self, kind: str, cutoff: str, user_ids: Iterable[str]):
+        def keep(record):
+            return record['date'] >= cutoff
+
+        def prune(history):
+            history[:] = [record for record in history if keep(record)]
+
+        for user_id in user_ids:
+            if kind == 'logs':
+                filter_json_lines(self._file(user_id, "logs.jsonl"), keep)
+            elif self._file(user_id, "intensity.json").exists():
+                update_json(self._file(user_id, "intensity.json"), list, prune)
+
+    FILES = {
+        'profile': "profile.json",
+        'logs': "logs.jsonl",
+        'stats': "stats.json",
+        'unlocked': "unlocked.json",
+        'intensity': "intensity.json",
+        'events': "events.jsonl",
+    }
+
+    def version(self, kind: str, user_id: str):
+        if kind.startswith('doc:'):
+            return file_version(self._stored_document_file(user_id, kind[len('doc:'):]))
+        return file_version(self._file(user_id, self.FILES[kind]))
+
+    def apply_batch(self, operations: List[Tuple[str, tuple]]):
+        """One locked rewrite per touched file; log and event appends are grouped per user"""
+        log_appends = {}
+        event_appends = {}
+        batches = {}
+        for name, args in operations:
+            if name == 'append_log':
+                log_data, = args
+                log_appends.setdefault(self._file(log_data['user_id'], "logs.jsonl"), []).append(log_data)
+                continue
+            if name == 'append_event':
+                user_id, event = args
+                event_appends.setdefault(self._file(user_id, "events.jsonl"), []).append(event)
+                continue
+            path, default, mutate = self._mutation(name, *args)
+            batches.setdefault(path, (default, []))[1].append(mutate)
+
+        for path, records in log_appends.items():
+            append_json_lines(path, records, log_sort_key)
+        for path, records in event_appends.items():
+            _append_events(path, records)
+
+        for path, (default, mutators) in batches.items():
+            def apply_all(data, mutators=mutators):
+                for mutate in mutators:
+                    mutate(data)
+
+            update_json(path, default, apply_all)
+
+    def _mutation(self, name: str, *args) -> Tuple[Path, Callable, Callable]:
+        """Describe a write as (file, default factory, in-place mutator)"""
+        if name == 'save_profile':
+            profile_data, = args
+            return self._file(profile_data['user_id'], "profile.json"), dict, _replace_with(profile_data)
+
+        if name == 'save_user_stats':
+            user_id, stats_data = args
+            return self._file(user_id, "stats.json"), dict, _replace_with(stats_data)
+
+        if name == 'save_unlocked':
+            user_id, unlocked = args
+            return self._file(user_id, "unlocked.json"), dict, _replace_with(unlocked)
+
+        if name == 'save_user_document':
+            doc_name, user_id, data = args
+            return self._document_file(user_id, doc_name), dict, _replace_with(data)
+
+        if name == 'append_intensity':
+            user_id, intensity_data, max_entries = args if len(args) == 3 else (*args, None)
+
+            def append(history):
+                history.append(intensity_data)
+                if max_entries:
+                    del history[:-max_entries]
+
+            return self._file(user_id, "intensity.json"), list, append
+
+        if name == 'update_intensities':
+            user_id, records = args
+
+            def update(history):
+                history[:] = replace_by_date(history, records)
+
+            return self._file(user_id, "intensity.json"), list, update
+
+        raise ValueError(f"Unknown storage operation: {name}")
+
+    def iter_user_ids(self) -> Iterator[str]:
+        for user_id, _ in self.router.iter_user_dirs():
+            yield user_id
+
+    def iter_logs(self) -> Iterator[Dict]:
+        for _, user_dir in self.router.iter_user_dirs():
+            yield from read_json_lines(user_dir / "logs.jsonl")
+
+    def import_logs(self, chunks: Iterable[List[Dict]]) -> int:
+        """Each chunk is grouped per user and appended with one locked write per user file"""
+        total = 0
+        for chunk in chunks:
+            by_user = {}
+            for log in chunk:
+                by_user.setdefault(log['user_id'], []).append(log)
+            for user_id, logs in by_user.items():
+                append_json_lines(self._file(user_id, "logs.jsonl"), logs, log_sort_key)
+            total += len(chunk)
+        return total
+
+
+def _append_events(path: Path, events: List[Dict]) -> List[Dict]:
+    """Append events after the file's last seq; returns them as stored"""
+    events = sorted(events, key=event_sort_key)
+    return append_json_lines_after(path, lambda last: sequence_events(events, last['seq'] if last else 0))
+
+
+def _replace_with(new_data: Dict) -> Callable[[Dict], None]:
+    def replace(current):
+        current.clear()
+        current.update(new_data)
+    return replace
+
+
+# Flat JSON files whose names overlap the legacy user_<name>.json document pattern
+FLAT_RECORD_FILES = {"user_profiles.json", "user_stats.json"}
+
+
+def migrate_flat_json(storage_dir: Path, levels: int = STORAGE_SHARD_LEVELS, width: int = STORAGE_SHARD_WIDTH) -> Dict:
+    """Copy the flat JSON files into the sharded layout (originals are left in place)"""
+    storage_dir = Path(storage_dir)
+    sharded = ShardedJSONStorage(storage_dir, levels, width)
+    counts = {"profiles": 0, "logs": 0, "stats": 0, "unlocked": 0, "intensity": 0, "events": 0, "documents": 0}
+
+    for profile in read_json(storage_dir / "user_profiles.json", []):
+        atomic_write_json(sharded._file(profile['user_id'], "profile.json"), profile)
+        counts["profiles"] += 1
+
+    logs_by_user = {}
+    for log in read_json(storage_dir / "workout_logs.json", []):
+        logs_by_user.setdefault(log['user_id'], []).append(log)
+    for user_id, logs in logs_by_user.items():
+        logs_file = sharded._file(user_id, "logs.jsonl")
+        if logs_file.exists():
+            logs_file.unlink()
+        append_json_lines(logs_file, logs, log_sort_key)
+        counts["logs"] += len(logs)
+
+    for user_id, stats in read_json(storage_dir / "user_stats.json", {}).items():
+        atomic_write_json(sharded._file(user_id, "stats.json"), stats)
+        counts["stats"] += 1
+
+    for unlocked_file in storage_dir.glob("unlocked_*.json"):
+        user_id = unlocked_file.stem[len("unlocked_"):]
+        atomic_write_json(sharded._file(user_id, "unlocked.json"), read_json(unlocked_file, {}))
+        counts["unlocked"] += 1
+
+    for user_id, history in read_json(storage_dir / "workout_intensity.json", {}).items():
+        atomic_write_json(sharded._file(user_id, "intensity.json"), history)
+        counts["intensity"] += 1
+
+    for user_id, events in read_json(storage_dir / "gamification_events.json", {}).items():
+        events_file = sharded._file(user_id, "events.jsonl")
+        if events_file.exists():
+            events_file.unlink()
+        append_json_lines(events_file, events, event_sort_key)
+        counts["events"] += len(events)
+
+    # Per-user documents (gamification snapshots, recovery workload, ...) live in docs/<name>.json,
+    # or in user_<name>.json if they have not been saved since docs/ was introduced
+    flat = JSONStorage(storage_dir)
+    names = {path.stem for path in storage_dir.glob("docs/*.json")}
+    names |= {
+        path.stem[len("user_"):] for path in storage_dir.glob("user_*.json") if path.name not in FLAT_RECORD_FILES
+    }
+    for name in sorted(names):
+        for user_id, data in read_json(flat._stored_document_file(name), {}).items():
+            atomic_write_json(sharded._document_file(user_id, name), data)
+            counts["documents"] += 1
+
+    return counts
+
+
+def rebalance(storage_dir: Path, levels: int, width: int) -> int:
+    """Move every user directory to a new fan-out.
+
+    Safe to re-run after an interruption: users already at their new
+    location are skipped and the layout is only switched once all moves
+    are done. Run it while the app is stopped.
+    """
+    root = Path(storage_dir) / "users"
+    router = ShardRouter(root)
+    layout_file = root / ShardRouter.LAYOUT_FILE
+
+    with FileLock(layout_file):
+        moved = 0
+        for user_id in list(iter_users_in_layout(root, router.levels, router.width)):
+            src = root / ShardRouter.bucket_path(user_id, router.levels, router.width)
+            dst = root / ShardRouter.bucket_path(user_id, levels, width)
+            if src == dst or dst.exists():
+                continue
+            dst.parent.mkdir(parents=True, exist_ok=True)
+            os.replace(src, dst)
+            moved += 1
+
+        atomic_write_json(layout_file, {"levels": levels, "width": width})
+
+    _prune_empty_dirs(root)
+    return moved
+
+
+def iter_users_in_layout(root: Path, levels: int, width: int) -> Iterator[str]:
+    """Yield user_ids whose directory sits exactly where the given layout puts them"""
+    for user_dir in Path(root).glob("/".join(["*"] * (levels + 1))):
+        user_id = unquote(user_dir.name)
+        if user_dir.is_dir() and user_dir.relative_to(root) == ShardRouter.bucket_path(user_id, levels, width):
+            yield user_id
+
+
+def _prune_empty_dirs(root: Path):
+    for directory in sorted((p for p in root.rglob("*") if p.is_dir()), key=lambda p: len(p.parts), reverse=True):
+        if not any(directory.iterdir()):
+            directory.rmdir()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Manage the sharded per-user storage layout")
+    parser.add_argument("--storage-dir", type=Path, default=STORAGE_DIR)
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    sub.add_parser("migrate", help="copy flat JSON storage files into the sharded layout")
+
+    rebalance_parser = sub.add_parser("rebalance", help="move users to a different directory fan-out")
+    rebalance_parser.add_argument("--levels", type=int, required=True)
+    rebalance_parser.add_argument("--width", type=int, required=True)
+
+    args = parser.parse_args()
+
+    if args.command == "migrate":
+        counts = migrate_flat_json(args.storage_dir)
+        print("Migrated " + ", ".join(f"{n} {kind}" for kind, n in counts.items()))
+    else:
+        moved = rebalance(args.storage_dir, args.levels, args.width)
+        print(f"Moved {moved} users to levels={args.levels}, width={args.width}")
+
+
+if __name__ == "__main__":
+    main()
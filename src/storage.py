@@ -0,0 +1,810 @@
+"""
+Storage Repository for FitFlow AI
+Single interface for profiles, workout logs, user stats, unlocked
+achievements, workout intensity and gamification events, with pluggable backends
+"""
+
+from typing import Callable, Iterable, Iterator, List, Dict, Optional, Tuple
+from pathlib import Path
+import json
+import sqlite3
+import threading
+
+from config import STORAGE_BACKEND, STORAGE_CACHE_SIZE, STORAGE_FORMAT, SQLITE_DB_FILE
+from src.atomic_io import read_json, update_json, file_version
+from src.serialization import encode_record, decode_record
+
+
+class StorageBackend:
+    """Base interface every storage backend implements"""
+
+    # Profiles
+    def get_profile(self, user_id: str) -> Optional[Dict]:
+        raise NotImplementedError
+
+    def save_profile(self, profile_data: Dict):
+        raise NotImplementedError
+
+    # Workout logs
+    def append_log(self, log_data: Dict):
+        raise NotImplementedError
+
+    def get_user_logs(self, user_id: str) -> List[Dict]:
+        raise NotImplementedError
+
+    def query_logs(self, user_id: str, start: Optional[str] = None, end: Optional[str] = None,
+                   limit: Optional[int] = None, cursor: Optional[str] = None) -> Tuple[List[Dict], Optional[str]]:
+        """Logs for a user newest first, with start <= date < end (ISO strings).
+
+        Returns (logs, next_cursor); pass next_cursor back to get the next
+        page. It is None once there is nothing older left. Backends override
+        this to avoid loading the whole history.
+        """
+        logs = sorted(self.get_user_logs(user_id), key=log_sort_key, reverse=True)
+        return paginate_logs(logs, start, end, limit, cursor)
+
+    # Gamification stats
+    def get_user_stats(self, user_id: str) -> Optional[Dict]:
+        raise NotImplementedError
+
+    def save_user_stats(self, user_id: str, stats_data: Dict):
+        raise NotImplementedError
+
+    # Unlocked achievements
+    def get_unlocked(self, user_id: str) -> Dict[str, str]:
+        raise NotImplementedError
+
+    def save_unlocked(self, user_id: str, unlocked: Dict[str, str]):
+        raise NotImplementedError
+
+    # Derived per-user state documents (e.g. 'workload'), one JSON object per user and name
+    def get_user_document(self, name: str, user_id: str) -> Optional[Dict]:
+        raise NotImplementedError
+
+    def save_user_document(self, name: str, user_id: str, data: Dict):
+        raise NotImplementedError
+
+    # Workout intensity history
+    def get_intensities(self, user_id: str) -> List[Dict]:
+        raise NotImplementedError
+
+    def append_intensity(self, user_id: str, intensity_data: Dict, max_entries: Optional[int] = None):
+        raise NotImplementedError
+
+    def update_intensities(self, user_id: str, records: List[Dict]):
+        """Overwrite the stored records that have the same date as one of records (others are ignored)"""
+        raise NotImplementedError
+
+    def query_intensities(self, user_id: str, start: Optional[str] = None, end: Optional[str] = None) -> List[Dict]:
+        """Intensity records with start <= date < end (ISO strings), oldest first"""
+        return [
+            record for record in self.get_intensities(user_id)
+            if (start is None or record['date'] >= start) and (end is None or record['date'] < end)
+        ]
+
+    # Gamification event log (append-only, numbered by a per-user 'seq')
+    def append_event(self, user_id: str, event: Dict) -> Dict:
+        """Append event and return it as stored: moved past the last seq if its own was already taken"""
+        raise NotImplementedError
+
+    def get_events(self, user_id: str, after_seq: int = 0) -> List[Dict]:
+        """Events with seq > after_seq, oldest first"""
+        raise NotImplementedError
+
+    # Retention
+    def prune_before(self, kind: str, cutoff: str, user_ids: Iterable[str]):
+        """Delete 'logs' or 'intensity' records dated before cutoff for the given users.
+
+        Used by the retention job once the records are safely archived.
+        """
+        raise NotImplementedError
+
+    # Bulk export / import
+    def iter_logs(self) -> Iterator[Dict]:
+        """Stream every stored workout log (grouped by user, no global order)"""
+        for user_id in self.iter_user_ids():
+            yield from self.get_user_logs(user_id)
+
+    def import_logs(self, chunks: Iterable[List[Dict]]) -> int:
+        """Append workout logs chunk by chunk, one batch per chunk; returns the number written"""
+        total = 0
+        for chunk in chunks:
+            self.apply_batch([('append_log', (log,)) for log in chunk])
+            total += len(chunk)
+        return total
+
+    def iter_user_ids(self) -> Iterator[str]:
+        """Every user with a stored profile"""
+        raise NotImplementedError
+
+    def iter_user_stats(self) -> Iterator[Dict]:
+        """Stream every user's gamification stats (for boards and batch jobs)"""
+        for user_id in self.iter_user_ids():
+            stats = self.get_user_stats(user_id)
+            if stats is not None:
+                yield stats
+
+    def version(self, kind: str, user_id: str):
+        """Cheap token that changes whenever the stored data for (kind, user_id) changes.
+
+        kind is one of 'profile', 'logs', 'stats', 'unlocked', 'intensity',
+        'events', or 'doc:<name>' for a user document.
+        None means the backend cannot tell, so callers must not cache.
+        """
+        return None
+
+    # True when apply_batch is all-or-nothing (a failed batch wrote nothing)
+    atomic_batches = False
+
+    def apply_batch(self, operations: List[Tuple[str, tuple]]):
+        """Apply a list of (method_name, args) write operations as one commit.
+
+        Backends override this to batch the writes; the default applies them
+        one after another.
+        """
+        for name, args in operations:
+            getattr(self, name)(*args)
+
+    def close(self):
+        """Release any resources held by the backend"""
+        pass
+
+
+def log_sort_key(log: Dict) -> Tuple[str, str]:
+    """Total order of workout logs: by date, ties broken by log_id"""
+    return (log['date'], log['log_id'])
+
+
+def event_sort_key(event: Dict) -> int:
+    return event['seq']
+
+
+def sequence_events(events: List[Dict], last_seq: int) -> List[Dict]:
+    """Events to append after last_seq, with any seq that is already taken moved past it.
+
+    Two writers that both read the same stats propose the same seq; the
+    backend applies this under its write lock so the log never holds a
+    duplicate.
+    """
+    sequenced = []
+    for event in events:
+        if event['seq'] <= last_seq:
+            event = {**event, 'seq': last_seq + 1}
+        sequenced.append(event)
+        last_seq = event['seq']
+    return sequenced
+
+
+def encode_log_cursor(log: Dict) -> str:
+    return f"{log['date']}|{log['log_id']}"
+
+
+def decode_log_cursor(cursor: str) -> Tuple[str, str]:
+    date, log_id = cursor.split("|", 1)
+    return (date, log_id)
+
+
+def paginate_logs(newest_first: Iterable[Dict], start: Optional[str] = None, end: Optional[str] = None,
+                  limit: Optional[int] = None, cursor: Optional[str] = None) -> Tuple[List[Dict], Optional[str]]:
+    """Take one page from logs ordered newest first, stopping as soon as the page is full
+    or the logs get older than start"""
+    after = decode_log_cursor(cursor) if cursor else None
+    page = []
+    for log in newest_first:
+        key = log_sort_key(log)
+        if after is not None and key >= after:
+            continue
+        if end is not None and log['date'] >= end:
+            continue
+        if start is not None and log['date'] < start:
+            break
+        if limit is not None and len(page) == limit:
+            return page, encode_log_cursor(page[-1])
+        page.append(log)
+    return page, None
+
+
+def replace_by_date(history: List[Dict], records: List[Dict]) -> List[Dict]:
+    """history with each record swapped for the one in records that has the same date"""
+    by_date = {record['date']: record for record in records}
+    return [by_date.get(record['date'], record) for record in history]
+
+
+class JSONStorage(StorageBackend):
+    """Original whole-file JSON layout under the storage directory.
+
+    Writers take a per-file lock and replace the file atomically; readers
+    never block.
+    """
+
+    def __init__(self, storage_dir: Path, profiles_file: Optional[Path] = None, logs_file: Optional[Path] = None):
+        self.storage_dir = Path(storage_dir)
+        self.profiles_file = Path(profiles_file) if profiles_file else self.storage_dir / "user_profiles.json"
+        self.logs_file = Path(logs_file) if logs_file else self.storage_dir / "workout_logs.json"
+        self.user_stats_file = self.storage_dir / "user_stats.json"
+        self.intensity_file = self.storage_dir / "workout_intensity.json"
+        self.events_file = self.storage_dir / "gamification_events.json"
+
+    def _unlocked_file(self, user_id: str) -> Path:
+        return self.storage_dir / f"unlocked_{user_id}.json"
+
+    def get_profile(self, user_id: str) -> Optional[Dict]:
+        profiles = read_json(self.profiles_file, [])
+        return next((p for p in profiles if p['user_id'] == user_id), None)
+
+    def save_profile(self, profile_data: Dict):
+        update_json(*self._mutation('save_profile', profile_data))
+
+    def append_log(self, log_data: Dict):
+        update_json(*self._mutation('append_log', log_data))
+
+    def get_user_logs(self, user_id: str) -> List[Dict]:
+        all_logs = read_json(self.logs_file, [])
+        return [log for log in all_logs if log['user_id'] == user_id]
+
+    def iter_user_ids(self) -> Iterator[str]:
+        for profile in read_json(self.profiles_file, []):
+            yield profile['user_id']
+
+    def iter_logs(self) -> Iterator[Dict]:
+        yield from read_json(self.logs_file, [])
+
+    def iter_user_stats(self) -> Iterator[Dict]:
+        yield from read_json(self.user_stats_file, {}).values()
+
+    def import_logs(self, chunks: Iterable[List[Dict]]) -> int:
+        """The flat file is one JSON array, so every chunk goes into a single rewrite"""
+        def extend(logs):
+            before = len(logs)
+            for chunk in chunks:
+                logs.extend(chunk)
+            return len(logs) - before
+
+        return update_json(self.logs_file, list, extend)
+
+    def get_user_stats(self, user_id: str) -> Optional[Dict]:
+        all_stats = read_json(self.user_stats_file, {})
+        return all_stats.get(user_id)
+
+    def save_user_stats(self, user_id: str, stats_data: Dict):
+        update_json(*self._mutation('save_user_stats', user_id, stats_data))
+
+    def get_unlocked(self, user_id: str) -> Dict[str, str]:
+        return read_json(self._unlocked_file(user_id), {})
+
+    def save_unlocked(self, user_id: str, unlocked: Dict[str, str]):
+        update_json(*self._mutation('save_unlocked', user_id, unlocked))
+
+    def _document_file(self, name: str) -> Path:
+        return self.storage_dir / "docs" / f"{name}.json"
+
+    def _legacy_document_file(self, name: str) -> Optional[Path]:
+        """user_<name>.json, where documents lived before docs/ (unless that is a record file)"""
+        path = self.storage_dir / f"user_{name}.json"
+        return None if path in (self.profiles_file, self.user_stats_file) else path
+
+    def _stored_document_file(self, name: str) -> Path:
+        path = self._document_file(name)
+        legacy = self._legacy_document_file(name)
+        return legacy if legacy is not None and not path.exists() and legacy.exists() else path
+
+    def get_user_document(self, name: str, user_id: str) -> Optional[Dict]:
+        return read_json(self._stored_document_file(name), {}).get(user_id)
+
+    def save_user_document(self, name: str, user_id: str, data: Dict):
+        update_json(*self._mutation('save_user_document', name, user_id, data))
+
+    def get_intensities(self, user_id: str) -> List[Dict]:
+        all_data = read_json(self.intensity_file, {})
+        return all_data.get(user_id, [])
+
+    def append_intensity(self, user_id: str, intensity_data: Dict, max_entries: Optional[int] = None):
+        update_json(*self._mutation('append_intensity', user_id, intensity_data, max_entries))
+
+    def update_intensities(self, user_id: str, records: List[Dict]):
+        update_json(*self._mutation('update_intensities', user_id, records))
+
+    def append_event(self, user_id: str, event: Dict) -> Dict:
+        return update_json(*self._mutation('append_event', user_id, event))
+
+    def get_events(self, user_id: str, after_seq: int = 0) -> List[Dict]:
+        events = read_json(self.events_file, {}).get(user_id, [])
+        return [event for event in events if event['seq'] > after_seq]
+
+    def prune_before(self, kind: str, cutoff: str, user_ids: Iterable[str]):
+        users = set(user_ids)
+        if kind == 'logs':
+            def prune_logs(logs):
+                logs[:] = [log for log in logs if log['user_id'] not in users or log['date'] >= cutoff]
+
+            update_json(self.logs_file, list, prune_logs)
+        else:
+            def prune_intensities(all_data):
+                for user_id in users & all_data.keys():
+                    all_data[user_id] = [r for r in all_data[user_id] if r['date'] >= cutoff]
+
+            update_json(self.intensity_file, dict, prune_intensities)
+
+    def apply_batch(self, operations: List[Tuple[str, tuple]]):
+        """Group operations by target file so each file is locked and rewritten once"""
+        batches = {}
+        for name, args in operations:
+            path, default, mutate = self._mutation(name, *args)
+            batches.setdefault(path, (default, []))[1].append(mutate)
+
+        for path, (default, mutators) in batches.items():
+            def apply_all(data, mutators=mutators):
+                for mutate in mutators:
+                    mutate(data)
+
+            update_json(path, default, apply_all)
+
+    def version(self, kind: str, user_id: str):
+        paths = {
+            'profile': self.profiles_file,
+            'logs': self.logs_file,
+            'stats': self.user_stats_file,
+            'intensity': self.intensity_file,
+            'events': self.events_file,
+        }
+        if kind.startswith('doc:'):
+            return file_version(self._stored_document_file(kind[len('doc:'):]))
+        return file_version(paths[kind] if kind in paths else self._unlocked_file(user_id))
+
+    def _mutation(self, name: str, *args) -> Tuple[Path, Callable, Callable]:
+        """Describe a write as (file, default factory, in-place mutator)"""
+        if name == 'save_profile':
+            profile_data, = args
+
+            def upsert(profiles):
+                existing_idx = next((i for i, p in enumerate(profiles) if p['user_id'] == profile_data['user_id']), None)
+                if existing_idx is not None:
+                    profiles[existing_idx] = profile_data
+                else:
+                    profiles.append(profile_data)
+
+            return self.profiles_file, list, upsert
+
+        if name == 'append_log':
+            log_data, = args
+            return self.logs_file, list, lambda logs: logs.append(log_data)
+
+        if name == 'save_user_stats':
+            user_id, stats_data = args
+
+            def put(all_stats):
+                all_stats[user_id] = stats_data
+
+            return self.user_stats_file, dict, put
+
+        if name == 'save_unlocked':
+            user_id, unlocked = args
+
+            def replace(current):
+                current.clear()
+                current.update(unlocked)
+
+            return self._unlocked_file(user_id), dict, replace
+
+        if name == 'save_user_document':
+            doc_name, user_id, data = args
+
+            def put_document(documents):
+                documents[user_id] = data
+
+            legacy = self._legacy_document_file(doc_name)
+
+            def existing():  # the first save carries over the other users' documents from user_<name>.json
+                return read_json(legacy, {}) if legacy else {}
+
+            return self._document_file(doc_name), existing, put_document
+
+        if name == 'append_intensity':
+            user_id, intensity_data, max_entries = args if len(args) == 3 else (*args, None)
+
+            def append(all_data):
+                history = all_data.setdefault(user_id, [])
+                history.append(intensity_data)
+                if max_entries:
+                    all_data[user_id] = history[-max_entries:]
+
+            return self.intensity_file, dict, append
+
+        if name == 'update_intensities':
+            user_id, records = args
+
+            def update(all_data):
+                if user_id in all_data:
+                    all_data[user_id] = replace_by_date(all_data[user_id], records)
+
+            return self.intensity_file, dict, update
+
+        if name == 'append_event':
+            user_id, event = args
+
+            def append(all_events):
+                history = all_events.setdefault(user_id, [])
+                stored, = sequence_events([event], history[-1]['seq'] if history else 0)
+                history.append(stored)
+                return stored
+
+            return self.events_file, dict, append
+
+        raise ValueError(f"Unknown storage operation: {name}")
+
+
+class SQLiteStorage(StorageBackend):
+    """SQLite backend in WAL mode with indexes on user_id and date.
+
+    Record payloads are written as JSON text or, with record_format
+    "msgpack", as compact binary blobs; reads accept either.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS profiles (
+            user_id TEXT PRIMARY KEY,
+            data TEXT NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS workout_logs (
+            log_id TEXT PRIMARY KEY,
+            user_id TEXT NOT NULL,
+            date TEXT NOT NULL,
+            data TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_workout_logs_user_date ON workout_logs (user_id, date);
+        CREATE TABLE IF NOT EXISTS user_stats (
+            user_id TEXT PRIMARY KEY,
+            data TEXT NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS unlocked_achievements (
+            user_id TEXT NOT NULL,
+            achievement_id TEXT NOT NULL,
+            unlocked_date TEXT,
+            PRIMARY KEY (user_id, achievement_id)
+        );
+        CREATE TABLE IF NOT EXISTS workout_intensity (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id TEXT NOT NULL,
+            date TEXT NOT NULL,
+            data TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_workout_intensity_user_date ON workout_intensity (user_id, date);
+        CREATE TABLE IF NOT EXISTS gamification_events (
+            user_id TEXT NOT NULL,
+            seq INTEGER NOT NULL,
+            data TEXT NOT NULL,
+            PRIMARY KEY (user_id, seq)
+        );
+        CREATE TABLE IF NOT EXISTS user_documents (
+            name TEXT NOT NULL,
+            user_id TEXT NOT NULL,
+            data TEXT NOT NULL,
+            PRIMARY KEY (name, user_id)
+        );
+        CREATE TABLE IF NOT EXISTS versions (
+            kind TEXT NOT NULL,
+            user_id TEXT NOT NULL,
+            version INTEGER NOT NULL,
+            PRIMARY KEY (kind, user_id)
+        );
+    """
+
+    def __init__(self, db_path: Path, record_format: str = STORAGE_FORMAT):
+        self.db_path = Path(db_path)
+        self.record_format = record_format
+        self._local = threading.local()
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        with self._connection() as conn:
+            conn.executescript(self.SCHEMA)
+
+    def _connection(self) -> sqlite3.Connection:
+        """One connection per thread (Streamlit serves sessions from a thread pool)"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(str(self.db_path), timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get_profile(self, user_id: str) -> Optional[Dict]:
+        row = self._connection().execute(
+            "SELECT data FROM profiles WHERE user_id = ?", (user_id,)
+        ).fetchone()
+        return decode_record('profile', row[0]) if row else None
+
+    def save_profile(self, profile_data: Dict):
+        with self._connection() as conn:
+            self._write_save_profile(conn, profile_data)
+
+    def append_log(self, log_data: Dict):
+        with self._connection() as conn:
+            self._write_append_log(conn, log_data)
+
+    def get_user_logs(self, user_id: str) -> List[Dict]:
+        rows = self._connection().execute(
+            "SELECT data FROM workout_logs WHERE user_id = ? ORDER BY date", (user_id,)
+        ).fetchall()
+        return [decode_record('log', row[0]) for row in rows]
+
+    def iter_user_ids(self) -> Iterator[str]:
+        for row in self._connection().execute("SELECT user_id FROM profiles ORDER BY user_id").fetchall():
+            yield row[0]
+
+    def iter_logs(self) -> Iterator[Dict]:
+        """Streams rows from a dedicated read connection"""
+        conn = sqlite3.connect(str(self.db_path), timeout=30)
+        try:
+            for row in conn.execute("SELECT data FROM workout_logs"):
+                yield decode_record('log', row[0])
+        finally:
+            conn.close()
+
+    def iter_user_stats(self) -> Iterator[Dict]:
+        """Streams rows from a dedicated read connection"""
+        conn = sqlite3.connect(str(self.db_path), timeout=30)
+        try:
+            for row in conn.execute("SELECT data FROM user_stats"):
+                yield decode_record('stats', row[0])
+        finally:
+            conn.close()
+
+    def import_logs(self, chunks: Iterable[List[Dict]]) -> int:
+        """One transaction per chunk with the (user_id, date) index dropped, rebuilt once at the end.
+
+        Date-range queries from other sessions fall back to scans while the
+        import runs.
+        """
+        conn = self._connection()
+        with conn:
+            conn.execute("DROP INDEX IF EXISTS idx_workout_logs_user_date")
+
+        total = 0
+        users = set()
+        try:
+            for chunk in chunks:
+                with conn:
+                    conn.executemany(
+                        "INSERT OR REPLACE INTO workout_logs (log_id, user_id, date, data) VALUES (?, ?, ?, ?)",
+                        [(log['log_id'], log['user_id'], log['date'], encode_record('log', log, self.record_format))
+                         for log in chunk]
+                    )
+                users.update(log['user_id'] for log in chunk)
+                total += len(chunk)
+        finally:
+            conn.executescript(self.SCHEMA)  # recreates the dropped index
+            with conn:
+                for user_id in users:
+                    self._bump_version(conn, 'logs', user_id)
+        return total
+
+    def query_logs(self, user_id: str, start: Optional[str] = None, end: Optional[str] = None,
+                   limit: Optional[int] = None, cursor: Optional[str] = None) -> Tuple[List[Dict], Optional[str]]:
+        """Served from the (user_id, date) index; fetches one extra row to detect a next page"""
+        sql = "SELECT data FROM workout_logs WHERE user_id = ?"
+        params = [user_id]
+        if start is not None:
+            sql += " AND date >= ?"
+            params.append(start)
+        if end is not None:
+            sql += " AND date < ?"
+            params.append(end)
+        if cursor:
+            sql += " AND (date, log_id) < (?, ?)"
+            params.extend(decode_log_cursor(cursor))
+        sql += " ORDER BY date DESC, log_id DESC"
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit + 1)
+
+        logs = [decode_record('log', row[0]) for row in self._connection().execute(sql, params)]
+        if limit is not None and len(logs) > limit:
+            logs = logs[:limit]
+            return logs, encode_log_cursor(logs[-1])
+        return logs, None
+
+    def get_user_stats(self, user_id: str) -> Optional[Dict]:
+        row = self._connection().execute(
+            "SELECT data FROM user_stats WHERE user_id = ?", (user_id,)
+        ).fetchone()
+        return decode_record('stats', row[0]) if row else None
+
+    def save_user_stats(self, user_id: str, stats_data: Dict):
+        with self._connection() as conn:
+            self._write_save_user_stats(conn, user_id, stats_data)
+
+    def get_unlocked(self, user_id: str) -> Dict[str, str]:
+        rows = self._connection().execute(
+            "SELECT achievement_id, unlocked_date FROM unlocked_achievements WHERE user_id = ?", (user_id,)
+        ).fetchall()
+        return {ach_id: unlocked_date for ach_id, unlocked_date in rows}
+
+    def save_unlocked(self, user_id: str, unlocked: Dict[str, str]):
+        with self._connection() as conn:
+            self._write_save_unlocked(conn, user_id, unlocked)
+
+    def get_intensities(self, user_id: str) -> List[Dict]:
+        rows = self._connection().execute(
+            "SELECT data FROM workout_intensity WHERE user_id = ? ORDER BY id", (user_id,)
+        ).fetchall()
+        return [decode_record('intensity', row[0]) for row in rows]
+
+    def append_intensity(self, user_id: str, intensity_data: Dict, max_entries: Optional[int] = None):
+        with self._connection() as conn:
+            self._write_append_intensity(conn, user_id, intensity_data, max_entries)
+
+    def update_intensities(self, user_id: str, records: List[Dict]):
+        with self._connection() as conn:
+            self._write_update_intensities(conn, user_id, records)
+
+    def append_event(self, user_id: str, event: Dict) -> Dict:
+        with self._connection() as conn:
+            return self._write_append_event(conn, user_id, event)
+
+    def get_events(self, user_id: str, after_seq: int = 0) -> List[Dict]:
+        rows = self._connection().execute(
+            "SELECT data FROM gamification_events WHERE user_id = ? AND seq > ? ORDER BY seq", (user_id, after_seq)
+        ).fetchall()
+        return [decode_record('event', row[0]) for row in rows]
+
+    def get_user_document(self, name: str, user_id: str) -> Optional[Dict]:
+        row = self._connection().execute(
+            "SELECT data FROM user_documents WHERE name = ? AND user_id = ?", (name, user_id)
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def save_user_document(self, name: str, user_id: str, data: Dict):
+        with self._connection() as conn:
+            self._write_save_user_document(conn, name, user_id, data)
+
+    def query_intensities(self, user_id: str, start: Optional[str] = None, end: Optional[str] = None) -> List[Dict]:
+        sql = "SELECT data FROM workout_intensity WHERE user_id = ?"
+        params = [user_id]
+        if start is not None:
+            sql += " AND date >= ?"
+            params.append(start)
+        if end is not None:
+            sql += " AND date < ?"
+            params.append(end)
+        rows = self._connection().execute(sql + " ORDER BY id", params).fetchall()
+        return [decode_record('intensity', row[0]) for row in rows]
+
+    def prune_before(self, kind: str, cutoff: str, user_ids: Iterable[str]):
+        table = 'workout_logs' if kind == 'logs' else 'workout_intensity'
+        with self._connection() as conn:
+            for user_id in user_ids:
+                conn.execute(f"DELETE FROM {table} WHERE user_id = ? AND date < ?", (user_id, cutoff))
+                self._bump_version(conn, kind, user_id)
+
+    atomic_batches = True
+    EVENT_SEQ_ATTEMPTS = 5
+
+    def apply_batch(self, operations: List[Tuple[str, tuple]]):
+        """Apply every operation inside a single transaction (one WAL commit)"""
+        with self._connection() as conn:
+            for name, args in operations:
+                getattr(self, f"_write_{name}")(conn, *args)
+
+    def version(self, kind: str, user_id: str):
+        row = self._connection().execute(
+            "SELECT version FROM versions WHERE kind = ? AND user_id = ?", (kind, user_id)
+        ).fetchone()
+        return row[0] if row else 0
+
+    @staticmethod
+    def _bump_version(conn: sqlite3.Connection, kind: str, user_id: str):
+        conn.execute(
+            """INSERT INTO versions (kind, user_id, version) VALUES (?, ?, 1)
+               ON CONFLICT (kind, user_id) DO UPDATE SET version = version + 1""",
+            (kind, user_id)
+        )
+
+    def _write_save_profile(self, conn: sqlite3.Connection, profile_data: Dict):
+        conn.execute(
+            "INSERT OR REPLACE INTO profiles (user_id, data) VALUES (?, ?)",
+            (profile_data['user_id'], encode_record('profile', profile_data, self.record_format))
+        )
+        self._bump_version(conn, 'profile', profile_data['user_id'])
+
+    def _write_append_log(self, conn: sqlite3.Connection, log_data: Dict):
+        conn.execute(
+            "INSERT OR REPLACE INTO workout_logs (log_id, user_id, date, data) VALUES (?, ?, ?, ?)",
+            (log_data['log_id'], log_data['user_id'], log_data['date'],
+             encode_record('log', log_data, self.record_format))
+        )
+        self._bump_version(conn, 'logs', log_data['user_id'])
+
+    def _write_save_user_stats(self, conn: sqlite3.Connection, user_id: str, stats_data: Dict):
+        conn.execute(
+            "INSERT OR REPLACE INTO user_stats (user_id, data) VALUES (?, ?)",
+            (user_id, encode_record('stats', stats_data, self.record_format))
+        )
+        self._bump_version(conn, 'stats', user_id)
+
+    def _write_save_unlocked(self, conn: sqlite3.Connection, user_id: str, unlocked: Dict[str, str]):
+        self._bump_version(conn, 'unlocked', user_id)
+        conn.execute("DELETE FROM unlocked_achievements WHERE user_id = ?", (user_id,))
+        conn.executemany(
+            "INSERT INTO unlocked_achievements (user_id, achievement_id, unlocked_date) VALUES (?, ?, ?)",
+            [(user_id, ach_id, unlocked_date) for ach_id, unlocked_date in unlocked.items()]
+        )
+
+    def _write_append_event(self, conn: sqlite3.Connection, user_id: str, event: Dict) -> Dict:
+        for _ in range(self.EVENT_SEQ_ATTEMPTS):
+            last_seq = conn.execute(
+                "SELECT COALESCE(MAX(seq), 0) FROM gamification_events WHERE user_id = ?", (user_id,)
+            ).fetchone()[0]
+            event, = sequence_events([event], last_seq)
+            try:
+                conn.execute(
+                    "INSERT INTO gamification_events (user_id, seq, data) VALUES (?, ?, ?)",
+                    (user_id, event['seq'], encode_record('event', event, self.record_format))
+                )
+                self._bump_version(conn, 'events', user_id)
+                return event
+            except sqlite3.IntegrityError:
+                continue  # another connection took that seq between the read and the insert
+        raise sqlite3.IntegrityError(f"Could not assign an event seq for {user_id}")
+
+    def _write_save_user_document(self, conn: sqlite3.Connection, name: str, user_id: str, data: Dict):
+        conn.execute(
+            "INSERT OR REPLACE INTO user_documents (name, user_id, data) VALUES (?, ?, ?)",
+            (name, user_id, json.dumps(data))
+        )
+        self._bump_version(conn, f'doc:{name}', user_id)
+
+    def _write_append_intensity(self, conn: sqlite3.Connection, user_id: str, intensity_data: Dict,
+                                max_entries: Optional[int] = None):
+        self._bump_version(conn, 'intensity', user_id)
+        conn.execute(
+            "INSERT INTO workout_intensity (user_id, date, data) VALUES (?, ?, ?)",
+            (user_id, intensity_data['date'], encode_record('intensity', intensity_data, self.record_format))
+        )
+        if max_entries:
+            conn.execute(
+                """DELETE FROM workout_intensity WHERE user_id = ? AND id NOT IN (
+                       SELECT id FROM workout_intensity WHERE user_id = ? ORDER BY id DESC LIMIT ?
+                   )""",
+                (user_id, user_id, max_entries)
+            )
+
+    def _write_update_intensities(self, conn: sqlite3.Connection, user_id: str, records: List[Dict]):
+        self._bump_version(conn, 'intensity', user_id)
+        conn.executemany(
+            "UPDATE workout_intensity SET data = ? WHERE user_id = ? AND date = ?",
+            [(encode_record('intensity', record, self.record_format), user_id, record['date']) for record in records]
+        )
+
+    def close(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+
+def create_storage(storage_dir: Path, backend: str = None, cache_size: int = None,
+                   archive: bool = True) -> StorageBackend:
+    """Create the storage backend selected in config.STORAGE_BACKEND, with reads
+    falling back to the cold archive (unless archive=False) and wrapped in a
+    read-through cache of config.STORAGE_CACHE_SIZE entries"""
+    backend = backend or STORAGE_BACKEND
+    cache_size = STORAGE_CACHE_SIZE if cache_size is None else cache_size
+
+    if backend == "json":
+        storage = JSONStorage(storage_dir)
+    elif backend == "sharded":
+        from src.sharding import ShardedJSONStorage
+        storage = ShardedJSONStorage(storage_dir)
+    elif backend == "sqlite":
+        storage = SQLiteStorage(Path(storage_dir) / SQLITE_DB_FILE.name)
+    else:
+        raise ValueError(f"Unknown storage backend: {backend}")
+
+    if archive:
+        from src.retention import ArchivedStorage, ColdArchive
+        storage = ArchivedStorage(storage, ColdArchive(Path(storage_dir) / "archive"))
+
+    if cache_size > 0:
+        from src.storage_cache import CachedStorage
+        storage = CachedStorage(storage, cache_size)
+    return storage
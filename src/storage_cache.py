@@ -0,0 +1,201 @@
+"""
+Read-Through Storage Cache for FitFlow AI
+Process-wide LRU cache in front of any storage backend, keyed by user_id
+"""
+
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+from collections import OrderedDict
+import threading
+
+from src.storage import StorageBackend
+
+
+class CachedStorage(StorageBackend):
+    """Read-through LRU cache around a storage backend.
+
+    Writes made through this object invalidate the affected entries
+    immediately. Writes made by other processes are caught by comparing the
+    backend's version(kind, user_id) token (file mtime/size/inode for the
+    JSON backends, the versions table for SQLite) before serving a cached
+    value.
+
+    Cached values are shared: callers must treat them as read-only.
+    """
+
+    def __init__(self, backend: StorageBackend, max_entries: int = 1024):
+        self.backend = backend
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple[str, str], Tuple[Any, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.stale = 0
+        self.evictions = 0
+
+    def _get(self, kind: str, user_id: str, loader):
+        key = (kind, user_id)
+        version = self.backend.version(kind, user_id)
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if version is not None and entry[0] == version:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return entry[1]
+                self.stale += 1
+            self.misses += 1
+
+        value = loader(user_id)
+
+        with self._lock:
+            self._entries[key] = (version, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        return value
+
+    def invalidate(self, kind: str, user_id: str):
+        with self._lock:
+            self._entries.pop((kind, user_id), None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def metrics(self) -> Dict:
+        """Hit-rate metrics since startup"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "stale": self.stale,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0
+            }
+
+    # Reads
+    def get_profile(self, user_id: str) -> Optional[Dict]:
+        return self._get('profile', user_id, self.backend.get_profile)
+
+    def get_user_logs(self, user_id: str) -> List[Dict]:
+        return self._get('logs', user_id, self.backend.get_user_logs)
+
+    def query_logs(self, user_id: str, start: Optional[str] = None, end: Optional[str] = None,
+                   limit: Optional[int] = None, cursor: Optional[str] = None) -> Tuple[List[Dict], Optional[str]]:
+        return self.backend.query_logs(user_id, start, end, limit, cursor)
+
+    def get_user_stats(self, user_id: str) -> Optional[Dict]:
+        return self._get('stats', user_id, self.backend.get_user_stats)
+
+    def get_unlocked(self, user_id: str) -> Dict[str, str]:
+        return self._get('unlocked', user_id, self.backend.get_unlocked)
+
+    def get_intensities(self, user_id: str) -> List[Dict]:
+        return self._get('intensity', user_id, self.backend.get_intensities)
+
+    def get_user_document(self, name: str, user_id: str) -> Optional[Dict]:
+        return self._get(f'doc:{name}', user_id, lambda uid: self.backend.get_user_document(name, uid))
+
+    def query_intensities(self, user_id: str, start: Optional[str] = None, end: Optional[str] = None) -> List[Dict]:
+        return self.backend.query_intensities(user_id, start, end)
+
+    # Writes (write-through, then invalidate)
+    def save_profile(self, profile_data: Dict):
+        self.backend.save_profile(profile_data)
+        self.invalidate('profile', profile_data['user_id'])
+
+    def append_log(self, log_data: Dict):
+        self.backend.append_log(log_data)
+        self.invalidate('logs', log_data['user_id'])
+
+    def save_user_stats(self, user_id: str, stats_data: Dict):
+        self.backend.save_user_stats(user_id, stats_data)
+        self.invalidate('stats', user_id)
+
+    def save_unlocked(self, user_id: str, unlocked: Dict[str, str]):
+        self.backend.save_unlocked(user_id, unlocked)
+        self.invalidate('unlocked', user_id)
+
+    def append_intensity(self, user_id: str, intensity_data: Dict, max_entries: Optional[int] = None):
+        self.backend.append_intensity(user_id, intensity_data, max_entries)
+        self.invalidate('intensity', user_id)
+
+    def update_intensities(self, user_id: str, records: List[Dict]):
+        self.backend.update_intensities(user_id, records)
+        self.invalidate('intensity', user_id)
+
+    def append_event(self, user_id: str, event: Dict) -> Dict:
+        return self.backend.append_event(user_id, event)
+
+    def get_events(self, user_id: str, after_seq: int = 0) -> List[Dict]:
+        return self.backend.get_events(user_id, after_seq)  # only read by replays, never cached
+
+    def save_user_document(self, name: str, user_id: str, data: Dict):
+        self.backend.save_user_document(name, user_id, data)
+        self.invalidate(f'doc:{name}', user_id)
+
+    def prune_before(self, kind: str, cutoff: str, user_ids: Iterable[str]):
+        user_ids = list(user_ids)
+        self.backend.prune_before(kind, cutoff, user_ids)
+        for user_id in user_ids:
+            self.invalidate(kind, user_id)
+
+    @property
+    def atomic_batches(self) -> bool:
+        return self.backend.atomic_batches
+
+    def apply_batch(self, operations: List[Tuple[str, tuple]]):
+        self.backend.apply_batch(operations)
+        for kind, user_id in _touched_keys(operations):
+            self.invalidate(kind, user_id)
+
+    def iter_user_ids(self) -> Iterator[str]:
+        return self.backend.iter_user_ids()
+
+    def iter_logs(self) -> Iterator[Dict]:
+        return self.backend.iter_logs()
+
+    def iter_user_stats(self) -> Iterator[Dict]:
+        return self.backend.iter_user_stats()
+
+    def import_logs(self, chunks: Iterable[List[Dict]]) -> int:
+        users = set()
+
+        def tracked():
+            for chunk in chunks:
+                users.update(log['user_id'] for log in chunk)
+                yield chunk
+
+        try:
+            return self.backend.import_logs(tracked())
+        finally:
+            for user_id in users:
+                self.invalidate('logs', user_id)
+
+    def version(self, kind: str, user_id: str):
+        return self.backend.version(kind, user_id)
+
+    def close(self):
+        self.clear()
+        self.backend.close()
+
+
+def _touched_keys(operations: List[Tuple[str, tuple]]) -> Iterator[Tuple[str, str]]:
+    for name, args in operations:
+        if name == 'save_profile':
+            yield 'profile', args[0]['user_id']
+        elif name == 'append_log':
+            yield 'logs', args[0]['user_id']
+        elif name == 'save_user_stats':
+            yield 'stats', args[0]
+        elif name == 'save_unlocked':
+            yield 'unlocked', args[0]
+        elif name in ('append_intensity', 'update_intensities'):
+            yield 'intensity', args[0]
+        elif name == 'save_user_document':
+            yield f'doc:{args[0]}', args[1]
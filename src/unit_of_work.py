@@ -0,0 +1,171 @@
+"""
+Unit of Work for FitFlow AI
+Collects every storage mutation of one event (e.g. "Mark Day Complete")
+and commits them in a single batched step, optionally through a
+write-behind queue
+"""
+
+from typing import Callable, List, Dict, Optional, Tuple
+import atexit
+import logging
+import queue
+import threading
+
+from src.storage import StorageBackend
+
+
+logger = logging.getLogger(__name__)
+
+
+class UnitOfWork:
+    """Staging area with the same write methods as a StorageBackend.
+
+    Pass it anywhere a backend is expected for writes (``profile.save(uow)``,
+    ``log.save(uow)``, ``uow=`` on the engines), then call ``commit()``.
+    In-memory state derived from the writes (e.g. leaderboards) is updated
+    from ``after_commit`` callbacks, which run once the writes are stored.
+    """
+
+    def __init__(self, storage: StorageBackend, write_queue: Optional['WriteBehindQueue'] = None):
+        self.storage = storage
+        self.write_queue = write_queue
+        self.operations: List[Tuple[str, tuple]] = []
+        self.callbacks: List[Callable[[], None]] = []
+
+    def save_profile(self, profile_data: Dict):
+        self.operations.append(('save_profile', (profile_data,)))
+
+    def append_log(self, log_data: Dict):
+        self.operations.append(('append_log', (log_data,)))
+
+    def save_user_stats(self, user_id: str, stats_data: Dict):
+        self.operations.append(('save_user_stats', (user_id, stats_data)))
+
+    def save_unlocked(self, user_id: str, unlocked: Dict[str, str]):
+        self.operations.append(('save_unlocked', (user_id, unlocked)))
+
+    def append_intensity(self, user_id: str, intensity_data: Dict, max_entries: Optional[int] = None):
+        self.operations.append(('append_intensity', (user_id, intensity_data, max_entries)))
+
+    def update_intensities(self, user_id: str, records: List[Dict]):
+        self.operations.append(('update_intensities', (user_id, records)))
+
+    def append_event(self, user_id: str, event: Dict):
+        self.operations.append(('append_event', (user_id, event)))
+
+    def save_user_document(self, name: str, user_id: str, data: Dict):
+        self.operations.append(('save_user_document', (name, user_id, data)))
+
+    def after_commit(self, callback: Callable[[], None]):
+        """Run callback once the staged operations are written (never if they fail or are rolled back)"""
+        self.callbacks.append(callback)
+
+    def commit(self):
+        """Write all staged operations in one batch (or hand them to the write-behind queue)"""
+        operations, self.operations = self.operations, []
+        callbacks, self.callbacks = self.callbacks, []
+        if not operations:
+            run_callbacks(callbacks)
+            return
+
+        if self.write_queue is not None:
+            self.write_queue.submit(operations, callbacks)
+        else:
+            self.storage.apply_batch(operations)
+            run_callbacks(callbacks)
+
+    def rollback(self):
+        """Discard staged operations"""
+        self.operations = []
+        self.callbacks = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.commit()
+        else:
+            self.rollback()
+
+
+def run_callbacks(callbacks: List[Callable[[], None]]):
+    """Run after-commit callbacks; the writes are already stored, so a failing one is only logged"""
+    for callback in callbacks:
+        try:
+            callback()
+        except Exception:
+            logger.exception("After-commit callback failed")
+
+
+class WriteBehindQueue:
+    """Background writer that group-commits queued units of work.
+
+    On backends whose apply_batch is one transaction (``atomic_batches``),
+    whatever has accumulated while the previous batch was being written is
+    merged into the next ``apply_batch`` call, so N concurrent completions
+    cost one commit instead of N. If a merged batch fails, nothing of it was
+    written, and each unit of work is retried on its own, so one bad record
+    only fails its own unit. Other backends apply each unit separately, since
+    a failed batch there may be partly written.
+
+    Units that still fail are logged and kept in ``failures`` (as
+    (operations, exception)) until ``flush()`` hands them back; their
+    after-commit callbacks never run. Pending work is flushed at exit.
+    """
+
+    def __init__(self, storage: StorageBackend, max_batch: int = 500):
+        self.storage = storage
+        self.max_batch = max_batch
+        self.failures: List[Tuple[List[Tuple[str, tuple]], Exception]] = []
+        self._failures_lock = threading.Lock()
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="fitflow-write-behind", daemon=True)
+        self._thread.start()
+        atexit.register(self.flush)
+
+    def submit(self, operations: List[Tuple[str, tuple]], callbacks: List[Callable[[], None]] = ()):
+        self._queue.put((operations, list(callbacks)))
+
+    def flush(self) -> List[Tuple[List[Tuple[str, tuple]], Exception]]:
+        """Block until everything submitted so far is written; returns (and clears) the units that failed"""
+        self._queue.join()
+        with self._failures_lock:
+            failures, self.failures = self.failures, []
+        return failures
+
+    def _run(self):
+        while True:
+            batches = [self._queue.get()]
+            while len(batches) < self.max_batch:
+                try:
+                    batches.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            try:
+                self._write(batches)
+            finally:
+                for _ in batches:
+                    self._queue.task_done()
+
+    def _write(self, batches: List[Tuple[List[Tuple[str, tuple]], List[Callable[[], None]]]]):
+        if len(batches) > 1 and self.storage.atomic_batches:
+            try:
+                self.storage.apply_batch([op for operations, _ in batches for op in operations])
+            except Exception:
+                logger.warning("Write-behind group commit of %d units failed; retrying each unit", len(batches),
+                               exc_info=True)
+            else:
+                for _, callbacks in batches:
+                    run_callbacks(callbacks)
+                return
+        for operations, callbacks in batches:
+            try:
+                self.storage.apply_batch(operations)
+            except Exception as e:
+                logger.exception("Write-behind commit failed (%d operations)", len(operations))
+                with self._failures_lock:
+                    self.failures.append((operations, e))
+            else:
+                run_callbacks(callbacks)
@@ -1,10 +1,11 @@
 from dataclasses import dataclass, field, asdict
-from typing import List, Optional, Dict
+from typing import List, Optional, Dict, Tuple
 from datetime import datetime
-import json
 from pathlib import Path
+from src.storage import StorageBackend, JSONStorage
+from src.serialization import pack, unpack
 
-@dataclass
+@dataclass(slots=True)
 class UserProfile:
     """User profile with fitness goals and preferences"""
     user_id: str = ""
@@ -28,10 +29,20 @@ class UserProfile:
     
     @classmethod
     def from_dict(cls, data: Dict):
+        data = dict(data)
         if 'created_at' in data and isinstance(data['created_at'], str):
             data['created_at'] = datetime.fromisoformat(data['created_at'])
         return cls(**data)
     
+    def to_packed(self) -> bytes:
+        """Compact msgpack encoding (see src.serialization)"""
+        return pack('profile', self.to_dict())
+    
+    @classmethod
+    def from_packed(cls, data: bytes):
+        """Decode straight from msgpack; created_at arrives as a datetime, no ISO parsing"""
+        return cls(**unpack('profile', data, typed=True))
+    
     def get_profile_summary(self) -> str:
         """Generate text summary of user profile"""
         return f"""
@@ -46,41 +57,29 @@ class UserProfile:
             - Current Streak: {self.current_streak} days
         """
     
+    def save(self, storage: StorageBackend):
+        """Save profile to the storage backend"""
+        storage.save_profile(self.to_dict())
+    
+    @classmethod
+    def load(cls, storage: StorageBackend, user_id: str):
+        """Load profile from the storage backend"""
+        profile_data = storage.get_profile(user_id)
+        if profile_data:
+            return cls.from_dict(profile_data)
+        return None
+    
     def save_to_file(self, filepath: Path):
         """Save profile to JSON file"""
-        profiles = []
-        if filepath.exists():
-            with open(filepath, 'r') as f:
-                profiles = json.load(f)
-        
-        # Update or add profile
-        profile_data = self.to_dict()
-        existing_idx = next((i for i, p in enumerate(profiles) if p['user_id'] == self.user_id), None)
-        
-        if existing_idx is not None:
-            profiles[existing_idx] = profile_data
-        else:
-            profiles.append(profile_data)
-        
-        with open(filepath, 'w') as f:
-            json.dump(profiles, f, indent=2)
+        self.save(JSONStorage(filepath.parent, profiles_file=filepath))
     
     @classmethod
     def load_from_file(cls, filepath: Path, user_id: str):
         """Load profile from JSON file"""
-        if not filepath.exists():
-            return None
-        
-        with open(filepath, 'r') as f:
-            profiles = json.load(f)
-        
-        profile_data = next((p for p in profiles if p['user_id'] == user_id), None)
-        if profile_data:
-            return cls.from_dict(profile_data)
-        return None
+        return cls.load(JSONStorage(filepath.parent, profiles_file=filepath), user_id)
 
 
-@dataclass
+@dataclass(slots=True)
 class WorkoutLog:
     """Individual workout log entry"""
     log_id: str = ""
@@ -100,30 +99,61 @@ class WorkoutLog:
     
     @classmethod
     def from_dict(cls, data: Dict):
+        data = dict(data)
         if 'date' in data and isinstance(data['date'], str):
             data['date'] = datetime.fromisoformat(data['date'])
         return cls(**data)
     
+    def to_packed(self) -> bytes:
+        """Compact msgpack encoding (see src.serialization)"""
+        return pack('log', self.to_dict())
+    
+    @classmethod
+    def from_packed(cls, data: bytes):
+        """Decode straight from msgpack; date arrives as a datetime, no ISO parsing"""
+        return cls(**unpack('log', data, typed=True))
+    
+    def save(self, storage: StorageBackend):
+        """Append log to the storage backend"""
+        storage.append_log(self.to_dict())
+    
+    @classmethod
+    def load_for_user(cls, storage: StorageBackend, user_id: str) -> List['WorkoutLog']:
+        """Load all logs for a user from the storage backend"""
+        user_logs = [cls.from_dict(log) for log in storage.get_user_logs(user_id)]
+        return sorted(user_logs, key=lambda x: x.date, reverse=True)
+    
+    @classmethod
+    def query(cls, storage: StorageBackend, user_id: str, start: Optional[datetime] = None,
+              end: Optional[datetime] = None, limit: Optional[int] = None,
+              cursor: Optional[str] = None) -> Tuple[List['WorkoutLog'], Optional[str]]:
+        """Logs for a user newest first within [start, end), one page at a time"""
+        logs, next_cursor = storage.query_logs(
+            user_id,
+            start=start.isoformat() if start else None,
+            end=end.isoformat() if end else None,
+            limit=limit,
+            cursor=cursor
+        )
+        return [cls.from_dict(log) for log in logs], next_cursor
+    
+    @classmethod
+    def totals(cls, storage: StorageBackend, user_id: str, page_size: int = 500) -> Tuple[int, int]:
+        """(number of logs, calories burned) over a user's whole history, one page in memory at a time"""
+        count = calories = 0
+        cursor = None
+        while True:
+            logs, cursor = storage.query_logs(user_id, limit=page_size, cursor=cursor)
+            count += len(logs)
+            calories += sum(log.get('calories_burned', 0) for log in logs)
+            if cursor is None:
+                return count, calories
+    
     def save_to_file(self, filepath: Path):
         """Save log to JSON file"""
-        logs = []
-        if filepath.exists():
-            with open(filepath, 'r') as f:
-                logs = json.load(f)
-        
-        logs.append(self.to_dict())
-        
-        with open(filepath, 'w') as f:
-            json.dump(logs, f, indent=2)
+        self.save(JSONStorage(filepath.parent, logs_file=filepath))
     
     @classmethod
     def load_user_logs(cls, filepath: Path, user_id: str) -> List['WorkoutLog']:
         """Load all logs for a user"""
-        if not filepath.exists():
-            return []
-        
-        with open(filepath, 'r') as f:
-            all_logs = json.load(f)
-        
-        user_logs = [cls.from_dict(log) for log in all_logs if log['user_id'] == user_id]
-        return sorted(user_logs, key=lambda x: x.date, reverse=True)
\ No newline at end of file
+        return cls.load_for_user(JSONStorage(filepath.parent, logs_file=filepath), user_id)
@@ -1,82 +1,156 @@
-from typing import List, Dict
+from typing import List, Dict, Optional
+from dataclasses import dataclass, asdict, fields
+from collections import OrderedDict
 from src.user_profile import UserProfile
 from src.rag_engine import RAGEngine
 from src.llm_handler import LLMHandler
+from src.candidate_pool import CandidatePool
+import hashlib
+import json
 import random
+import secrets
+import threading
 from datetime import datetime
 
+
+@dataclass(slots=True, frozen=True)
+class WorkoutPlan:
+    """A weekly plan as a seed plus the profile it was made for.
+    
+    Days are generated from the seed on first access (WorkoutGenerator.get_plan_day),
+    so the same seed, profile and exercise catalog always give the same plan.
+    """
+    seed: int
+    signature: str  # plan_signature() of the profile
+    total_days: int
+    generated_at: str
+    
+    def to_dict(self) -> Dict:
+        return asdict(self)
+    
+    @classmethod
+    def from_dict(cls, data: Dict) -> Optional['WorkoutPlan']:
+        """The stored plan, or None for one saved before plans were seeds (all days under 'weekly_plan')"""
+        if 'seed' not in data or 'signature' not in data:
+            return None
+        return cls(**{field.name: data[field.name] for field in fields(cls)})
+
+
+def plan_signature(user_profile: UserProfile) -> str:
+    """Hash of the profile fields a generated plan depends on"""
+    fields = [user_profile.fitness_goal, user_profile.experience_level, user_profile.days_per_week, user_profile.gym_id]
+    return hashlib.sha1(json.dumps(fields).encode()).hexdigest()[:16]
+
+
 class WorkoutGenerator:
     
+    # Muscle groups per day for each days_per_week (anything else gets the 3-day split)
+    MUSCLE_SPLITS = {
+        3: [
+            ["chest", "arms"],
+            ["back", "shoulders"],
+            ["legs", "core"]
+        ],
+        4: [
+            ["chest", "arms"],
+            ["back"],
+            ["legs", "core"],
+            ["shoulders", "cardio"]
+        ],
+        5: [
+            ["chest"],
+            ["back"],
+            ["legs"],
+            ["shoulders", "arms"],
+            ["core", "cardio"]
+        ],
+    }
+    LEVELS = ["beginner", "intermediate", "advanced"]
+    PLAN_CACHE_DAYS = 4096  # generated plan days kept in memory
+    
     def __init__(self, rag_engine: RAGEngine, llm_handler: LLMHandler):
         self.rag = rag_engine
         self.llm = llm_handler
+        self.candidates = CandidatePool(rag_engine, n_results=20)
+        self._plan_days: "OrderedDict[tuple, Dict]" = OrderedDict()
+        self._plan_lock = threading.Lock()
+    
+    def warm_cache(self) -> int:
+        """Retrieve candidates for every split day and level at every gym; returns pools built"""
+        splits = [(groups, level) for split in self.MUSCLE_SPLITS.values() for groups in split for level in self.LEVELS]
+        return self.candidates.warm(splits)
         
-    def generate_workout_plan(self, user_profile: UserProfile) -> Dict:
-        
-        muscle_split = self._get_muscle_split(user_profile)
+    def new_plan(self, user_profile: UserProfile, seed: Optional[int] = None) -> WorkoutPlan:
+        """A plan for the profile; no day is generated until it is asked for"""
+        return WorkoutPlan(
+            seed=secrets.randbits(32) if seed is None else seed,
+            signature=plan_signature(user_profile),
+            total_days=len(self._get_muscle_split(user_profile)),
+            generated_at=datetime.now().isoformat()
+        )
+    
+    def plan_muscle_groups(self, user_profile: UserProfile) -> List[List[str]]:
+        """Muscle groups of each plan day, without generating the days"""
+        return self._get_muscle_split(user_profile)
+    
+    def get_plan_day(self, plan: WorkoutPlan, user_profile: UserProfile, day_number: int) -> Dict:
+        """One day of a plan, generated from its seed on first access and memoized.
         
-        weekly_plan = []
-        for day_num, muscle_groups in enumerate(muscle_split, 1):
-            workout = self._generate_single_workout(
-                day_number=day_num,
-                muscle_groups=muscle_groups,
-                user_profile=user_profile
-            )
-            weekly_plan.append(workout)
+        The returned dict is shared with later calls and must not be modified.
+        """
+        if plan.signature != plan_signature(user_profile):
+            raise ValueError("Plan was generated for a different profile; create a new plan")
+        if not 1 <= day_number <= plan.total_days:
+            raise ValueError(f"Day {day_number} is not in a {plan.total_days}-day plan")
+        # Catalog and equipment versions are part of the key, since they change the candidates
+        key = (plan.seed, plan.signature, day_number,
+               self.rag.catalog_version, self.rag.gym_version(user_profile.gym_id))
+        with self._plan_lock:
+            workout = self._plan_days.get(key)
+            if workout is not None:
+                self._plan_days.move_to_end(key)
+                return workout
+        rng = random.Random(f"{plan.seed}:{plan.signature}:{day_number}")
+        workout = self._generate_single_workout(
+            day_number=day_number,
+            muscle_groups=self._get_muscle_split(user_profile)[day_number - 1],
+            user_profile=user_profile,
+            rng=rng
+        )
+        with self._plan_lock:
+            self._plan_days[key] = workout
+            while len(self._plan_days) > self.PLAN_CACHE_DAYS:
+                self._plan_days.popitem(last=False)
+        return workout
+    
+    def generate_workout_plan(self, user_profile: UserProfile, seed: Optional[int] = None) -> Dict:
+        """Every day of a new plan at once (see new_plan / get_plan_day for lazy plans)"""
+        plan = self.new_plan(user_profile, seed)
+        weekly_plan = [self.get_plan_day(plan, user_profile, day) for day in range(1, plan.total_days + 1)]
         
         return {
             "user_profile": user_profile.to_dict(),
             "weekly_plan": weekly_plan,
             "total_days": len(weekly_plan),
-            "generated_at": datetime.now().isoformat()
+            "generated_at": plan.generated_at,
+            "seed": plan.seed
         }
     
     def _get_muscle_split(self, user_profile: UserProfile) -> List[List[str]]:
         
-        if user_profile.days_per_week == 3:
-            return [
-                ["chest", "arms"],
-                ["back", "shoulders"],
-                ["legs", "core"]
-            ]
-        elif user_profile.days_per_week == 4:
-            return [
-                ["chest", "arms"],
-                ["back"],
-                ["legs", "core"],
-                ["shoulders", "cardio"]
-            ]
-        elif user_profile.days_per_week == 5:
-            return [
-                ["chest"],
-                ["back"],
-                ["legs"],
-                ["shoulders", "arms"],
-                ["core", "cardio"]
-            ]
-        else:
-            return [
-                ["chest", "arms"],
-                ["back", "shoulders"],
-                ["legs", "core"]
-            ]
+        split = self.MUSCLE_SPLITS.get(user_profile.days_per_week, self.MUSCLE_SPLITS[3])
+        return [list(muscle_groups) for muscle_groups in split]
     
     def _generate_single_workout(self, 
                                   day_number: int, 
                                   muscle_groups: List[str],
-                                  user_profile: UserProfile) -> Dict:
+                                  user_profile: UserProfile,
+                                  rng: random.Random) -> Dict:
         
-        query = f"{', '.join(muscle_groups)} exercises for {user_profile.experience_level} level"
-        
-        exercises = self.rag.search_exercises(
-            query=query,
-            gym_id=user_profile.gym_id,
-            muscle_groups=muscle_groups,
-            n_results=20
-        )
+        exercises = self.candidates.get(user_profile.gym_id, muscle_groups, user_profile.experience_level)
         
         num_exercises = self._get_num_exercises(user_profile.experience_level, muscle_groups)
-        selected_exercises = self._select_exercises(exercises, num_exercises, user_profile)
+        selected_exercises = self._select_exercises(exercises, num_exercises, user_profile, rng)
         
         workout = {
             "day": day_number,
@@ -90,7 +164,7 @@ class WorkoutGenerator:
         total_calories = 0
         
         for exercise in selected_exercises:
-            sets, reps = self._get_sets_reps(exercise, user_profile)
+            sets, reps = self._get_sets_reps(exercise, user_profile, rng)
             
             ex_duration = sets * 2
             ex_calories = exercise.get('calories_per_set', 10) * sets
@@ -132,7 +206,8 @@ class WorkoutGenerator:
         
         return base_count
     
-    def _select_exercises(self, exercises: List[Dict], num_needed: int, user_profile: UserProfile) -> List[Dict]:
+    def _select_exercises(self, exercises: List[Dict], num_needed: int, user_profile: UserProfile,
+                          rng: random.Random) -> List[Dict]:
         
         by_muscle = {}
         for ex in exercises:
@@ -150,12 +225,12 @@ class WorkoutGenerator:
             
             if suitable:
                 num_from_group = min(2, len(suitable))
-                selected.extend(random.sample(suitable, num_from_group))
+                selected.extend(rng.sample(suitable, num_from_group))
         
         while len(selected) < num_needed and len(exercises) > len(selected):
             remaining = [ex for ex in exercises if ex not in selected]
             if remaining:
-                selected.append(random.choice(remaining))
+                selected.append(rng.choice(remaining))
             else:
                 break
         
@@ -168,26 +243,26 @@ class WorkoutGenerator:
         
         return exercise_level_idx <= user_level_idx
     
-    def _get_sets_reps(self, exercise: Dict, user_profile: UserProfile) -> tuple:
+    def _get_sets_reps(self, exercise: Dict, user_profile: UserProfile, rng: random.Random) -> tuple:
         
         if user_profile.fitness_goal == "muscle_gain":
-            sets = random.randint(3, 4)
-            reps = random.randint(8, 12)
+            sets = rng.randint(3, 4)
+            reps = rng.randint(8, 12)
         elif user_profile.fitness_goal == "strength":
-            sets = random.randint(4, 5)
-            reps = random.randint(5, 8)
+            sets = rng.randint(4, 5)
+            reps = rng.randint(5, 8)
         elif user_profile.fitness_goal == "weight_loss":
-            sets = random.randint(3, 4)
-            reps = random.randint(12, 15)
+            sets = rng.randint(3, 4)
+            reps = rng.randint(12, 15)
         else:
-            sets = random.randint(3, 4)
-            reps = random.randint(10, 12)
+            sets = rng.randint(3, 4)
+            reps = rng.randint(10, 12)
         
         if exercise['muscle_group'] == "cardio":
-            return (1, random.randint(20, 30))
+            return (1, rng.randint(20, 30))
         
         if "Plank" in exercise['name'] or "plank" in exercise['name'].lower():
-            return (3, random.randint(30, 60))
+            return (3, rng.randint(30, 60))
         
         return (sets, reps)
     
@@ -0,0 +1,88 @@
+"""
+Tests for the incremental sync of the columnar analytics store (src/analytics.py)
+"""
+
+import json
+
+import pytest
+
+from src.analytics import ColumnarStore, to_epoch
+from src.storage import JSONStorage, SQLiteStorage
+
+
+BACKENDS = {
+    'json': JSONStorage,
+    'sqlite': lambda root: SQLiteStorage(root / "fitflow.db"),
+}
+
+
+@pytest.fixture(params=list(BACKENDS))
+def storage(request, tmp_path):
+    storage = BACKENDS[request.param](tmp_path)
+    for user_id in ('u1', 'u2'):
+        storage.save_profile({'user_id': user_id, 'gym_id': 'gym_a'})
+    yield storage
+    storage.close()
+
+
+def log(log_id: str, user_id: str, date: str):
+    return {'log_id': log_id, 'user_id': user_id, 'date': date, 'calories_burned': 100}
+
+
+def intensity(date: str):
+    return {'date': date, 'total_sets': 9, 'total_reps': 90, 'estimated_volume': 90.0,
+            'muscle_groups': ['chest'], 'intensity_score': 5.0}
+
+
+def synced_again(store, storage):
+    store.save()
+    reopened = ColumnarStore(store.root)
+    return reopened, reopened.sync(storage)
+
+
+def test_each_log_is_synced_once(storage, tmp_path):
+    store = ColumnarStore(tmp_path / "analytics")
+    storage.append_log(log('a', 'u1', '2026-01-01T10:00:00'))
+    storage.append_log(log('b', 'u2', '2026-01-05T10:00:00'))
+    assert store.sync(storage)['logs'] == 2
+
+    # Same timestamp as an already-synced log, and older than another user's newest log
+    storage.append_log(log('c', 'u1', '2026-01-01T10:00:00'))
+    storage.append_log(log('d', 'u1', '2026-01-03T10:00:00.250000'))
+    store, counts = synced_again(store, storage)
+    assert counts['logs'] == 2
+
+    _, counts = synced_again(store, storage)
+    assert counts['logs'] == 0
+    assert len(store.logs) == 4
+
+
+def test_intensities_are_synced_incrementally(storage, tmp_path):
+    store = ColumnarStore(tmp_path / "analytics")
+    storage.append_intensity('u2', intensity('2026-01-05T10:00:00'))
+    storage.append_intensity('u1', intensity('2026-01-01T10:00:00'))
+    assert store.sync(storage)['intensity'] == 2
+
+    storage.append_intensity('u1', intensity('2026-01-02T10:00:00.500000'))
+    store, counts = synced_again(store, storage)
+    assert counts['intensity'] == 1
+    assert sorted(store.intensity['date']) == [to_epoch(d) for d in
+                                               ('2026-01-01T10:00:00', '2026-01-02T10:00:00', '2026-01-05T10:00:00')]
+
+
+def test_global_watermark_of_an_older_store_still_applies(storage, tmp_path):
+    store = ColumnarStore(tmp_path / "analytics")
+    storage.append_log(log('a', 'u1', '2026-01-01T10:00:00'))
+    store.sync(storage)
+    store.save()
+
+    # meta.json as written before per-user watermarks
+    meta = json.loads((store.root / "meta.json").read_text())
+    meta['watermarks'] = {'logs': to_epoch('2026-01-01T10:00:00'), 'intensity': -1}
+    (store.root / "meta.json").write_text(json.dumps(meta))
+
+    storage.append_log(log('b', 'u1', '2026-01-02T10:00:00'))
+    store, counts = synced_again(ColumnarStore(store.root), storage)
+    assert counts['logs'] == 1
+    _, counts = synced_again(store, storage)
+    assert counts['logs'] == 0
@@ -0,0 +1,99 @@
+"""
+Tests for the shared candidate exercise pools (src/candidate_pool.py)
+"""
+
+import threading
+import time
+
+import pytest
+
+pytest.importorskip("chromadb")
+pytest.importorskip("sentence_transformers")
+
+from src.candidate_pool import CandidatePool  # noqa: E402
+
+
+class FakeRAG:
+    """The parts of RAGEngine CandidatePool uses, with a slow vector query"""
+
+    def __init__(self, delay: float = 0.2, fail_first: bool = False):
+        self.catalog_version = 0
+        self.gym_versions = {}
+        self.gyms_data = [{'gym_id': 'gym_a'}, {'gym_id': 'gym_b'}]
+        self.delay = delay
+        self.fail_first = fail_first
+        self.calls = 0
+
+    def gym_version(self, gym_id):
+        return self.gym_versions.get(gym_id, 0)
+
+    def rank_exercises(self, queries, n_results):
+        self.calls += 1
+        time.sleep(self.delay)
+        if self.fail_first and self.calls == 1:
+            raise RuntimeError("vector store unavailable")
+        return [[f"{query}-{i}" for i in range(3)] for query in queries]
+
+    def filter_exercises(self, ranked, gym_id, muscle_groups, n_results):
+        return [{'id': exercise_id, 'gym_id': gym_id} for exercise_id in ranked[:n_results]]
+
+
+def run_threads(targets):
+    threads = [threading.Thread(target=target) for target in targets]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+
+def test_concurrent_misses_share_one_build():
+    rag = FakeRAG()
+    pool = CandidatePool(rag)
+    results = []
+
+    run_threads([lambda: results.append(pool.get('gym_a', ['chest'], 'beginner'))] * 8)
+
+    assert rag.calls == 1
+    assert all(result is results[0] for result in results)
+
+
+def test_builds_of_different_pools_do_not_wait_for_each_other():
+    rag = FakeRAG(delay=0.3)
+    pool = CandidatePool(rag)
+
+    start = time.perf_counter()
+    run_threads([lambda m=m: pool.get('gym_a', [m], 'beginner') for m in ('back', 'legs', 'arms', 'core')])
+
+    assert time.perf_counter() - start < 4 * rag.delay
+    assert len(pool) == 4
+
+
+def test_failed_build_is_retried_by_a_waiting_caller():
+    rag = FakeRAG(fail_first=True)
+    pool = CandidatePool(rag)
+    results = []
+
+    def get():
+        try:
+            results.append(pool.get('gym_a', ['chest'], 'beginner'))
+        except RuntimeError as e:
+            results.append(e)
+
+    run_threads([get] * 3)
+
+    assert sum(isinstance(result, RuntimeError) for result in results) == 1
+    assert rag.calls == 2
+
+
+def test_version_bumps_rebuild_the_pool():
+    rag = FakeRAG(delay=0)
+    pool = CandidatePool(rag)
+    first = pool.get('gym_a', ['chest'], 'beginner')
+
+    rag.gym_versions['gym_a'] = 1
+    assert pool.get('gym_a', ['chest'], 'beginner') is not first
+    assert rag.calls == 1  # the ranked ids are still current
+
+    rag.catalog_version = 1
+    pool.get('gym_a', ['chest'], 'beginner')
+    assert rag.calls == 2
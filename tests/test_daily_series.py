@@ -0,0 +1,134 @@
+"""
+Tests for the per-day workload series (src/daily_series.py) and the
+RecoveryAnalyzer windows built on it
+"""
+
+import random
+from datetime import date, timedelta
+
+import pytest
+
+from src.daily_series import DailySeries
+from src.recovery_analyzer import RecoveryAnalyzer
+
+
+def day(offset: int, base: date = date(2024, 3, 1)) -> str:
+    return (base + timedelta(days=offset)).isoformat()
+
+
+def naive_window(sessions, field, first, last):
+    return sum(values.get(field, 0) for when, values in sessions if first <= when <= last)
+
+
+def test_same_day_sessions_share_one_bucket():
+    series = DailySeries()
+    series.add(day(0), sessions=1, volume=100)
+    series.add(day(0), sessions=1, volume=50)
+
+    assert len(series) == 1
+    assert series.sum('sessions', day(0), day(0)) == 2
+    assert series.sum('volume', day(0), day(0)) == 150
+
+
+def test_gaps_are_padded_with_empty_days():
+    series = DailySeries()
+    series.add(day(0), sessions=1, volume=10)
+    series.add(day(5), sessions=1, volume=20)
+
+    assert len(series) == 6
+    assert series.sum('sessions', day(1), day(4)) == 0
+    assert series.sum('volume', day(0), day(5)) == 30
+    assert series.window(day(3), day(5))['volume'] == 20
+
+
+def test_out_of_order_days_extend_the_start():
+    series = DailySeries()
+    series.add(day(10), sessions=1, volume=10)
+    series.add(day(2), sessions=1, volume=5)
+    series.add(day(6), sessions=1, volume=7)
+
+    assert series.data['start'] == day(2)
+    assert len(series) == 9
+    assert series.sum('volume', day(2), day(2)) == 5
+    assert series.sum('volume', day(3), day(9)) == 7
+    assert series.sum('volume', day(0), day(20)) == 22
+
+
+def test_trim_keeps_later_days():
+    series = DailySeries()
+    for offset in range(10):
+        series.add(day(offset), sessions=1, volume=offset)
+
+    series.trim(day(4))
+    assert series.data['start'] == day(4)
+    assert series.sum('volume', day(0), day(9)) == sum(range(4, 10))
+
+    series.trim(day(30))
+    assert len(series) == 0
+    assert series.sum('sessions', day(0), day(40)) == 0
+
+
+def test_empty_series_sums_to_zero():
+    assert DailySeries().window(day(0), day(6)) == {field: 0 for field in DailySeries.FIELDS}
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_sums_match_naive_loop(seed):
+    rng = random.Random(seed)
+    sessions = [(day(rng.randrange(40)), {'sessions': 1, 'volume': rng.randrange(1, 500)}) for _ in range(60)]
+    series = DailySeries()
+    for when, values in sessions:
+        series.add(when, **values)
+
+    for _ in range(50):
+        first, last = sorted(rng.randrange(-5, 45) for _ in range(2))
+        for field in ('sessions', 'volume'):
+            assert series.sum(field, day(first), day(last)) == naive_window(sessions, field, day(first), day(last))
+
+
+@pytest.fixture
+def analyzer(tmp_path):
+    return RecoveryAnalyzer(tmp_path)
+
+
+def session(when: str, score: float, volume: float = 100.0):
+    return {'date': f"{when}T18:00:00", 'intensity_score': score, 'estimated_volume': volume,
+            'muscle_groups': ['chest', 'triceps']}
+
+
+def test_multi_session_day_counts_one_active_day(analyzer):
+    workload = RecoveryAnalyzer._empty_workload()
+    analyzer._add_session(workload, session(day(0), 9.0))
+    analyzer._add_session(workload, session(day(0), 3.0))
+
+    totals = analyzer._window(workload, 1)
+    assert totals['sessions'] == 2
+    assert totals['active_days'] == 1
+    assert totals['light_sessions'] == 1
+    assert totals['intensity_sum'] == pytest.approx(12.0)
+    assert totals['volume'] == pytest.approx(200.0)
+
+
+@pytest.mark.parametrize('seed', range(3))
+def test_window_matches_naive_loop(analyzer, seed):
+    rng = random.Random(seed)
+    history = [session(day(rng.randrange(30)), round(rng.uniform(1, 10), 2), rng.randrange(50, 400))
+               for _ in range(40)]
+    workload = RecoveryAnalyzer._empty_workload()
+    for record in history:  # deliberately not sorted by date
+        analyzer._add_session(workload, record)
+
+    latest = date.fromisoformat(workload['day'])
+    first_kept = latest - timedelta(days=RecoveryAnalyzer.CHRONIC_DAYS - 1)
+    for days, offset in [(7, 0), (7, 7), (14, 3), (RecoveryAnalyzer.CHRONIC_DAYS, 0)]:
+        end = latest - timedelta(days=offset)
+        first = max(end - timedelta(days=days - 1), first_kept)
+        window = [r for r in history if first.isoformat() <= r['date'][:10] <= end.isoformat()]
+
+        totals = analyzer._window(workload, days, offset)
+        assert totals['sessions'] == len(window)
+        assert totals['active_days'] == len({r['date'][:10] for r in window})
+        assert totals['light_sessions'] == sum(
+            1 for r in window if r['intensity_score'] <= RecoveryAnalyzer.INTENSITY_THRESHOLDS['high'])
+        assert totals['intensity_sum'] == pytest.approx(sum(r['intensity_score'] for r in window))
+        assert totals['volume'] == pytest.approx(sum(r['estimated_volume'] for r in window))
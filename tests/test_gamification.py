@@ -0,0 +1,120 @@
+"""
+Tests for the event-sourced gamification projections (src/gamification.py):
+the stored stats always agree with the event log
+"""
+
+import threading
+
+import pytest
+
+from src.gamification import GamificationEngine
+from src.sharding import ShardedJSONStorage
+from src.storage import JSONStorage, SQLiteStorage
+from src.unit_of_work import UnitOfWork, WriteBehindQueue
+
+
+BACKENDS = {
+    'json': JSONStorage,
+    'sharded': ShardedJSONStorage,
+    'sqlite': lambda root: SQLiteStorage(root / "fitflow.db"),
+}
+
+
+@pytest.fixture(params=list(BACKENDS))
+def storage(request, tmp_path):
+    storage = BACKENDS[request.param](tmp_path)
+    yield storage
+    storage.close()
+
+
+def complete(engine, user_id='u1', uow=None):
+    return engine.update_workout_completion(user_id, 3, 9, 90, uow=uow, muscle_groups={'chest': 3})
+
+
+def assert_matches_log(engine, storage, user_id='u1'):
+    stats = storage.get_user_stats(user_id)
+    events = storage.get_events(user_id)
+    assert [event['seq'] for event in events] == list(range(1, len(events) + 1))
+    assert stats['event_seq'] == len(events)
+    assert stats['total_workouts'] == len(events)
+    assert engine.rebuild_user(user_id).total_workouts == len(events)
+
+
+def test_rolled_back_completion_leaves_no_trace(storage, tmp_path):
+    engine = GamificationEngine(tmp_path, storage)
+
+    uow = UnitOfWork(storage)
+    complete(engine, uow=uow)
+    uow.rollback()
+    uow = UnitOfWork(storage)
+    complete(engine, uow=uow)
+    uow.commit()
+
+    assert_matches_log(engine, storage)
+    assert storage.get_user_stats('u1')['total_workouts'] == 1
+
+
+def test_direct_write_uses_the_seq_storage_assigned(storage, tmp_path):
+    engine = GamificationEngine(tmp_path, storage)
+    other = GamificationEngine(tmp_path, storage)  # e.g. another process on the same storage
+    complete(engine)
+
+    # The other writer appends an event whose projection has not been saved yet
+    storage.append_event('u1', {**storage.get_events('u1')[0], 'seq': 2})
+    result = complete(other)
+
+    assert result['stats'].event_seq == 3
+    assert result['stats'].total_workouts == 3
+    assert_matches_log(engine, storage)
+
+
+def test_renumbered_unit_of_work_is_rebuilt_after_commit(storage, tmp_path):
+    engine = GamificationEngine(tmp_path, storage)
+    first, second = UnitOfWork(storage), UnitOfWork(storage)
+    complete(engine, uow=first)
+    complete(engine, uow=second)  # read the same stats, so it proposes the same seq
+    first.commit()
+    second.commit()
+
+    assert_matches_log(engine, storage)
+    assert storage.get_user_stats('u1')['total_workouts'] == 2
+
+
+def test_write_behind_completions_agree_with_the_log(storage, tmp_path):
+    engine = GamificationEngine(tmp_path, storage)
+    queue = WriteBehindQueue(storage)
+
+    def work():
+        for _ in range(10):
+            uow = UnitOfWork(storage, queue)
+            complete(engine, uow=uow)
+            uow.commit()
+
+    threads = [threading.Thread(target=work) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert queue.flush() == []
+
+    assert_matches_log(engine, storage)
+    assert storage.get_user_stats('u1')['total_workouts'] == 40
+
+
+def test_failed_write_behind_unit_is_not_built_on(tmp_path):
+    storage = JSONStorage(tmp_path)
+    engine = GamificationEngine(tmp_path, storage)
+    queue = WriteBehindQueue(storage)
+
+    uow = UnitOfWork(storage, queue)
+    complete(engine, uow=uow)
+    uow.operations.append(('no_such_operation', ()))
+    uow.commit()
+    assert len(queue.flush()) == 1
+
+    uow = UnitOfWork(storage, queue)
+    complete(engine, uow=uow)
+    uow.commit()
+    assert queue.flush() == []
+
+    assert_matches_log(engine, storage)
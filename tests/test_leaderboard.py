@@ -0,0 +1,78 @@
+"""
+Tests for the gym leaderboards (src/leaderboard.py) and how
+GamificationEngine keeps them current
+"""
+
+from datetime import date, datetime, timedelta
+
+from src.gamification import GamificationEngine
+from src.leaderboard import Leaderboards, board_scores, current_window
+from src.storage import JSONStorage
+from src.unit_of_work import UnitOfWork, WriteBehindQueue
+
+
+def stats(user_id: str, streak: int, last: date, xp: int = 100, gym_id: str = 'gym_a'):
+    return {'user_id': user_id, 'gym_id': gym_id, 'xp': xp, 'current_streak': streak,
+            'last_workout_date': datetime.combine(last, datetime.min.time()).isoformat()}
+
+
+def test_streak_counts_on_its_last_day_and_the_next():
+    today = date(2026, 10, 19)
+    scores = board_scores(stats('u1', 4, today))
+
+    assert scores[('streak', 'gym_a', today.isoformat())] == 4
+    assert scores[('streak', 'gym_a', (today + timedelta(days=1)).isoformat())] == 4
+    assert len([key for key in scores if key[0] == 'streak']) == 2
+    assert current_window('streak', today) == today.isoformat()
+
+
+def test_lapsed_streaks_are_not_ranked(tmp_path):
+    today = datetime.now().date()
+    storage = JSONStorage(tmp_path)
+    storage.save_user_stats('today', stats('today', 3, today))
+    storage.save_user_stats('yesterday', stats('yesterday', 9, today - timedelta(days=1)))
+    storage.save_user_stats('lapsed', stats('lapsed', 30, today - timedelta(days=2)))
+
+    boards = Leaderboards.load(storage)
+    assert [user_id for _, user_id, _ in boards.top('streak', 'gym_a')] == ['yesterday', 'today']
+    assert boards.rank('streak', 'gym_a', 'lapsed') is None
+    assert boards.rank('xp', 'gym_a', 'lapsed') is not None
+
+
+def test_boards_are_built_on_first_use(tmp_path):
+    storage = JSONStorage(tmp_path)
+    boards = Leaderboards(storage)
+    storage.save_user_stats('u1', stats('u1', 1, datetime.now().date(), xp=500))
+
+    assert boards.top('xp', 'gym_a') == [(1, 'u1', 500)]
+
+
+def test_boards_move_only_after_commit(tmp_path):
+    storage = JSONStorage(tmp_path)
+    engine = GamificationEngine(tmp_path, storage, Leaderboards(storage))
+
+    uow = UnitOfWork(storage)
+    engine.update_workout_completion('u1', 3, 9, 90, uow=uow, gym_id='gym_a')
+    assert engine.leaderboards.size('xp', 'gym_a') == 0
+    uow.commit()
+    assert engine.leaderboards.rank('xp', 'gym_a', 'u1') == 1
+    assert engine.leaderboards.rank('streak', 'gym_a', 'u1') == 1
+
+    uow = UnitOfWork(storage)
+    engine.update_workout_completion('u2', 3, 9, 90, uow=uow, gym_id='gym_a')
+    uow.rollback()
+    assert engine.leaderboards.rank('xp', 'gym_a', 'u2') is None
+
+
+def test_write_behind_moves_boards_once_written(tmp_path):
+    storage = JSONStorage(tmp_path)
+    engine = GamificationEngine(tmp_path, storage, Leaderboards(storage))
+    queue = WriteBehindQueue(storage)
+
+    for _ in range(3):
+        uow = UnitOfWork(storage, queue)
+        engine.update_workout_completion('u1', 3, 9, 90, uow=uow, gym_id='gym_a')
+        uow.commit()
+    assert queue.flush() == []
+
+    assert engine.leaderboards.top('xp', 'gym_a') == [(1, 'u1', storage.get_user_stats('u1')['xp'])]
@@ -0,0 +1,91 @@
+"""
+Tests for the RecoveryAnalyzer workload aggregates (src/recovery_analyzer.py):
+the stored workload counts exactly the stored intensity records
+"""
+
+import threading
+from datetime import datetime
+
+import pytest
+
+from src.daily_series import DailySeries
+from src.recovery_analyzer import RecoveryAnalyzer, WorkoutIntensity
+from src.sharding import ShardedJSONStorage
+from src.storage import JSONStorage, SQLiteStorage
+from src.unit_of_work import UnitOfWork, WriteBehindQueue
+
+
+BACKENDS = {
+    'json': JSONStorage,
+    'sharded': ShardedJSONStorage,
+    'sqlite': lambda root: SQLiteStorage(root / "fitflow.db"),
+}
+
+
+@pytest.fixture(params=list(BACKENDS))
+def storage(request, tmp_path):
+    storage = BACKENDS[request.param](tmp_path)
+    yield storage
+    storage.close()
+
+
+def intensity(score: float = 5.0):
+    return WorkoutIntensity(date=datetime.now().isoformat(), total_sets=9, total_reps=90,
+                            estimated_volume=90.0, muscle_groups=['chest'], intensity_score=score)
+
+
+def stored_sessions(storage, user_id='u1'):
+    workload = storage.get_user_document('workload', user_id)
+    return DailySeries(workload['series']).sum('sessions', '2000-01-01', '2999-12-31')
+
+
+def test_write_behind_sessions_are_all_counted(storage, tmp_path):
+    analyzer = RecoveryAnalyzer(tmp_path, storage)
+    queue = WriteBehindQueue(storage)
+
+    for _ in range(3):
+        uow = UnitOfWork(storage, queue)
+        analyzer.save_workout_intensity('u1', intensity(), uow=uow, exercise_sets={'bench_press': 3})
+        uow.commit()
+    assert queue.flush() == []
+
+    assert len(storage.get_intensities('u1')) == 3
+    assert stored_sessions(storage) == 3
+    assert analyzer.get_muscle_fatigue('u1')
+
+
+def test_rolled_back_and_failed_sessions_are_not_counted(tmp_path):
+    storage = JSONStorage(tmp_path)
+    analyzer = RecoveryAnalyzer(tmp_path, storage)
+    queue = WriteBehindQueue(storage)
+
+    uow = UnitOfWork(storage)
+    analyzer.save_workout_intensity('u1', intensity(), uow=uow)
+    uow.rollback()
+    uow = UnitOfWork(storage, queue)
+    analyzer.save_workout_intensity('u1', intensity(), uow=uow)
+    uow.operations.append(('no_such_operation', ()))
+    uow.commit()
+    assert len(queue.flush()) == 1
+
+    analyzer.save_workout_intensity('u1', intensity())
+    assert len(storage.get_intensities('u1')) == 1
+    assert stored_sessions(storage) == 1
+
+
+def test_concurrent_sessions_do_not_lose_updates(storage, tmp_path):
+    analyzer = RecoveryAnalyzer(tmp_path, storage)
+
+    def work():
+        for _ in range(5):
+            uow = UnitOfWork(storage)
+            analyzer.save_workout_intensity('u1', intensity(), uow=uow)
+            uow.commit()
+
+    threads = [threading.Thread(target=work) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert stored_sessions(storage) == 20
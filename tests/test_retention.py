@@ -0,0 +1,88 @@
+"""
+Tests for the cold archive and retention job (src/retention.py):
+no record is pruned from the hot storage without being archived
+"""
+
+from datetime import datetime
+
+import pytest
+
+from src.retention import ArchivedStorage, ColdArchive, apply_retention
+from src.sharding import ShardedJSONStorage
+from src.storage import JSONStorage, SQLiteStorage
+
+
+BACKENDS = {
+    'json': JSONStorage,
+    'sharded': ShardedJSONStorage,
+    'sqlite': lambda root: SQLiteStorage(root / "fitflow.db"),
+}
+
+NOW = datetime(2026, 6, 1)
+
+
+@pytest.fixture(params=list(BACKENDS))
+def storage(request, tmp_path):
+    storage = BACKENDS[request.param](tmp_path / "hot")
+    yield storage
+    storage.close()
+
+
+def log(log_id: str, date: str, calories: int = 100):
+    return {'log_id': log_id, 'user_id': 'u1', 'date': f"{date}T18:00:00",
+            'calories_burned': calories, 'duration_minutes': 30}
+
+
+def retain(storage, archive):
+    return apply_retention(storage, archive, hot_days=90, now=NOW, user_ids=['u1'])
+
+
+def test_logs_imported_before_the_archived_range_are_archived(storage, tmp_path):
+    archive = ColdArchive(tmp_path / "archive")
+    reader = ArchivedStorage(storage, archive)
+    storage.append_log(log('jan', '2026-01-10'))
+    storage.append_log(log('may', '2026-05-20'))
+    assert retain(storage, archive)['logs'] == 1
+
+    # Older history is bulk-imported after the first run
+    storage.import_logs([[log('old-1', '2025-11-03', 200), log('old-2', '2025-11-04', 300)]])
+    ids = {entry['log_id'] for entry in reader.get_user_logs('u1')}
+    assert ids == {'jan', 'may', 'old-1', 'old-2'}
+    assert len(reader.query_logs('u1')[0]) == 4
+
+    assert retain(storage, archive)['logs'] == 2
+    assert [entry['log_id'] for entry in storage.get_user_logs('u1')] == ['may']
+    assert [entry['log_id'] for entry in reader.query_logs('u1')[0]] == ['may', 'jan', 'old-2', 'old-1']
+    assert sorted(entry['log_id'] for entry in reader.iter_logs()) == ['jan', 'may', 'old-1', 'old-2']
+    assert archive.archived_range('u1', 'logs')[0] == '2025-11-03T18:00:00'
+
+    daily = archive.get_rollups('u1', 'logs', 'daily')
+    assert sorted(daily) == ['2025-11-03', '2025-11-04', '2026-01-10']
+    assert sum(day['calories'] for day in daily.values()) == 600
+
+
+def test_rerun_does_not_double_count(storage, tmp_path):
+    archive = ColdArchive(tmp_path / "archive")
+    storage.append_log(log('a', '2026-01-10'))
+    retain(storage, archive)
+
+    # An interrupted run: archived, but the hot copy was never pruned
+    storage.append_log(log('a', '2026-01-10'))
+    assert retain(storage, archive)['logs'] == 0
+    assert storage.get_user_logs('u1') == []
+    assert archive.get_rollups('u1', 'logs', 'daily')['2026-01-10']['workouts'] == 1
+    assert len(ArchivedStorage(storage, archive).get_user_logs('u1')) == 1
+
+
+def test_hot_intensities_before_the_archived_range_stay_visible(storage, tmp_path):
+    archive = ColdArchive(tmp_path / "archive")
+    reader = ArchivedStorage(storage, archive)
+    storage.append_intensity('u1', {'date': '2026-01-10T18:00:00', 'intensity_score': 5.0})
+    retain(storage, archive)
+
+    storage.append_intensity('u1', {'date': '2025-12-01T18:00:00', 'intensity_score': 7.0})
+    assert [record['intensity_score'] for record in reader.query_intensities('u1')] == [7.0, 5.0]
+
+    retain(storage, archive)
+    assert storage.get_intensities('u1') == []
+    assert [record['intensity_score'] for record in reader.query_intensities('u1')] == [7.0, 5.0]
@@ -0,0 +1,337 @@
+"""
+Contract tests every storage backend must pass (src/storage.py, src/sharding.py):
+round trips, persistence across reopen, change tokens, batches, and the
+crash/lock guarantees of the file backends (atomic rename writes, per-file
+writer locks, readers that never block)
+"""
+
+import json
+import os
+import threading
+from pathlib import Path
+
+import pytest
+
+from src.atomic_io import FileLock, read_json_lines
+from src.sharding import ShardedJSONStorage
+from src.storage import JSONStorage, SQLiteStorage
+
+
+BACKENDS = {
+    'json': JSONStorage,
+    'sharded': ShardedJSONStorage,
+    'sqlite': lambda root: SQLiteStorage(root / "fitflow.db", record_format="json"),
+    'sqlite-msgpack': lambda root: SQLiteStorage(root / "fitflow.db", record_format="msgpack"),
+}
+FILE_BACKENDS = ['json', 'sharded']
+
+
+@pytest.fixture(params=list(BACKENDS))
+def open_storage(request, tmp_path):
+    """Opens the parametrized backend on tmp_path; every instance is closed at teardown"""
+    opened = []
+
+    def open_():
+        storage = BACKENDS[request.param](tmp_path)
+        opened.append(storage)
+        return storage
+
+    open_.name = request.param
+    yield open_
+    for storage in opened:
+        storage.close()
+
+
+@pytest.fixture
+def storage(open_storage):
+    return open_storage()
+
+
+def make_log(user_id: str, day: int, n: int = 0):
+    return {'log_id': f"{user_id}-{day}-{n}", 'user_id': user_id, 'date': f"2026-01-{day:02d}T10:00:00",
+            'exercises_completed': ['push_up'], 'duration_minutes': 30 + n}
+
+
+def make_intensity(day: int, score: float = 5.0):
+    return {'date': f"2026-01-{day:02d}T10:00:00", 'total_sets': 10, 'total_reps': 100,
+            'estimated_volume': 1000.0, 'muscle_groups': ['chest'], 'intensity_score': score}
+
+
+def test_profile_round_trip(storage):
+    assert storage.get_profile('u1') is None
+    storage.save_profile({'user_id': 'u1', 'name': 'Ana', 'days_per_week': 3})
+    storage.save_profile({'user_id': 'u1', 'name': 'Ana', 'days_per_week': 4})
+    storage.save_profile({'user_id': 'u2', 'name': 'Ben', 'days_per_week': 2})
+
+    assert storage.get_profile('u1') == {'user_id': 'u1', 'name': 'Ana', 'days_per_week': 4}
+    assert sorted(storage.iter_user_ids()) == ['u1', 'u2']
+
+
+def test_logs_round_trip_and_pagination(storage):
+    for day in (3, 1, 2, 5, 4):
+        storage.append_log(make_log('u1', day))
+    storage.append_log(make_log('u2', 1))
+
+    assert sorted(log['log_id'] for log in storage.get_user_logs('u1')) == [f"u1-{d}-0" for d in range(1, 6)]
+    assert storage.get_user_logs('u1')[0]['exercises_completed'] == ['push_up']
+
+    page, cursor = storage.query_logs('u1', limit=2)
+    assert [log['log_id'] for log in page] == ['u1-5-0', 'u1-4-0']
+    rest, cursor = storage.query_logs('u1', cursor=cursor)
+    assert [log['log_id'] for log in rest] == ['u1-3-0', 'u1-2-0', 'u1-1-0']
+    assert cursor is None
+
+    window, _ = storage.query_logs('u1', start='2026-01-02', end='2026-01-04')
+    assert [log['log_id'] for log in window] == ['u1-3-0', 'u1-2-0']
+    assert sorted(log['log_id'] for log in storage.iter_logs()) == sorted(
+        [f"u1-{d}-0" for d in range(1, 6)] + ['u2-1-0'])
+
+
+def test_stats_and_unlocked_round_trip(storage):
+    assert storage.get_user_stats('u1') is None
+    assert storage.get_unlocked('u1') == {}
+
+    storage.save_user_stats('u1', {'user_id': 'u1', 'total_xp': 120, 'current_streak': 3})
+    storage.save_unlocked('u1', {'first_workout': '2026-01-01T10:00:00'})
+
+    assert storage.get_user_stats('u1') == {'user_id': 'u1', 'total_xp': 120, 'current_streak': 3}
+    assert storage.get_unlocked('u1') == {'first_workout': '2026-01-01T10:00:00'}
+    assert storage.get_user_stats('u2') is None
+    assert [stats['user_id'] for stats in storage.iter_user_stats()] in ([], ['u1'])
+
+
+def test_user_documents_round_trip(storage):
+    assert storage.get_user_document('workload', 'u1') is None
+    storage.save_user_document('workload', 'u1', {'acute': 1.5, 'series': {'start': None}})
+    storage.save_user_document('workload', 'u2', {'acute': 2.0})
+    storage.save_user_document('gamification_snapshot', 'u1', {'event_seq': 4})
+
+    assert storage.get_user_document('workload', 'u1') == {'acute': 1.5, 'series': {'start': None}}
+    assert storage.get_user_document('workload', 'u2') == {'acute': 2.0}
+    assert storage.get_user_document('gamification_snapshot', 'u1') == {'event_seq': 4}
+
+
+def test_documents_do_not_clash_with_records(storage):
+    storage.save_profile({'user_id': 'u1', 'name': 'Ada'})
+    storage.save_user_stats('u1', {'user_id': 'u1', 'total_xp': 10})
+    storage.save_user_document('profile', 'u1', {'kind': 'document'})
+    storage.save_user_document('stats', 'u1', {'kind': 'document'})
+
+    assert storage.get_profile('u1') == {'user_id': 'u1', 'name': 'Ada'}
+    assert storage.get_user_stats('u1') == {'user_id': 'u1', 'total_xp': 10}
+    assert storage.get_user_document('profile', 'u1') == {'kind': 'document'}
+
+
+@pytest.mark.parametrize('user_id', ['.', '..', 'a/b', 'x%2E'])
+def test_awkward_user_ids_get_their_own_data(storage, user_id):
+    storage.save_profile({'user_id': 'u1', 'name': 'Ada'})
+    storage.save_profile({'user_id': user_id, 'name': 'Odd'})
+    storage.append_log(make_log(user_id, 1))
+
+    assert storage.get_profile(user_id) == {'user_id': user_id, 'name': 'Odd'}
+    assert storage.get_profile('u1') == {'user_id': 'u1', 'name': 'Ada'}
+    assert len(storage.get_user_logs(user_id)) == 1
+    assert sorted(storage.iter_user_ids()) == sorted(['u1', user_id])
+
+
+def test_intensities_round_trip(storage):
+    for day in (1, 2, 3):
+        storage.append_intensity('u1', make_intensity(day))
+    storage.update_intensities('u1', [make_intensity(2, score=9.0), make_intensity(9, score=1.0)])
+
+    records = storage.get_intensities('u1')
+    assert [r['date'][:10] for r in records] == ['2026-01-01', '2026-01-02', '2026-01-03']
+    assert [r['intensity_score'] for r in records] == [5.0, 9.0, 5.0]
+    assert [r['date'][:10] for r in storage.query_intensities('u1', start='2026-01-02', end='2026-01-03')] == \
+        ['2026-01-02']
+    assert storage.get_intensities('u2') == []
+
+
+def test_events_are_ordered_by_seq(storage):
+    for seq in (1, 2, 3):
+        storage.append_event('u1', {'seq': seq, 'type': 'workout_completed'})
+    storage.append_event('u2', {'seq': 1, 'type': 'workout_completed'})
+
+    assert [e['seq'] for e in storage.get_events('u1')] == [1, 2, 3]
+    assert [e['seq'] for e in storage.get_events('u1', after_seq=2)] == [3]
+    assert [e['seq'] for e in storage.get_events('u2')] == [1]
+
+
+def test_duplicate_event_seq_is_renumbered(storage):
+    assert storage.append_event('u1', {'seq': 1, 'type': 'workout_completed'})['seq'] == 1
+    assert storage.append_event('u1', {'seq': 1, 'type': 'workout_completed'}) == \
+        {'seq': 2, 'type': 'workout_completed'}
+
+    assert [e['seq'] for e in storage.get_events('u1')] == [1, 2]
+
+
+def test_prune_before(storage):
+    for day in (1, 2, 3):
+        storage.append_log(make_log('u1', day))
+        storage.append_intensity('u1', make_intensity(day))
+
+    storage.prune_before('logs', '2026-01-02', ['u1'])
+    storage.prune_before('intensity', '2026-01-03', ['u1'])
+
+    assert sorted(log['log_id'] for log in storage.get_user_logs('u1')) == ['u1-2-0', 'u1-3-0']
+    assert [r['date'][:10] for r in storage.get_intensities('u1')] == ['2026-01-03']
+
+
+def test_apply_batch_writes_every_operation(storage):
+    storage.apply_batch([
+        ('save_profile', ({'user_id': 'u1', 'name': 'Ana'},)),
+        ('append_log', (make_log('u1', 1),)),
+        ('append_log', (make_log('u1', 2),)),
+        ('save_user_stats', ('u1', {'user_id': 'u1', 'total_xp': 50})),
+        ('save_unlocked', ('u1', {'first_workout': '2026-01-01'})),
+        ('append_intensity', ('u1', make_intensity(1))),
+        ('append_event', ('u1', {'seq': 1, 'type': 'workout_completed'})),
+        ('save_user_document', ('workload', 'u1', {'acute': 1.0})),
+    ])
+
+    assert storage.get_profile('u1') == {'user_id': 'u1', 'name': 'Ana'}
+    assert len(storage.get_user_logs('u1')) == 2
+    assert storage.get_user_stats('u1') == {'user_id': 'u1', 'total_xp': 50}
+    assert storage.get_unlocked('u1') == {'first_workout': '2026-01-01'}
+    assert len(storage.get_intensities('u1')) == 1
+    assert [e['seq'] for e in storage.get_events('u1')] == [1]
+    assert storage.get_user_document('workload', 'u1') == {'acute': 1.0}
+    assert storage.import_logs([[make_log('u1', 3)], [make_log('u1', 4)]]) == 2
+    assert len(storage.get_user_logs('u1')) == 4
+
+
+def test_data_survives_reopen(open_storage):
+    storage = open_storage()
+    storage.save_profile({'user_id': 'u1', 'name': 'Ana'})
+    storage.append_log(make_log('u1', 1))
+    storage.save_user_stats('u1', {'user_id': 'u1', 'total_xp': 10})
+    storage.append_event('u1', {'seq': 1, 'type': 'workout_completed'})
+    storage.close()
+
+    reopened = open_storage()
+    assert reopened.get_profile('u1') == {'user_id': 'u1', 'name': 'Ana'}
+    assert [log['log_id'] for log in reopened.get_user_logs('u1')] == ['u1-1-0']
+    assert reopened.get_user_stats('u1') == {'user_id': 'u1', 'total_xp': 10}
+    assert [e['seq'] for e in reopened.get_events('u1')] == [1]
+
+
+@pytest.mark.parametrize('kind, write', [
+    ('profile', lambda s: s.save_profile({'user_id': 'u1', 'name': 'Ana'})),
+    ('logs', lambda s: s.append_log(make_log('u1', 1))),
+    ('stats', lambda s: s.save_user_stats('u1', {'user_id': 'u1', 'total_xp': 1})),
+    ('unlocked', lambda s: s.save_unlocked('u1', {'first_workout': '2026-01-01'})),
+    ('intensity', lambda s: s.append_intensity('u1', make_intensity(1))),
+    ('events', lambda s: s.append_event('u1', {'seq': 1, 'type': 'workout_completed'})),
+    ('doc:workload', lambda s: s.save_user_document('workload', 'u1', {'acute': 1.0})),
+])
+def test_writes_change_the_version_token(storage, kind, write):
+    before = storage.version(kind, 'u1')
+    write(storage)
+    after = storage.version(kind, 'u1')
+    assert after is not None and after != before
+    assert storage.version(kind, 'u1') == after
+
+
+def test_concurrent_writers_lose_no_updates(storage):
+    threads, writes = 8, 20
+
+    def work(t):
+        for i in range(writes):
+            storage.save_user_stats(f"t{t}-{i}", {'user_id': f"t{t}-{i}", 'total_xp': i})
+            storage.append_intensity('shared', make_intensity(1 + i % 28, score=float(t)))
+            storage.append_log(make_log('shared', 1 + i % 28, n=t * writes + i))
+
+    workers = [threading.Thread(target=work, args=(t,)) for t in range(threads)]
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+
+    assert all(storage.get_user_stats(f"t{t}-{i}") is not None for t in range(threads) for i in range(writes))
+    assert len(storage.get_intensities('shared')) == threads * writes
+    assert len(storage.get_user_logs('shared')) == threads * writes
+
+
+def test_failed_batch_leaves_no_partial_write(storage):
+    storage.save_user_stats('u1', {'user_id': 'u1', 'total_xp': 10})
+    if not storage.atomic_batches:
+        pytest.skip("batch is not all-or-nothing on this backend")
+
+    with pytest.raises(Exception):
+        storage.apply_batch([
+            ('save_user_stats', ('u1', {'user_id': 'u1', 'total_xp': 99})),
+            ('append_log', ({'user_id': 'u1'},)),  # no log_id/date: fails mid-batch
+        ])
+    assert storage.get_user_stats('u1') == {'user_id': 'u1', 'total_xp': 10}
+
+
+# Crash and lock semantics of the file backends
+
+@pytest.fixture(params=FILE_BACKENDS)
+def file_storage(request, tmp_path):
+    return BACKENDS[request.param](tmp_path)
+
+
+def stats_path(storage, user_id: str) -> Path:
+    if isinstance(storage, ShardedJSONStorage):
+        return storage._file(user_id, storage.FILES['stats'])
+    return storage.user_stats_file
+
+
+def test_crash_during_write_keeps_previous_file(file_storage, monkeypatch):
+    file_storage.save_user_stats('u1', {'user_id': 'u1', 'total_xp': 10})
+    path = stats_path(file_storage, 'u1')
+
+    def crash(src, dst):
+        raise OSError("simulated crash before rename")
+
+    monkeypatch.setattr(os, 'replace', crash)
+    with pytest.raises(OSError):
+        file_storage.save_user_stats('u1', {'user_id': 'u1', 'total_xp': 99})
+    monkeypatch.undo()
+
+    assert file_storage.get_user_stats('u1') == {'user_id': 'u1', 'total_xp': 10}
+    assert [p.name for p in path.parent.iterdir() if p.name.endswith('.tmp')] == []
+    json.loads(path.read_text())  # still a complete document
+
+
+def test_readers_do_not_wait_for_the_writer_lock(file_storage):
+    file_storage.save_user_stats('u1', {'user_id': 'u1', 'total_xp': 10})
+    result = []
+
+    with FileLock(stats_path(file_storage, 'u1')):
+        reader = threading.Thread(target=lambda: result.append(file_storage.get_user_stats('u1')))
+        reader.start()
+        reader.join(timeout=5)
+        assert not reader.is_alive()
+
+    assert result == [{'user_id': 'u1', 'total_xp': 10}]
+
+
+def test_writers_wait_for_the_writer_lock(file_storage):
+    file_storage.save_user_stats('u1', {'user_id': 'u1', 'total_xp': 10})
+    path = stats_path(file_storage, 'u1')
+    writer = threading.Thread(
+        target=file_storage.save_user_stats, args=('u1', {'user_id': 'u1', 'total_xp': 20}))
+
+    with FileLock(path):
+        writer.start()
+        writer.join(timeout=0.2)
+        assert writer.is_alive()
+        assert file_storage.get_user_stats('u1') == {'user_id': 'u1', 'total_xp': 10}
+    writer.join(timeout=5)
+
+    assert file_storage.get_user_stats('u1') == {'user_id': 'u1', 'total_xp': 20}
+
+
+def test_half_written_line_is_ignored_and_repaired(tmp_path):
+    storage = ShardedJSONStorage(tmp_path)
+    storage.append_log(make_log('u1', 1))
+    logs_path = storage._file('u1', storage.FILES['logs'])
+    with open(logs_path, 'a') as f:
+        f.write('{"log_id": "torn", "user_id": ')  # a writer died mid-append
+
+    assert [log['log_id'] for log in storage.get_user_logs('u1')] == ['u1-1-0']
+
+    storage.append_log(make_log('u1', 2))
+    assert [log['log_id'] for log in read_json_lines(logs_path)] == ['u1-1-0', 'u1-2-0']